@@ -0,0 +1,88 @@
+"""
+Compare response serialization paths on a large order payload.
+
+    python scripts/benchmark_json.py [orders] [rounds]
+
+"default" is what FastAPI does for a plain return value
+(jsonable_encoder + JSONResponse.render); "fast" is FastJSONResponse.
+"""
+import sys
+import time
+import random
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from utils.json_response import FastJSONResponse, orjson
+
+
+def make_orders(count: int) -> list:
+    """Order documents shaped like db.orders (naive UTC datetimes, as Motor returns them)"""
+    start = datetime(2025, 1, 1)
+    orders = []
+    for i in range(count):
+        items = [
+            {
+                "product_id": f"product_{random.randint(1, 60)}",
+                "name": "Kandi Podi",
+                "image": "/images/kandi-podi.jpg",
+                "weight": random.choice(["250g", "500g", "1kg"]),
+                "price": 180.0,
+                "quantity": random.randint(1, 4),
+                "description": "Traditional Andhra lentil powder"
+            }
+            for _ in range(random.randint(1, 5))
+        ]
+        orders.append({
+            "order_id": f"AL20250101{i:05d}",
+            "tracking_code": f"TRK{i:08d}",
+            "customer_name": "Lakshmi",
+            "email": "customer@example.com",
+            "phone": "9876543210",
+            "doorNo": "12-3",
+            "building": "Sai Residency",
+            "street": "MG Road",
+            "city": "Guntur",
+            "state": "Andhra Pradesh",
+            "pincode": "522001",
+            "location": "Guntur",
+            "items": items,
+            "subtotal": 540.0,
+            "delivery_charge": 49.0,
+            "total": 589.0,
+            "payment_method": "online",
+            "payment_status": "completed",
+            "order_status": random.choice(["pending", "confirmed", "shipped", "delivered"]),
+            "created_at": start + timedelta(minutes=i),
+            "updated_at": start + timedelta(minutes=i, seconds=30)
+        })
+    return orders
+
+
+def bench(label: str, render, payload, rounds: int) -> float:
+    best = float("inf")
+    size = 0
+    for _ in range(rounds):
+        started = time.perf_counter()
+        size = len(render(payload))
+        best = min(best, time.perf_counter() - started)
+    print(f"{label:<10} {best * 1000:8.1f} ms   {size / 1024:8.0f} KiB")
+    return best
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    orders = make_orders(count)
+    print(f"{count} orders, best of {rounds} ({'orjson' if orjson else 'stdlib json'} fast path)")
+
+    default = bench("default", lambda p: JSONResponse(jsonable_encoder(p)).body, orders, rounds)
+    fast = bench("fast", lambda p: FastJSONResponse(p).body, orders, rounds)
+    print(f"speedup    {default / fast:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+Recompute db.sales_rollups (analytics summary) from every order.
+
+    python scripts/rebuild_sales_rollups.py
+
+The server keeps the rollups current as orders change and builds them on
+first start; run this after bulk edits made directly in the database.
+Safe to run while the server is live: order changes made during the
+rebuild are queued and applied once the new rollups are swapped in.
+"""
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+from utils.sales_rollups import RebuildInProgress, SalesRollups
+
+
+async def main():
+    load_dotenv(BACKEND_DIR / '.env')
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[os.environ['DB_NAME']]
+    rollups = SalesRollups()
+    await rollups.ensure_indexes(db)
+
+    start = time.perf_counter()
+    try:
+        count = await rollups.rebuild(db)
+    except RebuildInProgress:
+        print("Sales rollups are already being rebuilt - try again when it finishes")
+        sys.exit(1)
+    finally:
+        client.close()
+    print(f"Rebuilt sales rollups from {count} orders in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
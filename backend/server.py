@@ -1,10 +1,12 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, File, UploadFile, Header, Request, Form
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, File, UploadFile, Header, Request, Form, Query
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import JSONResponse, HTMLResponse
+from fastapi.responses import JSONResponse, HTMLResponse, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
 import os
+import asyncio
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field, EmailStr, ConfigDict, ValidationError
@@ -15,7 +17,11 @@ import aiofiles
 import base64
 from auth import create_access_token, decode_token, get_password_hash, verify_password
 from email_service import send_order_confirmation_email
-from gmail_service import send_order_confirmation_email_gmail, send_order_status_update_email, send_city_approval_email, send_city_rejection_email
+from gmail_service import (
+    send_order_confirmation_email_gmail, send_order_status_update_email, send_payment_status_update_email,
+    send_payment_completion_email, send_order_cancellation_email, send_city_approval_email, send_city_rejection_email,
+    deliver_message
+)
 from cities_data import ALL_CITIES, DEFAULT_DELIVERY_CHARGES, DEFAULT_OTHER_CITY_CHARGE, ANDHRA_PRADESH_CITIES, TELANGANA_CITIES
 import random
 import string
@@ -25,8 +31,25 @@ import hmac
 import hashlib
 
 # Import utility functions
-from utils.helpers import generate_order_id, generate_tracking_code, calculate_haversine_distance
+from utils.helpers import generate_tracking_code, calculate_haversine_distance
 from utils.admin_manager import ensure_admin_exists_mongodb
+from utils.resource_versions import ResourceVersions
+from utils.catalog_cache import CatalogCache, parse_fields
+from utils.discount_scheduler import DiscountScheduler, discount_update, parse_discount_expiry
+from utils.http_cache import HTTPCache
+from utils.compression import CompressionMiddleware
+from utils.json_response import FastJSONResponse
+from utils.inventory import InsufficientInventory, cart_quantities, PRODUCT_PROJECTION
+from utils.reservations import InventoryReservations, holds_expire, EXPIRED_CANCEL_REASON
+from utils.email_outbox import EmailOutbox
+from utils.idempotency import IdempotencyStore
+from utils.order_ids import OrderIdAllocator
+from utils.pagination import paginate, paginate_union, iso_string, DEFAULT_PAGE_SIZE
+from utils.sales_rollups import SalesRollups
+from utils.order_analytics import analytics_match, aggregate_analytics
+from utils.order_facts import OrderFacts, DEFAULT_QUERY_LIMIT
+from utils.order_export import EXPORT_FORMATS, export_filename, stream_orders_export
+from utils.order_archive import OrderArchive, ARCHIVE_COLLECTION
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -36,6 +59,40 @@ mongo_url = os.environ['MONGO_URL']
 client = AsyncIOMotorClient(mongo_url)
 db = client[os.environ['DB_NAME']]
 
+# Shared version counters and in-process catalog snapshot
+resource_versions = ResourceVersions()
+catalog_cache = CatalogCache(resource_versions)
+discount_scheduler = DiscountScheduler(on_change=lambda product_ids: catalog_cache.invalidate(db, product_ids))
+http_cache = HTTPCache(resource_versions)
+# Daily/monthly sales, status counts and product quantities behind the analytics summary
+sales_rollups = SalesRollups()
+reservations = InventoryReservations(
+    on_stock_change=lambda product_ids: catalog_cache.invalidate_stock(db, product_ids),
+    on_expire=lambda order_ids: record_order_changes(*order_ids)
+)
+# Columnar, memory-mapped copy of order facts for ad-hoc group-bys
+order_facts = OrderFacts(Path(os.environ.get('ORDER_FACTS_DIR', ROOT_DIR / 'data' / 'order_facts')))
+
+# Notification emails are queued in db.email_outbox and sent by background workers
+email_outbox = EmailOutbox({
+    "order_confirmation": send_order_confirmation_email_gmail,
+    "order_status_update": send_order_status_update_email,
+    "payment_status_update": send_payment_status_update_email,
+    "payment_completion": send_payment_completion_email,
+    "order_cancellation": send_order_cancellation_email,
+    "city_approval": send_city_approval_email,
+    "city_rejection": send_city_rejection_email,
+})
+
+# Checkout/payment retries carrying an Idempotency-Key replay the first response
+idempotency = IdempotencyStore()
+
+# Collision-free order ids from per-day counter blocks (db.counters)
+order_ids = OrderIdAllocator()
+
+# Old delivered/cancelled orders move to db.orders_archive; lookups fall back to it
+order_archive = OrderArchive()
+
 # Razorpay client initialization
 razorpay_client = razorpay.Client(auth=(os.environ.get('RAZORPAY_KEY_ID', ''), os.environ.get('RAZORPAY_KEY_SECRET', '')))
 
@@ -52,17 +109,82 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+async def _startup_step(name: str, step) -> bool:
+    """Run one startup step - a failure is logged and the remaining steps still run"""
+    try:
+        await step()
+        return True
+    except Exception as e:
+        logger.error(f"❌ Startup step '{name}' failed: {e}")
+        return False
+
+async def _load_discounts():
+    if await discount_scheduler.load(db):
+        await catalog_cache.invalidate(db)
+
+async def _build_analytics():
+    """Analytics rollups and the fact store - built from the order history on first start"""
+    if await _startup_step("sales rollup indexes", lambda: sales_rollups.ensure_indexes(db)):
+        await _startup_step("sales rollups", lambda: sales_rollups.ensure_built(db))
+    if await _startup_step("order fact indexes", lambda: order_facts.ensure_indexes(db)):
+        await _startup_step("order facts backfill", lambda: order_facts.backfill(db))
+    logger.info("📊 Analytics startup work finished")
+
+async def _ensure_list_indexes():
+    # Sort keys for cursor-paginated admin/user lists (newest first)
+    await db.orders.create_index([("created_at", -1), ("id", -1)])
+    await db.orders.create_index([("user_id", 1), ("created_at", -1), ("id", -1)])
+    await db.orders.create_index([("city", 1), ("created_at", -1)])
+    await db.bug_reports.create_index([("created_at", -1), ("id", -1)])
+    await db.city_suggestions.create_index([("created_at", -1), ("id", -1)])
+    await db.city_suggestions.create_index([("status", 1), ("created_at", -1), ("id", -1)])
+
+async def _normalize_city_suggestion_dates():
+    """Checkout used to store city_suggestions.created_at as a date, the other paths as an ISO string"""
+    dated = await db.city_suggestions.find({"created_at": {"$type": "date"}}, {"_id": 1, "created_at": 1}).to_list(None)
+    if dated:
+        await db.city_suggestions.bulk_write([
+            UpdateOne({"_id": doc["_id"]}, {"$set": {"created_at": iso_string(doc["created_at"])}}) for doc in dated
+        ], ordered=False)
+        logger.info(f"🗓️ Normalized created_at on {len(dated)} city suggestion(s)")
+
+# The analytics build runs in the background; keep a reference so it is not collected
+analytics_startup_task: Optional[asyncio.Task] = None
+
 # Startup event - Auto-create admin from .env
 @app.on_event("startup")
 async def startup_event():
-    """Initialize application on startup"""
+    """
+    Initialize application on startup. Every step is isolated, the
+    long-lived workers start before anything slow, and the analytics
+    rebuilds run as a background task - a failure in one never keeps the
+    sweeper, email outbox, discount scheduler or archiver from running.
+    """
+    global analytics_startup_task
     logger.info("🚀 Starting Anantha Lakshmi API Server (MongoDB)")
-    try:
-        # Auto-create/update admin user from .env
-        await ensure_admin_exists_mongodb(db)
-        logger.info("✅ Server startup completed successfully")
-    except Exception as e:
-        logger.error(f"❌ Error during startup: {e}")
+    
+    # Auto-create/update admin user from .env
+    await _startup_step("admin user", lambda: ensure_admin_exists_mongodb(db))
+    
+    # Discount expiry scheduler (materializes discount_active)
+    await _startup_step("discount schedule", _load_discounts)
+    discount_scheduler.start(db)
+    # Sweeper that releases expired stock holds for unpaid orders
+    reservations.start(db)
+    email_outbox.start(db)
+    order_archive.start(db)
+    
+    await _startup_step("discount index", lambda: db.products.create_index("discount_expires_at", sparse=True))
+    await _startup_step("reservation indexes", lambda: reservations.ensure_indexes(db))
+    await _startup_step("email outbox indexes", lambda: email_outbox.ensure_indexes(db))
+    await _startup_step("idempotency indexes", lambda: idempotency.ensure_indexes(db))
+    await _startup_step("order id indexes", lambda: order_ids.ensure_indexes(db))
+    await _startup_step("order archive indexes", lambda: order_archive.ensure_indexes(db))
+    await _startup_step("list indexes", _ensure_list_indexes)
+    await _startup_step("city suggestion dates", _normalize_city_suggestion_dates)
+    
+    analytics_startup_task = asyncio.create_task(_build_analytics())
+    logger.info("✅ Server startup completed (analytics build continues in the background)")
 
 # Add validation error handler to log details
 @app.exception_handler(RequestValidationError)
@@ -200,6 +322,11 @@ class Order(BaseModel):
     cancel_reason: Optional[str] = None
     cancellation_fee: float = 0.0
 
+class BulkStatusUpdate(BaseModel):
+    order_ids: List[str]
+    status: str
+    notify: bool = True  # Queue status update emails to customers
+
 class Location(BaseModel):
     name: str
     charge: float
@@ -309,7 +436,7 @@ class OTPVerification(BaseModel):
     expires_at: datetime
 
 # ============= HELPER FUNCTIONS =============
-# Note: generate_order_id, generate_tracking_code moved to utils/helpers.py
+# Note: generate_tracking_code moved to utils/helpers.py (order ids: utils/order_ids.py)
 
 async def get_current_user(authorization: Optional[str] = Header(None)):
     """Dependency to get current user from JWT token"""
@@ -579,143 +706,188 @@ async def get_saved_user_details(identifier: str):
 # ============= PRODUCTS APIS =============
 
 @api_router.get("/products")
-async def get_products(city: Optional[str] = None, state: Optional[str] = None):
-    """Get all products with discount calculation, optionally filtered by city/state availability"""
-    # Build query filter
-    query_filter = {}
-    if city:
-        # Filter products that either have no city restriction or include the requested city
-        query_filter = {
-            "$or": [
-                {"available_cities": None},
-                {"available_cities": []},
-                {"available_cities": city}
-            ]
-        }
-    elif state:
-        # Filter products by state - get all cities in that state and filter
-        state_cities = await db.locations.find({"state": state}, {"name": 1, "_id": 0}).to_list(1000)
-        city_names = [city_doc["name"] for city_doc in state_cities]
-        query_filter = {
-            "$or": [
-                {"available_cities": None},
-                {"available_cities": []},
-                {"available_cities": {"$in": city_names}}
-            ]
-        }
-    
-    products = await db.products.find(query_filter, {"_id": 0}).to_list(1000)
+async def get_products(
+    request: Request,
+    city: Optional[str] = None,
+    state: Optional[str] = None,
+    view: str = "card",
+    fields: Optional[str] = None
+):
+    """
+    Get products with discount calculation, optionally filtered by city/state availability.
+    Returns the compact "card" projection by default; view=full returns whole
+    documents and fields=a,b,c returns just those fields.
+    """
+    if view not in ("card", "full"):
+        raise HTTPException(status_code=400, detail="view must be 'card' or 'full'")
+    projection = parse_fields(fields) or (None if view == "full" else "card")
     
-    # Calculate discounted prices for each product
-    for product in products:
-        discount_percentage = product.get('discount_percentage')
-        discount_expiry = product.get('discount_expiry_date')
+    async def produce():
+        snapshot = await catalog_cache.get_snapshot(db)
         
-        # Check if discount is valid
-        discount_active = False
-        if discount_percentage and discount_expiry:
-            try:
-                # Parse the date string
-                expiry_date_str = discount_expiry.replace('Z', '+00:00')
-                if 'T' in expiry_date_str:
-                    expiry_date = datetime.fromisoformat(expiry_date_str)
-                else:
-                    # If only date is provided (YYYY-MM-DD), add time and timezone
-                    expiry_date = datetime.fromisoformat(expiry_date_str + "T23:59:59+00:00")
-                
-                # Ensure timezone awareness for comparison
-                if expiry_date.tzinfo is None:
-                    expiry_date = expiry_date.replace(tzinfo=timezone.utc)
-                
-                if expiry_date > datetime.now(timezone.utc):
-                    discount_active = True
-            except:
-                pass
-        
-        product['discount_active'] = discount_active
-        
-        # Calculate discounted prices if discount is active
-        if discount_active and discount_percentage:
-            discounted_prices = []
-            for price_item in product.get('prices', []):
-                original_price = price_item['price']
-                discounted_price = round(original_price * (1 - discount_percentage / 100), 2)
-                discounted_prices.append({
-                    **price_item,
-                    'original_price': original_price,
-                    'discounted_price': discounted_price
-                })
-            product['discounted_prices'] = discounted_prices
+        # Unrestricted products plus those explicitly allowed, via the city index bitsets
+        if city:
+            return snapshot.for_city(city, projection)
+        if state:
+            return snapshot.for_state(state, projection)
+        
+        return snapshot.all(projection)
     
-    return products
+    variant = f"city={city}" if city else (f"state={state}" if state else "")
+    if projection != "card":
+        variant += f"&fields={','.join(projection) if projection else 'full'}"
+    return await http_cache.respond(request, db, ("products", "locations"), produce, variant)
+
+@api_router.get("/products/search")
+async def search_products(
+    request: Request,
+    q: str = "",
+    city: Optional[str] = None,
+    state: Optional[str] = None,
+    limit: int = 20
+):
+    """Typo-tolerant product search (English + Telugu), card projection, best matches first"""
+    limit = max(1, min(limit, 100))
+
+    async def produce():
+        snapshot = await catalog_cache.get_snapshot(db)
+        allowed = snapshot.available_ids(city, state)
+        product_ids = catalog_cache.search_index.search(q, limit, allowed)
+        return snapshot.pick(product_ids, "card")
+
+    variant = f"search={q}&city={city or ''}&state={state or ''}&limit={limit}"
+    return await http_cache.respond(request, db, ("products", "locations"), produce, variant)
+
+MAX_BATCH_PRODUCTS = 200
+
+async def batch_products(product_ids: list, view: str = "full", fields: Optional[str] = None) -> dict:
+    """Resolve many product ids from the catalog snapshot, in request order"""
+    if view not in ("card", "full"):
+        raise HTTPException(status_code=400, detail="view must be 'card' or 'full'")
+    # De-duplicate but keep the caller's order
+    product_ids = list(dict.fromkeys(pid for pid in product_ids if pid))
+    if len(product_ids) > MAX_BATCH_PRODUCTS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_PRODUCTS} ids per request")
+
+    snapshot = await catalog_cache.get_snapshot(db)
+    projection = parse_fields(fields) or (None if view == "full" else "card")
+    return FastJSONResponse({
+        "products": snapshot.pick(product_ids, projection),
+        "missing": [pid for pid in product_ids if pid not in snapshot.by_id]
+    })
+
+@api_router.get("/products/batch")
+async def get_products_batch(ids: str = "", view: str = "full", fields: Optional[str] = None):
+    """Get several products in one call - ids=a,b,c (discount and stock fields included)"""
+    return await batch_products(ids.split(","), view, fields)
+
+@api_router.post("/products/batch")
+async def post_products_batch(data: dict):
+    """Batch lookup for long id lists - body {"ids": [...], "view": "full", "fields": "a,b" or ["a", "b"]}"""
+    product_ids = data.get("ids") or []
+    if not isinstance(product_ids, list):
+        raise HTTPException(status_code=400, detail="ids must be a list")
+    fields = data.get("fields")
+    if isinstance(fields, list) and all(isinstance(name, str) for name in fields):
+        fields = ",".join(fields)
+    elif fields is not None and not isinstance(fields, str):
+        raise HTTPException(status_code=400, detail="fields must be a string or a list of strings")
+    view = data.get("view", "full")
+    if not isinstance(view, str):
+        raise HTTPException(status_code=400, detail="view must be 'card' or 'full'")
+    return await batch_products([str(pid) for pid in product_ids], view, fields)
+
+@api_router.get("/products/changes")
+async def get_product_changes(
+    since: int = 0,
+    city: Optional[str] = None,
+    state: Optional[str] = None,
+    view: str = "card",
+    fields: Optional[str] = None
+):
+    """
+    Catalog delta since a version the client already holds: changed products
+    plus deleted ids. Returns the full catalog (full=true) when since is 0, and
+    also reset=true when since is older than the change log or behind a gap
+    in it. Same city/state/view/fields options as /products.
+    """
+    if view not in ("card", "full"):
+        raise HTTPException(status_code=400, detail="view must be 'card' or 'full'")
+    projection = parse_fields(fields) or (None if view == "full" else "card")
+
+    snapshot = await catalog_cache.get_snapshot(db)
+    delta = await catalog_cache.changes.since(db, since, snapshot.version, snapshot.built_at)
+
+    if delta is None:
+        if city:
+            products = snapshot.for_city(city, projection)
+        elif state:
+            products = snapshot.for_state(state, projection)
+        else:
+            products = snapshot.all(projection)
+        return FastJSONResponse({
+            "version": snapshot.version,
+            "full": True,
+            "reset": since > 0,
+            "products": products,
+            "deleted": []
+        })
+
+    version, upserted, deleted = delta
+    # Products that left this city/state read as deleted for this client
+    allowed = snapshot.available_ids(city, state)
+    present = [pid for pid in sorted(upserted) if pid in snapshot.by_id and (allowed is None or pid in allowed)]
+    deleted = sorted(deleted | (upserted - set(present)))
+    return FastJSONResponse({
+        "version": version,
+        "full": False,
+        "reset": False,
+        "products": snapshot.pick(present, projection),
+        "deleted": deleted
+    })
 
 @api_router.get("/products/{product_id}")
 async def get_product(product_id: str):
     """Get a single product by ID with discount calculation"""
-    product = await db.products.find_one({"id": product_id}, {"_id": 0})
+    snapshot = await catalog_cache.get_snapshot(db)
+    product = snapshot.by_id.get(product_id)
     
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
     
-    # Calculate discounted prices for the product
-    discount_percentage = product.get('discount_percentage')
-    discount_expiry = product.get('discount_expiry_date')
-    
-    # Check if discount is valid
-    discount_active = False
-    if discount_percentage and discount_expiry:
-        try:
-            # Parse the date string
-            expiry_date_str = discount_expiry.replace('Z', '+00:00')
-            if 'T' in expiry_date_str:
-                expiry_date = datetime.fromisoformat(expiry_date_str)
-            else:
-                # If only date is provided (YYYY-MM-DD), add time and timezone
-                expiry_date = datetime.fromisoformat(expiry_date_str + "T23:59:59+00:00")
-            
-            # Ensure timezone awareness for comparison
-            if expiry_date.tzinfo is None:
-                expiry_date = expiry_date.replace(tzinfo=timezone.utc)
-            
-            if expiry_date > datetime.now(timezone.utc):
-                discount_active = True
-        except:
-            pass
-    
-    product['discount_active'] = discount_active
-    
-    # Calculate discounted prices if discount is active
-    if discount_active and discount_percentage:
-        discounted_prices = []
-        for price_item in product.get('prices', []):
-            original_price = price_item['price']
-            discounted_price = round(original_price * (1 - discount_percentage / 100), 2)
-            discounted_prices.append({
-                **price_item,
-                'original_price': original_price,
-                'discounted_price': discounted_price
-            })
-        product['discounted_prices'] = discounted_prices
-    
-    return product
+    return FastJSONResponse(product)
 
 @api_router.post("/products")
 async def create_product(product: Product, current_user: dict = Depends(get_current_user)):
     """Create new product (Admin only)"""
     product_dict = product.model_dump()
+    discount_fields = discount_update(product_dict)
+    product_dict.update(discount_fields["$set"])
     await db.products.insert_one(product_dict)
     product_dict.pop("_id", None)
+    if product_dict["discount_active"]:
+        discount_scheduler.schedule(product_dict["id"], product_dict["discount_expires_at"])
+    await catalog_cache.invalidate(db, [product_dict["id"]])
     return {"message": "Product created successfully", "product": product_dict}
 
 @api_router.put("/products/{product_id}")
 async def update_product(product_id: str, product: Product, current_user: dict = Depends(get_current_user)):
     """Update product (Admin only)"""
     product_dict = product.model_dump()
-    result = await db.products.update_one({"id": product_id}, {"$set": product_dict})
+    
+    # Prices or discount may have changed - re-materialize discount state
+    update = discount_update(product_dict)
+    update["$set"] = {**product_dict, **update["$set"]}
+    result = await db.products.update_one({"id": product_id}, update)
     
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Product not found")
     
+    if update["$set"]["discount_active"]:
+        discount_scheduler.schedule(product_id, update["$set"]["discount_expires_at"])
+    # The body may carry a different id - log both so the old one reads as deleted
+    await catalog_cache.invalidate(db, {product_id, product_dict.get("id") or product_id})
+    
     return {"message": "Product updated successfully"}
 
 @api_router.delete("/products/{product_id}")
@@ -726,8 +898,22 @@ async def delete_product(product_id: str, current_user: dict = Depends(get_curre
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Product not found")
     
+    await catalog_cache.invalidate(db, deleted=[product_id])
+    
     return {"message": "Product deleted successfully"}
 
+@api_router.get("/admin/cache/stats")
+async def get_cache_stats(current_user: dict = Depends(get_current_user)):
+    """Catalog cache hit/miss/rebuild counters (Admin only)"""
+    if not current_user.get("is_admin"):
+        raise HTTPException(status_code=403, detail="Admin access required")
+
+    return {
+        "catalog": catalog_cache.stats(),
+        "http": http_cache.stats(),
+        "resource_versions": resource_versions.snapshot()
+    }
+
 # ============= DISCOUNT APIS =============
 
 @api_router.post("/admin/products/{product_id}/discount")
@@ -739,35 +925,33 @@ async def add_discount(product_id: str, discount: DiscountUpdate, current_user:
     
     # Validate expiry date is in the future
     try:
-        # Parse the date string
-        expiry_date_str = discount.discount_expiry_date.replace('Z', '+00:00')
-        if 'T' in expiry_date_str:
-            expiry_date = datetime.fromisoformat(expiry_date_str)
-        else:
-            # If only date is provided (YYYY-MM-DD), add time and timezone
-            expiry_date = datetime.fromisoformat(expiry_date_str + "T23:59:59+00:00")
-        
-        # Ensure timezone awareness for comparison
-        if expiry_date.tzinfo is None:
-            expiry_date = expiry_date.replace(tzinfo=timezone.utc)
-        
-        if expiry_date <= datetime.now(timezone.utc):
-            raise HTTPException(status_code=400, detail="Expiry date must be in the future")
+        expiry_date = parse_discount_expiry(discount.discount_expiry_date)
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid date format")
     
-    # Update product
-    result = await db.products.update_one(
-        {"id": product_id},
-        {"$set": {
-            "discount_percentage": discount.discount_percentage,
-            "discount_expiry_date": discount.discount_expiry_date
-        }}
-    )
+    if expiry_date is None or expiry_date <= datetime.now(timezone.utc):
+        raise HTTPException(status_code=400, detail="Expiry date must be in the future")
+    
+    product = await db.products.find_one({"id": product_id}, {"_id": 0, "prices": 1})
+    if not product:
+        raise HTTPException(status_code=404, detail="Product not found")
+    
+    # Store the parsed expiry and discounted prices alongside the raw fields
+    discount_fields = {
+        "discount_percentage": discount.discount_percentage,
+        "discount_expiry_date": discount.discount_expiry_date
+    }
+    update = discount_update({**product, **discount_fields})
+    update["$set"].update(discount_fields)
+    
+    result = await db.products.update_one({"id": product_id}, update)
     
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Product not found")
     
+    discount_scheduler.schedule(product_id, expiry_date)
+    await catalog_cache.invalidate(db, [product_id])
+    
     return {"message": "Discount added successfully"}
 
 @api_router.delete("/admin/products/{product_id}/discount")
@@ -775,18 +959,32 @@ async def remove_discount(product_id: str, current_user: dict = Depends(get_curr
     """Remove discount from a product (Admin only)"""
     result = await db.products.update_one(
         {"id": product_id},
-        {"$unset": {"discount_percentage": "", "discount_expiry_date": ""}}
+        {
+            "$set": {"discount_active": False},
+            "$unset": {
+                "discount_percentage": "",
+                "discount_expiry_date": "",
+                "discount_expires_at": "",
+                "discounted_prices": ""
+            }
+        }
     )
     
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Product not found")
     
+    await catalog_cache.invalidate(db, [product_id])
+    
     return {"message": "Discount removed successfully"}
 
 @api_router.get("/admin/products/discounts")
 async def get_products_with_discounts(current_user: dict = Depends(get_current_user)):
-    """Get all products with discount information (Admin only)"""
-    products = await db.products.find({}, {"_id": 0}).to_list(1000)
+    """Get all products that carry a discount, soonest expiry first (Admin only)"""
+    # Served by the sparse discount_expires_at index - undiscounted products are never scanned
+    products = await db.products.find(
+        {"discount_expires_at": {"$exists": True}},
+        PRODUCT_PROJECTION
+    ).sort("discount_expires_at", 1).to_list(1000)
     return products
 
 # ============= INVENTORY MANAGEMENT APIS =============
@@ -807,14 +1005,17 @@ async def update_inventory(product_id: str, data: dict, current_user: dict = Dep
         "out_of_stock": inventory_count == 0
     }
     
+    # The admin now owns the flag - a later stock restore must not clear it
     result = await db.products.update_one(
         {"id": product_id},
-        {"$set": update_data}
+        {"$set": update_data, "$unset": {"out_of_stock_txn": ""}}
     )
     
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Product not found")
     
+    await catalog_cache.invalidate(db, [product_id])
+    
     return {"message": "Inventory updated successfully"}
 
 @api_router.get("/admin/products/{product_id}/stock-status")
@@ -835,14 +1036,17 @@ async def toggle_stock_status(product_id: str, data: dict, current_user: dict =
     """Toggle out of stock status (Admin only)"""
     out_of_stock = data.get("out_of_stock", False)
     
+    # Set by hand - a later stock restore must not clear it
     result = await db.products.update_one(
         {"id": product_id},
-        {"$set": {"out_of_stock": out_of_stock}}
+        {"$set": {"out_of_stock": out_of_stock}, "$unset": {"out_of_stock_txn": ""}}
     )
     
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Product not found")
     
+    await catalog_cache.invalidate(db, [product_id])
+    
     return {"message": "Stock status updated successfully"}
 
 @api_router.put("/admin/products/{product_id}/available-cities")
@@ -862,6 +1066,8 @@ async def update_available_cities(product_id: str, data: dict, current_user: dic
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Product not found")
     
+    await catalog_cache.invalidate(db, [product_id])
+    
     return {"message": "Available cities updated successfully"}
 
 # ============= BEST SELLER APIS =============
@@ -870,6 +1076,7 @@ async def update_available_cities(product_id: str, data: dict, current_user: dic
 async def update_best_sellers(data: dict, current_user: dict = Depends(get_current_user)):
     """Bulk update best sellers (Admin only)"""
     product_ids = data.get("product_ids", [])
+    previous_ids = await db.products.distinct("id", {"isBestSeller": True})
     
     # Remove best seller flag from all products
     await db.products.update_many({}, {"$set": {"isBestSeller": False}})
@@ -881,12 +1088,14 @@ async def update_best_sellers(data: dict, current_user: dict = Depends(get_curre
             {"$set": {"isBestSeller": True}}
         )
     
+    await catalog_cache.invalidate(db, set(previous_ids) | set(product_ids))
+    
     return {"message": "Best sellers updated successfully"}
 
 @api_router.get("/admin/best-sellers")
 async def get_best_sellers(current_user: dict = Depends(get_current_user)):
     """Get all best seller products (Admin only)"""
-    products = await db.products.find({"isBestSeller": True}, {"_id": 0}).to_list(1000)
+    products = await db.products.find({"isBestSeller": True}, PRODUCT_PROJECTION).to_list(1000)
     return products
 
 # ============= FESTIVAL PRODUCT APIS =============
@@ -903,24 +1112,28 @@ async def set_festival_product(data: dict, current_user: dict = Depends(get_curr
             {"$set": {"key": "festival_product", "product_id": product_id}},
             upsert=True
         )
+        await resource_versions.bump(db, "festival_product")
         return {"message": "Festival product set successfully"}
     else:
         # Remove festival product
         await db.settings.delete_one({"key": "festival_product"})
+        await resource_versions.bump(db, "festival_product")
         return {"message": "Festival product removed successfully"}
 
 @api_router.get("/admin/festival-product")
-async def get_festival_product():
+async def get_festival_product(request: Request):
     """Get current festival product (Public API)"""
-    setting = await db.settings.find_one({"key": "festival_product"}, {"_id": 0})
-    
-    if not setting:
-        return None
-    
-    product_id = setting.get("product_id")
-    product = await db.products.find_one({"id": product_id}, {"_id": 0})
+    async def produce():
+        setting = await db.settings.find_one({"key": "festival_product"}, {"_id": 0})
+        
+        if not setting:
+            return None
+        
+        snapshot = await catalog_cache.get_snapshot(db)
+        return snapshot.by_id.get(setting.get("product_id"))
     
-    return product
+    # The response embeds the product, so catalog writes change it too
+    return await http_cache.respond(request, db, ("festival_product", "products"), produce)
 
 # ============= FESTIVAL PRODUCTS (BULK SELECTION LIKE BEST SELLERS) =============
 
@@ -928,6 +1141,7 @@ async def get_festival_product():
 async def update_festival_products(data: dict, current_user: dict = Depends(get_current_user)):
     """Bulk update festival products (Admin only) - Similar to best sellers"""
     product_ids = data.get("product_ids", [])
+    previous_ids = await db.products.distinct("id", {"isFestival": True})
     
     # Remove festival flag from all products
     await db.products.update_many({}, {"$set": {"isFestival": False}})
@@ -939,12 +1153,14 @@ async def update_festival_products(data: dict, current_user: dict = Depends(get_
             {"$set": {"isFestival": True}}
         )
     
+    await catalog_cache.invalidate(db, set(previous_ids) | set(product_ids))
+    
     return {"message": "Festival products updated successfully"}
 
 @api_router.get("/admin/festival-products")
 async def get_festival_products(current_user: dict = Depends(get_current_user)):
     """Get all festival products (Admin only)"""
-    products = await db.products.find({"isFestival": True}, {"_id": 0}).to_list(1000)
+    products = await db.products.find({"isFestival": True}, PRODUCT_PROJECTION).to_list(1000)
     return products
 
 @api_router.put("/admin/products/{product_id}/festival")
@@ -960,6 +1176,8 @@ async def toggle_product_festival(product_id: str, data: dict, current_user: dic
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Product not found")
     
+    await catalog_cache.invalidate(db, [product_id])
+    
     return {"message": f"Product festival status updated to {is_festival}"}
 
 # ============= FREE DELIVERY SETTINGS API =============
@@ -979,18 +1197,22 @@ async def set_free_delivery_threshold(data: dict, current_user: dict = Depends(g
         {"$set": {"key": "free_delivery", "threshold": float(threshold), "enabled": bool(enabled)}},
         upsert=True
     )
+    await resource_versions.bump(db, "free_delivery")
     return {"message": "Free delivery settings updated successfully", "threshold": threshold, "enabled": enabled}
 
 @api_router.get("/settings/free-delivery")
-async def get_free_delivery_settings():
+async def get_free_delivery_settings(request: Request):
     """Get free delivery settings (Public API)"""
-    setting = await db.settings.find_one({"key": "free_delivery"}, {"_id": 0})
-    
-    if not setting:
-        # Default: Free delivery enabled for orders >= Rs.1000
-        return {"enabled": True, "threshold": 1000}
+    async def produce():
+        setting = await db.settings.find_one({"key": "free_delivery"}, {"_id": 0})
+        
+        if not setting:
+            # Default: Free delivery enabled for orders >= Rs.1000
+            return {"enabled": True, "threshold": 1000}
+        
+        return {"enabled": setting.get("enabled", True), "threshold": setting.get("threshold", 1000)}
     
-    return {"enabled": setting.get("enabled", True), "threshold": setting.get("threshold", 1000)}
+    return await http_cache.respond(request, db, ("free_delivery",), produce)
 
 # ============= IMAGE UPLOAD API =============
 
@@ -1031,17 +1253,48 @@ async def upload_image_alias(file: UploadFile = File(...), current_user: dict =
 
 # ============= ORDERS APIS =============
 
+async def record_order_changes(*order_ids: str):
+    """Fold order changes into the analytics rollups and queue them for the fact store"""
+    try:
+        await sales_rollups.sync(db, order_ids)
+    except Exception as e:
+        # scripts/rebuild_sales_rollups.py repairs a missed update
+        logger.error(f"Failed to update sales rollups for {order_ids}: {str(e)}")
+    try:
+        await order_facts.mark(db, order_ids)
+    except Exception as e:
+        logger.error(f"Failed to queue order facts for {order_ids}: {str(e)}")
+
 @api_router.post("/orders")
-async def create_order(order_data: OrderCreate, current_user: dict = Depends(get_current_user_optional)):
+async def create_order(
+    order_data: OrderCreate,
+    current_user: dict = Depends(get_current_user_optional),
+    idempotency_key: Optional[str] = Header(None)
+):
     """Create new order - allows guest checkout"""
+    return await idempotency.run(
+        db, "orders", idempotency_key,
+        [current_user.get("id") if current_user else None, order_data.model_dump()],
+        lambda: _create_order(order_data, current_user)
+    )
+
+async def _create_order(order_data: OrderCreate, current_user: Optional[dict]):
     try:
         print(f"DEBUG: Received order data: {order_data.model_dump()}")
         print(f"DEBUG: Current user: {current_user}")
         
+        # Load every cart product in one round trip; reused for the inventory step
+        cart_product_ids = list({item.product_id for item in order_data.items})
+        cart_products = await db.products.find(
+            {"id": {"$in": cart_product_ids}},
+            {"_id": 0, "id": 1, "available_cities": 1, "out_of_stock": 1, "inventory_count": 1}
+        ).to_list(None)
+        products_by_id = {product["id"]: product for product in cart_products}
+        
         # Check city availability and inventory for all items
         unavailable_products = []
         for item in order_data.items:
-            product = await db.products.find_one({"id": item.product_id})
+            product = products_by_id.get(item.product_id)
             if product:
                 # Check if product is available for delivery to the customer's city
                 available_cities = product.get("available_cities")
@@ -1067,7 +1320,7 @@ async def create_order(order_data: OrderCreate, current_user: dict = Depends(get
             )
         
         # Generate order ID and tracking code
-        order_id = generate_order_id()
+        order_id = await order_ids.next_id(db)
         tracking_code = generate_tracking_code()
         
         # Use city as location if location is not provided
@@ -1179,40 +1432,52 @@ async def create_order(order_data: OrderCreate, current_user: dict = Depends(get
             "distance_from_guntur": order_data.distance_from_guntur if hasattr(order_data, 'distance_from_guntur') else None
         }
         
-        # If custom city request, create a city suggestion entry
-        if custom_city_request:
-            suggestion_id = str(uuid.uuid4())
-            city_suggestion = {
-                "id": suggestion_id,
-                "city": order_data.city,
-                "state": order_data.state,
-                "customer_name": order_data.customer_name,
-                "phone": order_data.phone,
-                "email": order_data.email,
-                "status": "pending",
-                "order_id": order_id,
-                "created_at": datetime.now(timezone.utc)
-            }
-            await db.city_suggestions.insert_one(city_suggestion)
-            print(f"📝 City suggestion created: {suggestion_id} for {order_data.city}, {order_data.state}")
+        # Take stock for inventory-tracked products in one conditional bulk write
+        # (all or nothing - concurrent checkouts cannot oversell). Online orders
+        # hold it only until payment; the sweeper releases abandoned checkouts.
+        inventory_quantities = {
+            product_id: quantity
+            for product_id, quantity in cart_quantities(order_data.items).items()
+            if products_by_id.get(product_id, {}).get("inventory_count") is not None
+        }
+        try:
+            inventory_changed = await reservations.hold(
+                db, order, inventory_quantities,
+                expires=holds_expire(order_data.payment_method, custom_city_request)
+            )
+        except InsufficientInventory as e:
+            names = ", ".join(item.name for item in order_data.items if item.product_id in e.product_ids)
+            raise HTTPException(status_code=400, detail=f"Insufficient inventory for {names}")
         
-        await db.orders.insert_one(order)
+        try:
+            # If custom city request, create a city suggestion entry
+            if custom_city_request:
+                suggestion_id = str(uuid.uuid4())
+                city_suggestion = {
+                    "id": suggestion_id,
+                    "city": order_data.city,
+                    "state": order_data.state,
+                    "customer_name": order_data.customer_name,
+                    "phone": order_data.phone,
+                    "email": order_data.email,
+                    "status": "pending",
+                    "order_id": order_id,
+                    "created_at": datetime.now(timezone.utc).isoformat()
+                }
+                await db.city_suggestions.insert_one(city_suggestion)
+                print(f"📝 City suggestion created: {suggestion_id} for {order_data.city}, {order_data.state}")
+            
+            await db.orders.insert_one(order)
+        except Exception:
+            # Nothing was saved - give the stock back
+            await reservations.release(db, order_id)
+            raise
         
-        # Update inventory for each item
-        for item in order_data.items:
-            product = await db.products.find_one({"id": item.product_id})
-            if product and product.get("inventory_count") is not None:
-                new_count = product["inventory_count"] - item.quantity
-                update_data = {"inventory_count": max(0, new_count)}
-                
-                # Mark as out of stock if inventory reaches 0
-                if new_count <= 0:
-                    update_data["out_of_stock"] = True
-                
-                await db.products.update_one(
-                    {"id": item.product_id},
-                    {"$set": update_data}
-                )
+        await record_order_changes(order_id)
+        
+        # Stock levels are part of the cached catalog
+        if inventory_changed:
+            await catalog_cache.invalidate_stock(db, inventory_changed)
         
         # Save user details for future orders
         saved_details = {
@@ -1274,13 +1539,14 @@ async def create_order(order_data: OrderCreate, current_user: dict = Depends(get
         # Customer will receive confirmation that order has been placed
         if order_data.email:
             try:
-                email_sent = await send_order_confirmation_email_gmail(order_data.email, {**email_data, "order_status": order_status, "payment_status": payment_status})
-                if email_sent:
-                    logger.info(f"✅ Order confirmation email sent successfully to {order_data.email} for order {order_id}")
-                else:
-                    logger.warning(f"⚠️ Order confirmation email failed for {order_data.email}")
+                await email_outbox.enqueue(
+                    db, "order_confirmation", order_data.email,
+                    {**email_data, "order_status": order_status, "payment_status": payment_status},
+                    dedupe_key=f"order_confirmation:{order_id}"
+                )
+                logger.info(f"📧 Order confirmation email queued for {order_data.email} for order {order_id}")
             except Exception as email_error:
-                logger.error(f"❌ Failed to send order confirmation email: {str(email_error)}")
+                logger.error(f"❌ Failed to queue order confirmation email: {str(email_error)}")
         
         # Remove MongoDB _id field before returning
         order.pop("_id", None)
@@ -1305,11 +1571,25 @@ async def create_order(order_data: OrderCreate, current_user: dict = Depends(get
         logger.error(f"Traceback: {traceback.format_exc()}")
         raise HTTPException(status_code=500, detail=f"Failed to create order: {str(e)}")
 
+async def _missing_order_error(order_id: str) -> HTTPException:
+    """404 - or 409 when the order has moved to the archive, where it is read-only"""
+    if await db[ARCHIVE_COLLECTION].find_one({"order_id": order_id}, {"_id": 1}):
+        return HTTPException(status_code=409, detail="Order is archived and can no longer be changed")
+    return HTTPException(status_code=404, detail="Order not found")
+
+async def _find_open_order(order_id: str, projection: Optional[dict] = None) -> dict:
+    """An order that may still change (lives in db.orders); raises 404/409 otherwise"""
+    order = await db.orders.find_one({"order_id": order_id}, projection or {"_id": 0})
+    if not order:
+        raise await _missing_order_error(order_id)
+    return order
+
 @api_router.get("/orders/track/{identifier}")
 async def track_order(identifier: str):
     """Track order by order_id, tracking_code, phone number, or email (public API)"""
     # Check if identifier is order_id or tracking_code (return single order)
-    order = await db.orders.find_one(
+    order = await order_archive.find_one(
+        db,
         {"$or": [
             {"order_id": identifier}, 
             {"tracking_code": identifier}
@@ -1321,21 +1601,58 @@ async def track_order(identifier: str):
         return {"orders": [order], "total": 1}
     
     # If not found by order_id/tracking_code, search by phone or email (return all orders)
-    orders = await db.orders.find(
+    orders = await order_archive.find(
+        db,
         {"$or": [
             {"phone": identifier},
             {"email": identifier}
         ]},
-        {"_id": 0}
-    ).sort("order_date", -1).to_list(length=100)  # Sort by newest first, limit 100
+        100  # Newest first, limit 100
+    )
     
     if not orders:
         raise HTTPException(status_code=404, detail="Order not found")
     
-    return {"orders": orders, "total": len(orders)}
+    return FastJSONResponse({"orders": orders, "total": len(orders)})
 
 # ============= RAZORPAY PAYMENT APIS =============
 
+STOCK_GONE_DETAIL = "Payment received, but the items are no longer in stock - the order has been flagged for a refund"
+
+async def _settle_paid_order(order: dict, payment_fields: dict) -> bool:
+    """
+    Record a payment and make the order's stock permanent. A hold that lapsed
+    first is taken again; if the stock is gone (or the order was cancelled
+    otherwise) the payment is kept and the order flagged for a refund
+    instead of confirmed. Returns whether the order was confirmed.
+    """
+    order_id = order["order_id"]
+    reopenable = not order.get("cancelled") or order.get("cancel_reason") == EXPIRED_CANCEL_REASON
+    confirmed = reopenable and await reservations.commit(db, order_id)
+    update = {**payment_fields, "payment_status": "completed"}
+    cleared = {}
+    if confirmed:
+        # The sweeper may have cancelled it while the payment was in flight
+        update.update({"order_status": "confirmed", "cancelled": False, "cancel_reason": None, "cancelled_at": None})
+        cleared = {"needs_review": "", "refund_status": "", "review_reason": ""}
+    else:
+        update.update({
+            "order_status": "cancelled",
+            "cancelled": True,
+            "needs_review": True,
+            "refund_status": "pending",
+            "review_reason": "Paid after its stock hold was released and the stock is gone" if reopenable
+                             else "Paid after the order was cancelled"
+        })
+        if not order.get("cancelled"):
+            update.update({"cancel_reason": "Out of stock when payment completed",
+                           "cancelled_at": datetime.now(timezone.utc).isoformat()})
+    await db.orders.update_one({"order_id": order_id}, {"$set": update, **({"$unset": cleared} if cleared else {})})
+    await record_order_changes(order_id)
+    if not confirmed:
+        logger.error(f"💸 Order {order_id} was paid but cannot be fulfilled - flagged for refund")
+    return confirmed
+
 @api_router.post("/payment/create-razorpay-order")
 async def create_razorpay_order(data: dict):
     """Create Razorpay order for payment"""
@@ -1372,8 +1689,13 @@ async def create_razorpay_order(data: dict):
         raise HTTPException(status_code=500, detail=f"Failed to create payment order: {str(e)}")
 
 @api_router.post("/payment/verify-razorpay-payment")
-async def verify_razorpay_payment(data: dict):
+async def verify_razorpay_payment(data: dict, idempotency_key: Optional[str] = Header(None)):
     """Verify Razorpay payment signature"""
+    return await idempotency.run(
+        db, "verify-razorpay-payment", idempotency_key, data, lambda: _verify_razorpay_payment(data)
+    )
+
+async def _verify_razorpay_payment(data: dict):
     try:
         razorpay_order_id = data.get("razorpay_order_id")
         razorpay_payment_id = data.get("razorpay_payment_id")
@@ -1394,20 +1716,16 @@ async def verify_razorpay_payment(data: dict):
             logger.error(f"Payment signature verification failed for order {order_id}")
             raise HTTPException(status_code=400, detail="Invalid payment signature")
         
-        # Update order payment status and order status
-        result = await db.orders.update_one(
-            {"order_id": order_id},
-            {"$set": {
-                "payment_status": "completed",
-                "order_status": "confirmed",
-                "razorpay_order_id": razorpay_order_id,
-                "razorpay_payment_id": razorpay_payment_id,
-                "payment_verified_at": datetime.now(timezone.utc).isoformat()
-            }}
-        )
+        order = await _find_open_order(order_id, {"_id": 0, "order_id": 1, "cancelled": 1, "cancel_reason": 1})
         
-        if result.matched_count == 0:
-            raise HTTPException(status_code=404, detail="Order not found")
+        # Paid - the stock hold becomes permanent, or the order is flagged for a refund
+        confirmed = await _settle_paid_order(order, {
+            "razorpay_order_id": razorpay_order_id,
+            "razorpay_payment_id": razorpay_payment_id,
+            "payment_verified_at": datetime.now(timezone.utc).isoformat()
+        })
+        if not confirmed:
+            raise HTTPException(status_code=409, detail=STOCK_GONE_DETAIL)
         
         # Get updated order
         order = await db.orders.find_one({"order_id": order_id}, {"_id": 0})
@@ -1415,10 +1733,14 @@ async def verify_razorpay_payment(data: dict):
         # Send confirmation email
         if order and order.get("email"):
             try:
-                send_order_confirmation_email_gmail(order)
-                logger.info(f"Order confirmation email sent to {order.get('email')} for order {order_id}")
+                # Usually already queued at checkout - the dedupe key makes this a no-op then
+                await email_outbox.enqueue(
+                    db, "order_confirmation", order["email"],
+                    {**order, "order_date": order.get("order_date") or datetime.now().strftime("%B %d, %Y")},
+                    dedupe_key=f"order_confirmation:{order_id}"
+                )
             except Exception as email_error:
-                logger.error(f"Failed to send confirmation email: {str(email_error)}")
+                logger.error(f"Failed to queue confirmation email: {str(email_error)}")
         
         logger.info(f"Payment verified and order {order_id} updated successfully")
         
@@ -1435,19 +1757,35 @@ async def verify_razorpay_payment(data: dict):
         raise HTTPException(status_code=500, detail=f"Failed to verify payment: {str(e)}")
 
 @api_router.get("/orders/user/{user_id}")
-async def get_user_orders(user_id: str, current_user: dict = Depends(get_current_user)):
-    """Get all orders for a user"""
+async def get_user_orders(
+    user_id: str,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    include_total: bool = False,
+    current_user: dict = Depends(get_current_user)
+):
+    """Get a user's orders, newest first - {items, next[, total]}; pass next back as cursor"""
     if user_id != current_user["id"]:
         raise HTTPException(status_code=403, detail="Access denied")
     
-    orders = await db.orders.find({"user_id": user_id}, {"_id": 0}).sort("created_at", -1).to_list(100)
-    return orders
+    # Archived orders continue the same history
+    page = await paginate_union([db.orders, db[ARCHIVE_COLLECTION]], {"user_id": user_id}, limit, cursor, include_total)
+    return FastJSONResponse(page)
 
 @api_router.get("/orders")
-async def get_all_orders(current_user: dict = Depends(get_current_user)):
-    """Get all orders (Admin only)"""
-    orders = await db.orders.find({}, {"_id": 0}).sort("created_at", -1).to_list(1000)
-    return orders
+async def get_all_orders(
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    include_total: bool = False,
+    include_archived: bool = False,
+    current_user: dict = Depends(get_current_user)
+):
+    """Get all orders, newest first (Admin only) - {items, next[, total]}; archived orders only on request"""
+    if include_archived:
+        page = await paginate_union([db.orders, db[ARCHIVE_COLLECTION]], {}, limit, cursor, include_total)
+    else:
+        page = await paginate(db.orders, {}, limit, cursor, include_total)
+    return FastJSONResponse(page)
 
 @api_router.put("/orders/{order_id}/status")
 async def update_order_status(order_id: str, data: dict, current_user: dict = Depends(get_current_user)):
@@ -1457,9 +1795,7 @@ async def update_order_status(order_id: str, data: dict, current_user: dict = De
         raise HTTPException(status_code=400, detail="Status is required")
     
     # Get the order before updating to get old status and email
-    order = await db.orders.find_one({"order_id": order_id}, {"_id": 0})
-    if not order:
-        raise HTTPException(status_code=404, detail="Order not found")
+    order = await _find_open_order(order_id)
     
     old_status = order.get("order_status", "")
     
@@ -1469,7 +1805,9 @@ async def update_order_status(order_id: str, data: dict, current_user: dict = De
     )
     
     if result.matched_count == 0:
-        raise HTTPException(status_code=404, detail="Order not found")
+        raise await _missing_order_error(order_id)
+    
+    await record_order_changes(order_id)
     
     # Send email notification if status changed and email exists
     if old_status != status and order.get("email"):
@@ -1477,19 +1815,107 @@ async def update_order_status(order_id: str, data: dict, current_user: dict = De
             logger.info(f"Attempting to send order status update email to {order.get('email')} for order {order_id}")
             # Update order data with new status for email
             order["order_status"] = status
-            email_sent = await send_order_status_update_email(order["email"], order, old_status, status)
-            if email_sent:
-                logger.info(f"✅ Order status update email sent successfully to {order.get('email')}")
-            else:
-                logger.warning(f"⚠️ Order status update email function returned False for {order.get('email')}")
+            await email_outbox.enqueue(
+                db, "order_status_update", order["email"], order, old_status, status,
+                dedupe_key=f"order_status:{order_id}:{status}"
+            )
+            logger.info(f"📧 Order status update email queued for {order.get('email')}")
         except Exception as e:
-            logger.error(f"❌ Failed to send order status update email: {str(e)}")
+            logger.error(f"❌ Failed to queue order status update email: {str(e)}")
             import traceback
             logger.error(f"Traceback: {traceback.format_exc()}")
             # Don't fail the request if email fails
     
     return {"message": "Order status updated successfully"}
 
+MAX_BULK_STATUS_ORDERS = 500
+
+@api_router.post("/admin/orders/bulk-status")
+async def bulk_update_order_status(data: BulkStatusUpdate, current_user: dict = Depends(get_current_user)):
+    """
+    Move many orders to one status (Admin only), e.g. marking a dispatch shipped.
+    One read, one bulk_write and one batch of queued emails for the lot;
+    per-order results: updated, unchanged, cancelled, not_found or conflict.
+    """
+    if not current_user.get("is_admin"):
+        raise HTTPException(status_code=403, detail="Admin access required")
+    status = data.status.strip()
+    if not status:
+        raise HTTPException(status_code=400, detail="Status is required")
+    if status == "cancelled":
+        # Cancelling releases held stock and restocks - that is the cancel endpoints' job
+        raise HTTPException(status_code=400, detail="Use the cancel endpoint to cancel orders")
+    order_ids = list(dict.fromkeys(oid for oid in data.order_ids if oid))
+    if not order_ids:
+        raise HTTPException(status_code=400, detail="order_ids is required")
+    if len(order_ids) > MAX_BULK_STATUS_ORDERS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_STATUS_ORDERS} orders per request")
+
+    orders = {
+        o["order_id"]: o
+        for o in await db.orders.find({"order_id": {"$in": order_ids}}, {"_id": 0}).to_list(len(order_ids))
+    }
+    missing = [oid for oid in order_ids if oid not in orders]
+    archived = set(await db[ARCHIVE_COLLECTION].distinct("order_id", {"order_id": {"$in": missing}})) if missing else set()
+    results = {}
+    ops = []
+    for order_id in order_ids:
+        order = orders.get(order_id)
+        if order is None:
+            results[order_id] = "archived" if order_id in archived else "not_found"
+        elif order.get("cancelled") or order.get("order_status") == "cancelled":
+            # Cancelled orders go through the cancel flow, never back into dispatch
+            results[order_id] = "cancelled"
+        elif order.get("order_status") == status:
+            results[order_id] = "unchanged"
+        else:
+            # Conditional on the status we read, so a concurrent change is not overwritten
+            ops.append(UpdateOne(
+                {"order_id": order_id, "order_status": order.get("order_status")},
+                {"$set": {"order_status": status}}
+            ))
+            results[order_id] = "updated"
+
+    updated = [oid for oid, result in results.items() if result == "updated"]
+    if ops:
+        result = await db.orders.bulk_write(ops, ordered=False)
+        if result.modified_count < len(ops):
+            # Someone else changed these in between - report which
+            applied = set(await db.orders.distinct("order_id", {"order_id": {"$in": updated}, "order_status": status}))
+            for order_id in updated:
+                if order_id not in applied:
+                    results[order_id] = "conflict"
+            updated = [oid for oid in updated if oid in applied]
+        await record_order_changes(*updated)
+
+    queued = 0
+    if data.notify and updated:
+        batch = []
+        for order_id in updated:
+            order = orders[order_id]
+            if order.get("email"):
+                batch.append({
+                    "to": order["email"],
+                    "args": [{**order, "order_status": status}, order.get("order_status", ""), status],
+                    "dedupe_key": f"order_status:{order_id}:{status}"
+                })
+        try:
+            queued = await email_outbox.enqueue_many(db, "order_status_update", batch)
+        except Exception as e:
+            # Don't fail the request if email fails
+            logger.error(f"❌ Failed to queue order status update emails: {str(e)}")
+
+    logger.info(f"📦 Bulk status '{status}': {len(updated)} of {len(order_ids)} order(s) updated, {queued} email(s) queued")
+    return {
+        "status": status,
+        "updated": len(updated),
+        "emails_queued": queued,
+        "results": [
+            {"order_id": oid, "result": results[oid], "previous_status": (orders.get(oid) or {}).get("order_status")}
+            for oid in order_ids
+        ]
+    }
+
 @api_router.put("/orders/{order_id}/cancel")
 async def cancel_order(order_id: str, data: dict, current_user: dict = Depends(get_current_user)):
     """Cancel order (Admin only)"""
@@ -1505,7 +1931,10 @@ async def cancel_order(order_id: str, data: dict, current_user: dict = Depends(g
     )
     
     if result.matched_count == 0:
-        raise HTTPException(status_code=404, detail="Order not found")
+        raise await _missing_order_error(order_id)
+    
+    await reservations.release(db, order_id)
+    await record_order_changes(order_id)
     
     return {"message": "Order cancelled successfully"}
 
@@ -1514,9 +1943,7 @@ async def cancel_order_customer(order_id: str, data: dict):
     """Cancel order by customer (20-minute window, Rs.20 fee)"""
     try:
         # Get the order
-        order = await db.orders.find_one({"order_id": order_id}, {"_id": 0})
-        if not order:
-            raise HTTPException(status_code=404, detail="Order not found")
+        order = await _find_open_order(order_id)
         
         # Check if already cancelled
         if order.get("cancelled", False):
@@ -1555,16 +1982,20 @@ async def cancel_order_customer(order_id: str, data: dict):
         )
         
         if result.matched_count == 0:
-            raise HTTPException(status_code=404, detail="Order not found")
+            raise await _missing_order_error(order_id)
+        
+        await reservations.release(db, order_id)
+        await record_order_changes(order_id)
         
         # Send cancellation email
         if order.get("email"):
             try:
-                # Import email function if needed
-                from gmail_service import send_order_cancellation_email
-                await send_order_cancellation_email(order["email"], order, cancellation_fee=20.0)
+                await email_outbox.enqueue(
+                    db, "order_cancellation", order["email"], order, cancellation_fee=20.0,
+                    dedupe_key=f"order_cancellation:{order_id}"
+                )
             except Exception as e:
-                logger.error(f"Failed to send cancellation email: {str(e)}")
+                logger.error(f"Failed to queue cancellation email: {str(e)}")
         
         return {
             "message": "Order cancelled successfully",
@@ -1578,13 +2009,16 @@ async def cancel_order_customer(order_id: str, data: dict):
         raise HTTPException(status_code=500, detail=f"Failed to cancel order: {str(e)}")
 
 @api_router.post("/orders/{order_id}/complete-payment")
-async def complete_payment(order_id: str, data: dict):
+async def complete_payment(order_id: str, data: dict, idempotency_key: Optional[str] = Header(None)):
     """Complete payment for pending orders (for custom city requests after approval)"""
+    return await idempotency.run(
+        db, "complete-payment", idempotency_key, [order_id, data], lambda: _complete_payment(order_id, data)
+    )
+
+async def _complete_payment(order_id: str, data: dict):
     try:
         # Get the order
-        order = await db.orders.find_one({"order_id": order_id}, {"_id": 0})
-        if not order:
-            raise HTTPException(status_code=404, detail="Order not found")
+        order = await _find_open_order(order_id)
         
         # Check if order is cancelled
         if order.get("cancelled", False):
@@ -1599,26 +2033,22 @@ async def complete_payment(order_id: str, data: dict):
         payment_sub_method = data.get("payment_sub_method", order.get("payment_sub_method"))
         
         # Update order with payment completion
-        result = await db.orders.update_one(
-            {"order_id": order_id},
-            {"$set": {
-                "payment_status": "completed",
-                "payment_method": payment_method,
-                "payment_sub_method": payment_sub_method,
-                "order_status": "confirmed"
-            }}
-        )
-        
-        if result.matched_count == 0:
-            raise HTTPException(status_code=404, detail="Order not found")
+        confirmed = await _settle_paid_order(order, {
+            "payment_method": payment_method,
+            "payment_sub_method": payment_sub_method
+        })
+        if not confirmed:
+            raise HTTPException(status_code=409, detail=STOCK_GONE_DETAIL)
         
         # Send payment confirmation email
         if order.get("email"):
             try:
-                from gmail_service import send_payment_completion_email
-                await send_payment_completion_email(order["email"], order)
+                await email_outbox.enqueue(
+                    db, "payment_completion", order["email"], order,
+                    dedupe_key=f"payment_completion:{order_id}"
+                )
             except Exception as e:
-                logger.error(f"Failed to send payment completion email: {str(e)}")
+                logger.error(f"Failed to queue payment completion email: {str(e)}")
         
         return {
             "message": "Payment completed successfully",
@@ -1637,9 +2067,7 @@ async def cancel_order_payment(order_id: str, data: dict = {}):
     """Cancel order immediately when payment is cancelled (no auth required)"""
     try:
         # Get the order
-        order = await db.orders.find_one({"order_id": order_id}, {"_id": 0})
-        if not order:
-            raise HTTPException(status_code=404, detail="Order not found")
+        order = await _find_open_order(order_id)
         
         # Only allow cancellation if payment is still pending
         if order.get("payment_status") != "pending":
@@ -1660,21 +2088,24 @@ async def cancel_order_payment(order_id: str, data: dict = {}):
         )
         
         if result.matched_count == 0:
-            raise HTTPException(status_code=404, detail="Order not found")
+            raise await _missing_order_error(order_id)
+        
+        # Put the held stock back on sale
+        await reservations.release(db, order_id)
+        await record_order_changes(order_id)
         
         logger.info(f"🚫 ORDER CANCELLED: {order_id} - Reason: {cancel_reason}")
         
         # Send cancellation email
         if order.get("email"):
             try:
-                from gmail_service import send_order_cancellation_email
-                email_sent = await send_order_cancellation_email(order.get("email"), order, cancel_reason)
-                if email_sent:
-                    logger.info(f"✅ Cancellation email sent successfully to {order.get('email')} for order {order_id}")
-                else:
-                    logger.warning(f"⚠️ Cancellation email failed for {order.get('email')}")
+                await email_outbox.enqueue(
+                    db, "order_cancellation", order.get("email"), order, cancel_reason,
+                    dedupe_key=f"order_cancellation:{order_id}"
+                )
+                logger.info(f"📧 Cancellation email queued for {order.get('email')} for order {order_id}")
             except Exception as email_error:
-                logger.error(f"❌ Failed to send cancellation email: {str(email_error)}")
+                logger.error(f"❌ Failed to queue cancellation email: {str(email_error)}")
         
         return {"message": "Order cancelled successfully"}
     except HTTPException:
@@ -1701,9 +2132,7 @@ async def update_order_admin_fields(order_id: str, data: dict, current_user: dic
         raise HTTPException(status_code=400, detail="No fields to update")
     
     # Get the order before updating to get old status and email
-    order = await db.orders.find_one({"order_id": order_id}, {"_id": 0})
-    if not order:
-        raise HTTPException(status_code=404, detail="Order not found")
+    order = await _find_open_order(order_id)
     
     old_status = order.get("order_status", "")
     old_payment_status = order.get("payment_status", "")
@@ -1714,7 +2143,10 @@ async def update_order_admin_fields(order_id: str, data: dict, current_user: dic
     )
     
     if result.matched_count == 0:
-        raise HTTPException(status_code=404, detail="Order not found")
+        raise await _missing_order_error(order_id)
+    
+    if "order_status" in update_fields or "payment_status" in update_fields:
+        await record_order_changes(order_id)
     
     # Send email notification if order status was changed and email exists
     if "order_status" in update_fields and old_status != update_fields["order_status"] and order.get("email"):
@@ -1724,13 +2156,13 @@ async def update_order_admin_fields(order_id: str, data: dict, current_user: dic
             order["order_status"] = update_fields["order_status"]
             if "payment_status" in update_fields:
                 order["payment_status"] = update_fields["payment_status"]
-            email_sent = await send_order_status_update_email(order["email"], order, old_status, update_fields["order_status"])
-            if email_sent:
-                logger.info(f"✅ Order status update email sent successfully to {order.get('email')}")
-            else:
-                logger.warning(f"⚠️ Order status update email function returned False for {order.get('email')}")
+            await email_outbox.enqueue(
+                db, "order_status_update", order["email"], order, old_status, update_fields["order_status"],
+                dedupe_key=f"order_status:{order_id}:{update_fields['order_status']}"
+            )
+            logger.info(f"📧 Order status update email queued for {order.get('email')}")
         except Exception as e:
-            logger.error(f"❌ Failed to send order status update email: {str(e)}")
+            logger.error(f"❌ Failed to queue order status update email: {str(e)}")
             import traceback
             logger.error(f"Traceback: {traceback.format_exc()}")
             # Don't fail the request if email fails
@@ -1746,14 +2178,13 @@ async def update_order_admin_fields(order_id: str, data: dict, current_user: dic
                 order["order_status"] = update_fields["order_status"]
             
             # Send email with order summary and payment status
-            from gmail_service import send_payment_status_update_email
-            email_sent = await send_payment_status_update_email(order["email"], order, old_payment_status, update_fields["payment_status"])
-            if email_sent:
-                logger.info(f"✅ Payment status update email sent successfully to {order.get('email')}")
-            else:
-                logger.warning(f"⚠️ Payment status update email function returned False for {order.get('email')}")
+            await email_outbox.enqueue(
+                db, "payment_status_update", order["email"], order, old_payment_status, update_fields["payment_status"],
+                dedupe_key=f"payment_status:{order_id}:{update_fields['payment_status']}"
+            )
+            logger.info(f"📧 Payment status update email queued for {order.get('email')}")
         except Exception as e:
-            logger.error(f"❌ Failed to send payment status update email: {str(e)}")
+            logger.error(f"❌ Failed to queue payment status update email: {str(e)}")
             import traceback
             logger.error(f"Traceback: {traceback.format_exc()}")
             # Don't fail the request if email fails
@@ -1761,68 +2192,100 @@ async def update_order_admin_fields(order_id: str, data: dict, current_user: dic
     return {"message": "Order updated successfully"}
 
 @api_router.get("/orders/analytics/summary")
-async def get_orders_analytics(current_user: dict = Depends(get_current_user)):
-    """Get order analytics and statistics"""
+async def get_orders_analytics(
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    city: Optional[str] = None,
+    state: Optional[str] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """Get order analytics and statistics, optionally for a date range (YYYY-MM-DD, inclusive) and city/state"""
     try:
-        # Get all orders
-        all_orders = await db.orders.find({}, {"_id": 0}).to_list(10000)
-        
-        # Filter out cancelled orders for sales calculations
-        non_cancelled_orders = [o for o in all_orders if not o.get("cancelled", False) and o.get("order_status") != "cancelled"]
-        
-        # Calculate statistics
-        total_orders = len(all_orders)
-        # Only sum sales from non-cancelled orders
-        total_sales = sum(order.get("total", 0) for order in non_cancelled_orders)
-        active_orders = len([o for o in non_cancelled_orders if o.get("order_status") != "delivered"])
-        cancelled_orders = len([o for o in all_orders if o.get("cancelled", False) or o.get("order_status") == "cancelled"])
-        completed_orders = len([o for o in non_cancelled_orders if o.get("order_status") == "delivered"])
-        
-        # Monthly sales - only include non-cancelled orders
-        from collections import defaultdict
-        monthly_sales = defaultdict(float)
-        monthly_orders = defaultdict(int)
-        
-        for order in non_cancelled_orders:
-            created_at = order.get("created_at", "")
-            if created_at:
-                try:
-                    order_date = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
-                    month_key = order_date.strftime("%Y-%m")
-                    monthly_sales[month_key] += order.get("total", 0)
-                    monthly_orders[month_key] += 1
-                except:
-                    pass
-        
-        # Top products - only include non-cancelled orders
-        product_counts = defaultdict(int)
-        for order in non_cancelled_orders:
-            for item in order.get("items", []):
-                product_counts[item.get("name", "Unknown")] += item.get("quantity", 0)
-        
-        top_products = sorted(product_counts.items(), key=lambda x: x[1], reverse=True)[:10]
-        
-        return {
-            "total_orders": total_orders,
-            "total_sales": total_sales,
-            "active_orders": active_orders,
-            "cancelled_orders": cancelled_orders,
-            "completed_orders": completed_orders,
-            "monthly_sales": dict(monthly_sales),
-            "monthly_orders": dict(monthly_orders),
-            "top_products": [{"name": name, "count": count} for name, count in top_products]
-        }
+        match = analytics_match(start, end, city, state)
+        if not match:
+            # Whole history - answered from the sales rollups
+            return FastJSONResponse(await sales_rollups.summary(db))
+        # Filtered - one $facet aggregation, only the figures cross the network
+        return FastJSONResponse(await aggregate_analytics(db, match))
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error getting analytics: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to get analytics: {str(e)}")
 
+@api_router.get("/admin/analytics/query")
+async def query_order_facts(
+    group_by: str = "city",
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    city: Optional[str] = None,
+    state: Optional[str] = None,
+    payment_method: Optional[str] = None,
+    order_status: Optional[str] = None,
+    include_cancelled: bool = False,
+    limit: int = DEFAULT_QUERY_LIMIT,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Ad-hoc sales breakdown (Admin only). group_by is a comma-separated list of
+    city, state, payment_method, order_status, payment_status, product, weight,
+    hour, weekday, day, month; start/end are inclusive dates (YYYY-MM-DD).
+    """
+    if not current_user.get("is_admin"):
+        raise HTTPException(status_code=403, detail="Admin access required")
+
+    dimensions = [d.strip() for d in group_by.split(",") if d.strip()]
+    filters = {name: value for name, value in (
+        ("city", city), ("state", state), ("payment_method", payment_method), ("order_status", order_status)
+    ) if value}
+    try:
+        await order_facts.refresh(db)
+    except Exception as e:
+        # Answer from what is already exported
+        logger.error(f"Failed to refresh order facts: {str(e)}")
+    return FastJSONResponse(await asyncio.to_thread(
+        order_facts.query, dimensions, start=start, end=end, filters=filters,
+        include_cancelled=include_cancelled or order_status == "cancelled", limit=limit
+    ))
+
+@api_router.get("/admin/orders/export")
+async def export_orders(
+    export_format: str = Query("csv", alias="format"),
+    start: Optional[str] = Query(None, alias="from"),
+    end: Optional[str] = Query(None, alias="to"),
+    compress: bool = False,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Download orders as csv, ndjson or xlsx, one row per item (Admin only).
+    from/to are inclusive dates (YYYY-MM-DD); compress=true gzips csv/ndjson.
+    Rows (archived orders included) are streamed straight from the cursors,
+    so any range is safe to export.
+    """
+    if not current_user.get("is_admin"):
+        raise HTTPException(status_code=403, detail="Admin access required")
+    if export_format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(EXPORT_FORMATS)}")
+
+    query = analytics_match(start, end)
+    # xlsx is already a zip archive
+    gzipped = compress and export_format != "xlsx"
+    filename = export_filename(export_format, start, end, gzipped)
+    logger.info(f"📤 Exporting orders as {filename}")
+    return StreamingResponse(
+        stream_orders_export([db.orders, db[ARCHIVE_COLLECTION]], query, export_format, gzipped),
+        media_type="application/gzip" if gzipped else EXPORT_FORMATS[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"', "Cache-Control": "no-store"}
+    )
+
 # ============= USER DETAILS API =============
 
 @api_router.get("/user-details/{identifier}")
 async def get_user_details(identifier: str):
     """Get user details by phone or email from most recent order"""
     # Search for the most recent order with this phone or email
-    order = await db.orders.find_one(
+    order = await order_archive.find_one(
+        db,
         {"$or": [
             {"phone": identifier},
             {"email": identifier}
@@ -1851,8 +2314,12 @@ async def get_user_details(identifier: str):
 # ============= LOCATIONS API =============
 
 @api_router.get("/locations")
-async def get_locations():
+async def get_locations(request: Request):
     """Get delivery locations with state information"""
+    return await http_cache.respond(request, db, ("locations",), load_locations)
+
+async def load_locations():
+    """Delivery locations from the database, or the built-in defaults"""
     # Check if custom locations exist in database
     locations = await db.locations.find({}, {"_id": 0}).to_list(1000)
     
@@ -1900,6 +2367,8 @@ async def update_locations(locations: List[Location], current_user: dict = Depen
         location_dicts = [loc.model_dump() for loc in locations]
         await db.locations.insert_many(location_dicts)
     
+    await catalog_cache.invalidate_locations(db)
+    
     return {"message": "Locations updated successfully"}
 
 @api_router.put("/admin/locations/{city_name}")
@@ -1947,6 +2416,8 @@ async def update_city_settings(
         
         await db.locations.insert_one(city_data)
     
+    await catalog_cache.invalidate_locations(db)
+    
     return {"message": f"Settings updated for {city_name}"}
 
 @api_router.delete("/admin/locations/{city_name}")
@@ -1957,6 +2428,8 @@ async def delete_location(city_name: str, current_user: dict = Depends(get_curre
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Location not found")
     
+    await catalog_cache.invalidate_locations(db)
+    
     return {"message": f"Location '{city_name}' deleted successfully"}
 
 # ============= CUSTOM CITY API =============
@@ -2052,6 +2525,7 @@ async def approve_custom_city(data: dict, current_user: dict = Depends(get_curre
         city_data["free_delivery_threshold"] = free_delivery_threshold
     
     await db.locations.insert_one(city_data)
+    await catalog_cache.invalidate_locations(db)
     
     # Check if there's a matching city suggestion and update its status + send email
     try:
@@ -2071,10 +2545,13 @@ async def approve_custom_city(data: dict, current_user: dict = Depends(get_curre
             # Send approval email if customer provided email
             if suggestion.get("email"):
                 try:
-                    await send_city_approval_email(suggestion["email"], suggestion)
-                    logger.info(f"City approval email sent to {suggestion['email']} for {city_name}, {state_name}")
+                    await email_outbox.enqueue(
+                        db, "city_approval", suggestion["email"], suggestion,
+                        dedupe_key=f"city_approval:{suggestion['id']}"
+                    )
+                    logger.info(f"City approval email queued for {suggestion['email']} for {city_name}, {state_name}")
                 except Exception as e:
-                    logger.error(f"Failed to send city approval email: {str(e)}")
+                    logger.error(f"Failed to queue city approval email: {str(e)}")
     except Exception as e:
         logger.error(f"Error updating city suggestion: {str(e)}")
         # Don't fail the approval if email/suggestion update fails
@@ -2090,20 +2567,23 @@ async def approve_custom_city(data: dict, current_user: dict = Depends(get_curre
 # ============= STATES API =============
 
 @api_router.get("/states")
-async def get_states():
+async def get_states(request: Request):
     """Get available states"""
-    # Check if custom states exist in database
-    states = await db.states.find({}, {"_id": 0}).to_list(1000)
-    
-    if not states:
-        # Return only AP and Telangana as default
-        default_states = [
-            {"name": "Andhra Pradesh", "enabled": True},
-            {"name": "Telangana", "enabled": True}
-        ]
-        return default_states
+    async def produce():
+        # Check if custom states exist in database
+        states = await db.states.find({}, {"_id": 0}).to_list(1000)
+        
+        if not states:
+            # Return only AP and Telangana as default
+            default_states = [
+                {"name": "Andhra Pradesh", "enabled": True},
+                {"name": "Telangana", "enabled": True}
+            ]
+            return default_states
+        
+        return states
     
-    return states
+    return await http_cache.respond(request, db, ("states",), produce)
 
 @api_router.get("/admin/states")
 async def get_admin_states(current_user: dict = Depends(get_current_user)):
@@ -2129,6 +2609,7 @@ async def add_state(state: State, current_user: dict = Depends(get_current_user)
         raise HTTPException(status_code=400, detail="State already exists")
     
     await db.states.insert_one(state.model_dump())
+    await resource_versions.bump(db, "states")
     return {"message": f"State '{state.name}' added successfully"}
 
 @api_router.put("/admin/states/{state_name}")
@@ -2143,6 +2624,8 @@ async def update_state(state_name: str, state: State, current_user: dict = Depen
         # If state doesn't exist, create it
         await db.states.insert_one({"name": state_name, "enabled": state.enabled})
     
+    await resource_versions.bump(db, "states")
+    
     return {"message": f"State '{state_name}' updated successfully"}
 
 @api_router.delete("/admin/states/{state_name}")
@@ -2153,6 +2636,8 @@ async def delete_state(state_name: str, current_user: dict = Depends(get_current
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="State not found")
     
+    await resource_versions.bump(db, "states")
+    
     return {"message": f"State '{state_name}' deleted successfully"}
 
 
@@ -2165,6 +2650,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# gzip/brotli for large responses not already compressed by http_cache
+app.add_middleware(CompressionMiddleware)
+
 # City Suggestion endpoint
 @api_router.post("/suggest-city")
 async def suggest_city(data: dict):
@@ -2257,20 +2745,21 @@ async def create_bug_report(
         raise HTTPException(status_code=500, detail=f"Failed to submit bug report: {str(e)}")
 
 @api_router.get("/admin/reports")
-async def get_all_reports(current_user: dict = Depends(get_current_user)):
-    """Get all bug reports (admin only)"""
+async def get_all_reports(
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    include_total: bool = False,
+    current_user: dict = Depends(get_current_user)
+):
+    """Get bug reports, newest first (admin only) - {items, next[, total]}"""
     try:
         if not current_user.get("is_admin"):
             raise HTTPException(status_code=403, detail="Admin access required")
         
-        reports = await db.bug_reports.find({}, {"_id": 0}).sort("created_at", -1).to_list(length=None)
-        
-        # Convert datetime to ISO string for JSON serialization
-        for report in reports:
-            if isinstance(report.get("created_at"), datetime):
-                report["created_at"] = report["created_at"].isoformat()
+        page = await paginate(db.bug_reports, {}, limit, cursor, include_total)
         
-        return reports
+        # Datetimes are encoded by FastJSONResponse in the same pass
+        return FastJSONResponse(page)
     except HTTPException:
         raise
     except Exception as e:
@@ -2350,9 +2839,12 @@ async def delete_report(
 @api_router.get("/admin/city-suggestions")
 async def get_city_suggestions(
     status: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    include_total: bool = False,
     current_user: dict = Depends(get_current_user)
 ):
-    """Get city suggestions with optional status filter (admin only)"""
+    """Get city suggestions with optional status filter, newest first (admin only) - {items, next[, total]}"""
     try:
         if not current_user.get("is_admin"):
             raise HTTPException(status_code=403, detail="Admin access required")
@@ -2362,19 +2854,9 @@ async def get_city_suggestions(
         if status and status in ["pending", "approved", "rejected"]:
             query["status"] = status
         
-        suggestions = await db.city_suggestions.find(
-            query, 
-            {"_id": 0}
-        ).sort("created_at", -1).to_list(length=None)
-        
-        # Convert datetime to ISO string for JSON serialization
-        for suggestion in suggestions:
-            if isinstance(suggestion.get("created_at"), datetime):
-                suggestion["created_at"] = suggestion["created_at"].isoformat()
-            if isinstance(suggestion.get("updated_at"), datetime):
-                suggestion["updated_at"] = suggestion["updated_at"].isoformat()
+        page = await paginate(db.city_suggestions, query, limit, cursor, include_total, iso_dates=True)
         
-        return suggestions
+        return FastJSONResponse(page)
     except HTTPException:
         raise
     except Exception as e:
@@ -2424,6 +2906,7 @@ async def update_city_suggestion_status(
                     city_data["free_delivery_threshold"] = free_delivery_threshold
                 
                 await db.locations.insert_one(city_data)
+                await catalog_cache.invalidate_locations(db)
                 logger.info(f"City {suggestion.get('city')}, {suggestion.get('state')} added to locations with charge Rs.{delivery_charge}")
         
         # Update suggestion status
@@ -2439,13 +2922,19 @@ async def update_city_suggestion_status(
         if suggestion.get("email"):
             try:
                 if status == "approved":
-                    await send_city_approval_email(suggestion["email"], suggestion)
-                    logger.info(f"City approval email sent to {suggestion['email']} for {suggestion.get('city')}, {suggestion.get('state')}")
+                    await email_outbox.enqueue(
+                        db, "city_approval", suggestion["email"], suggestion,
+                        dedupe_key=f"city_approval:{suggestion_id}"
+                    )
+                    logger.info(f"City approval email queued for {suggestion['email']} for {suggestion.get('city')}, {suggestion.get('state')}")
                 elif status == "rejected":
-                    await send_city_rejection_email(suggestion["email"], suggestion)
-                    logger.info(f"City rejection email sent to {suggestion['email']} for {suggestion.get('city')}, {suggestion.get('state')}")
+                    await email_outbox.enqueue(
+                        db, "city_rejection", suggestion["email"], suggestion,
+                        dedupe_key=f"city_rejection:{suggestion_id}"
+                    )
+                    logger.info(f"City rejection email queued for {suggestion['email']} for {suggestion.get('city')}, {suggestion.get('state')}")
             except Exception as e:
-                logger.error(f"Failed to send city status email: {str(e)}")
+                logger.error(f"Failed to queue city status email: {str(e)}")
                 # Don't fail the request if email fails
         
         return {"message": "City suggestion status updated successfully"}
@@ -2706,7 +3195,6 @@ async def send_otp_for_password_change(
         
         # Send OTP email using Gmail service
         try:
-            import smtplib
             from email.mime.text import MIMEText
             from email.mime.multipart import MIMEMultipart
             
@@ -2736,11 +3224,8 @@ async def send_otp_for_password_change(
             
             msg.attach(MIMEText(body, 'html'))
             
-            # Send email via Gmail SMTP
-            with smtplib.SMTP('smtp.gmail.com', 587) as server:
-                server.starttls()
-                server.login(gmail_email, gmail_password)
-                server.send_message(msg)
+            # Send email via the shared Gmail SMTP pool (off the event loop)
+            await asyncio.to_thread(deliver_message, msg)
             
             logger.info(f"OTP sent successfully to {otp_request.email}")
             
@@ -2893,12 +3378,7 @@ async def get_whatsapp_numbers(current_user: dict = Depends(get_current_user)):
         
         numbers = await db.whatsapp_numbers.find({}, {"_id": 0}).sort("created_at", 1).to_list(5)
         
-        # Convert datetime to ISO string
-        for num in numbers:
-            if isinstance(num.get("created_at"), datetime):
-                num["created_at"] = num["created_at"].isoformat()
-        
-        return numbers
+        return FastJSONResponse(numbers)
     except HTTPException:
         raise
     except Exception as e:
@@ -2932,6 +3412,7 @@ async def add_whatsapp_number(
         )
         
         await db.whatsapp_numbers.insert_one(new_number.model_dump())
+        await resource_versions.bump(db, "whatsapp_numbers")
         
         return {"message": "WhatsApp number added successfully", "id": new_number.id}
     except HTTPException:
@@ -2967,6 +3448,8 @@ async def update_whatsapp_number(
         if result.matched_count == 0:
             raise HTTPException(status_code=404, detail="WhatsApp number not found")
         
+        await resource_versions.bump(db, "whatsapp_numbers")
+        
         return {"message": "WhatsApp number updated successfully"}
     except HTTPException:
         raise
@@ -2989,6 +3472,8 @@ async def delete_whatsapp_number(
         if result.deleted_count == 0:
             raise HTTPException(status_code=404, detail="WhatsApp number not found")
         
+        await resource_versions.bump(db, "whatsapp_numbers")
+        
         return {"message": "WhatsApp number deleted successfully"}
     except HTTPException:
         raise
@@ -3011,11 +3496,7 @@ async def get_payment_settings(current_user: dict = Depends(get_current_user)):
             # Return default settings
             return {"status": "enabled", "updated_at": datetime.now(timezone.utc).isoformat()}
         
-        # Convert datetime to ISO string
-        if isinstance(settings.get("updated_at"), datetime):
-            settings["updated_at"] = settings["updated_at"].isoformat()
-        
-        return settings
+        return FastJSONResponse(settings)
     except HTTPException:
         raise
     except Exception as e:
@@ -3023,9 +3504,9 @@ async def get_payment_settings(current_user: dict = Depends(get_current_user)):
         raise HTTPException(status_code=500, detail=f"Failed to fetch payment settings: {str(e)}")
 
 @api_router.get("/payment-settings")
-async def get_public_payment_settings():
+async def get_public_payment_settings(request: Request):
     """Get payment settings for public (no auth required)"""
-    try:
+    async def produce():
         settings = await db.payment_settings.find_one({}, {"_id": 0})
         
         if not settings:
@@ -3033,6 +3514,9 @@ async def get_public_payment_settings():
             return {"status": "enabled"}
         
         return {"status": settings.get("status", "enabled")}
+    
+    try:
+        return await http_cache.respond(request, db, ("payment_settings",), produce)
     except Exception as e:
         logger.error(f"Error fetching payment settings: {str(e)}")
         # Return default on error
@@ -3065,6 +3549,8 @@ async def update_payment_settings(
             upsert=True
         )
         
+        await resource_versions.bump(db, "payment_settings")
+        
         logger.info(f"Payment settings updated to: {status}")
         
         return {"message": "Payment settings updated successfully", "status": status}
@@ -3093,11 +3579,7 @@ async def get_customer_data_by_phone(phone: str):
         if not customer:
             return None
         
-        # Convert datetime to ISO string
-        if isinstance(customer.get("last_updated"), datetime):
-            customer["last_updated"] = customer["last_updated"].isoformat()
-        
-        return customer
+        return FastJSONResponse(customer)
     except Exception as e:
         logger.error(f"Error fetching customer data: {str(e)}")
         return None
@@ -3123,11 +3605,13 @@ async def save_customer_data(customer_data: CustomerData):
 # ============= WHATSAPP NUMBERS PUBLIC ENDPOINT =============
 
 @api_router.get("/whatsapp-numbers")
-async def get_public_whatsapp_numbers():
+async def get_public_whatsapp_numbers(request: Request):
     """Get all WhatsApp numbers for public use (no auth required)"""
+    async def produce():
+        return await db.whatsapp_numbers.find({}, {"_id": 0, "phone": 1, "name": 1}).to_list(5)
+    
     try:
-        numbers = await db.whatsapp_numbers.find({}, {"_id": 0, "phone": 1, "name": 1}).to_list(5)
-        return numbers
+        return await http_cache.respond(request, db, ("whatsapp_numbers",), produce)
     except Exception as e:
         logger.error(f"Error fetching public WhatsApp numbers: {str(e)}")
         return []
@@ -0,0 +1,275 @@
+"""In-process product catalog snapshot cache"""
+import asyncio
+import logging
+from datetime import datetime, timezone
+from types import MappingProxyType
+from typing import Iterable, Optional
+from .city_index import CityAvailabilityIndex
+from .search_index import SearchIndex
+from .change_log import ProductChangeLog
+from .inventory import PRODUCT_PROJECTION
+
+logger = logging.getLogger(__name__)
+
+CATALOG_RESOURCE = "products"
+LOCATIONS_RESOURCE = "locations"
+
+# Compact list projection - descriptions only as short snippets; the full
+# text comes from /products/{id}, fields=... or view=full
+CARD_FIELDS = (
+    "id", "name", "name_telugu", "category", "image", "prices", "tag",
+    "isBestSeller", "isNew", "isFestival", "out_of_stock", "inventory_count",
+    "discount_active", "discount_percentage", "discounted_prices"
+)
+# Card snippet fields -> the description they are cut from
+SNIPPET_FIELDS = {"description_snippet": "description", "description_telugu_snippet": "description_telugu"}
+# Enough for the two lines a card shows
+SNIPPET_LENGTH = 120
+MAX_CACHED_VIEWS = 16
+
+
+def snippet(text: Optional[str]) -> Optional[str]:
+    """First SNIPPET_LENGTH characters of text, cut at a word boundary"""
+    if not text or len(text) <= SNIPPET_LENGTH:
+        return text
+    cut = text[:SNIPPET_LENGTH].rsplit(" ", 1)[0] or text[:SNIPPET_LENGTH]
+    return cut.rstrip(" ,.;:") + "…"
+
+
+def card_view(product: dict) -> dict:
+    """Compact projection of a product for list/grid views"""
+    card = {field: product[field] for field in CARD_FIELDS if field in product}
+    for field, source in SNIPPET_FIELDS.items():
+        if product.get(source):
+            card[field] = snippet(product[source])
+    return card
+
+
+# The only fields a checkout, release or commit changes
+STOCK_FIELDS = ("inventory_count", "out_of_stock")
+STOCK_PROJECTION = {"_id": 0, "id": 1, **{field: 1 for field in STOCK_FIELDS}}
+
+
+def parse_fields(fields: Optional[str]) -> Optional[tuple]:
+    """Normalize a ?fields=a,b,c parameter into a sorted tuple (id always included)"""
+    if not fields:
+        return None
+    names = {name.strip() for name in fields.split(",") if name.strip()}
+    names.add("id")
+    return tuple(sorted(names))
+
+
+class CatalogSnapshot:
+    """Read-only view of the whole catalog at one products version"""
+
+    __slots__ = ("version", "locations_version", "products", "by_id", "city_index", "built_at", "_views", "_ids", "_positions")
+
+    def __init__(self, version: int, locations_version: int, products: list, state_cities: dict, built_at: datetime):
+        self.version = version
+        self.locations_version = locations_version
+        self.products = tuple(products)
+        self.by_id = MappingProxyType({p["id"]: p for p in self.products if "id" in p})
+        self.city_index = CityAvailabilityIndex(self.products, state_cities)
+        self.built_at = built_at
+        self._views = {"card": tuple(card_view(p) for p in self.products)}
+        self._ids = tuple(p.get("id") for p in self.products)
+        self._positions = {pid: position for position, pid in enumerate(self._ids) if pid}
+
+    def is_fresh(self, version: int, locations_version: int) -> bool:
+        return self.version == version and self.locations_version == locations_version
+
+    def with_stock(self, version: int, stock: Iterable[dict]) -> "CatalogSnapshot":
+        """
+        A copy at `version` with new stock fields patched into the given
+        products. City index, ids and the search text are unchanged, so
+        nothing is rebuilt; only the card view is patched eagerly.
+        """
+        products = list(self.products)
+        card = list(self._views["card"])
+        for row in stock:
+            position = self._positions.get(row.get("id"))
+            if position is None:
+                continue
+            update = {field: row[field] for field in STOCK_FIELDS if field in row}
+            products[position] = {**products[position], **update}
+            card[position] = {**card[position], **update}
+
+        patched = CatalogSnapshot.__new__(CatalogSnapshot)
+        patched.version = version
+        patched.locations_version = self.locations_version
+        patched.products = tuple(products)
+        patched.by_id = MappingProxyType({p["id"]: p for p in patched.products if "id" in p})
+        patched.city_index = self.city_index
+        patched.built_at = datetime.now(timezone.utc)
+        patched._views = {"card": tuple(card)}
+        patched._ids = self._ids
+        patched._positions = self._positions
+        return patched
+
+    def view(self, projection=None) -> tuple:
+        """
+        Catalog projected for a response, aligned with self.products.
+        projection is None (full documents), "card", or a tuple of field
+        names from parse_fields(). Projections are computed once per snapshot.
+        """
+        if projection is None:
+            return self.products
+        cached = self._views.get(projection)
+        if cached is None:
+            cached = tuple({f: p[f] for f in projection if f in p} for p in self.products)
+            # Arbitrary ?fields= combinations must not grow the cache without bound
+            if len(self._views) < MAX_CACHED_VIEWS:
+                self._views[projection] = cached
+        return cached
+
+    def all(self, projection=None) -> list:
+        return list(self.view(projection))
+
+    def for_city(self, city: str, projection=None) -> list:
+        """Products deliverable to a city"""
+        return self.city_index.select(self.view(projection), self.city_index.mask_for_city(city))
+
+    def for_state(self, state: str, projection=None) -> list:
+        """Products deliverable to at least one city of a state"""
+        return self.city_index.select(self.view(projection), self.city_index.mask_for_state(state))
+
+    def pick(self, product_ids: Iterable[str], projection=None) -> list:
+        """Products for the given ids in the given order (unknown ids are skipped)"""
+        view = self.view(projection)
+        positions = self._positions
+        return [view[positions[pid]] for pid in product_ids if pid in positions]
+
+    def available_ids(self, city: Optional[str] = None, state: Optional[str] = None) -> Optional[set]:
+        """Ids deliverable to a city/state, or None when unfiltered"""
+        if city:
+            return set(self.city_index.select(self._ids, self.city_index.mask_for_city(city)))
+        if state:
+            return set(self.city_index.select(self._ids, self.city_index.mask_for_state(state)))
+        return None
+
+
+class CatalogCache:
+    """
+    Serves product reads from an in-memory snapshot. Discount state is
+    materialized on the documents themselves (see discount_scheduler), so the
+    snapshot is rebuilt only when the "products" resource version moves -
+    bumped by every admin product write and by discount expiry - or when the
+    "locations" version moves (the city index needs each state's cities).
+    Checkouts and stock releases bump it too, but through invalidate_stock():
+    when every version since the snapshot is stock-only, just those
+    products' stock fields are read and patched in (with_stock), with no
+    full reload or search-index sync. Snapshot contents are shared between
+    requests and must be treated as read-only.
+    """
+
+    def __init__(self, versions):
+        self._versions = versions
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._lock = asyncio.Lock()
+        # Kept across snapshots and synced incrementally on each rebuild
+        self.search_index = SearchIndex()
+        self.changes = ProductChangeLog()
+        self.hits = 0
+        self.misses = 0
+        self.rebuilds = 0
+        self.stock_patches = 0
+
+    async def get_snapshot(self, db) -> CatalogSnapshot:
+        """Return the current snapshot, rebuilding it first if stale"""
+        version = await self._versions.get(db, CATALOG_RESOURCE)
+        locations_version = await self._versions.get(db, LOCATIONS_RESOURCE)
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.is_fresh(version, locations_version):
+            self.hits += 1
+            return snapshot
+
+        self.misses += 1
+        async with self._lock:
+            # Another request may have rebuilt while we waited for the lock
+            version = await self._versions.get(db, CATALOG_RESOURCE)
+            locations_version = await self._versions.get(db, LOCATIONS_RESOURCE)
+            snapshot = self._snapshot
+            if snapshot is not None and snapshot.is_fresh(version, locations_version):
+                return snapshot
+            patched = await self._patch_stock(db, snapshot, version, locations_version)
+            if patched is not None:
+                self._snapshot = patched
+                return patched
+            snapshot = await self._build(db, version, locations_version)
+            self.search_index.sync(snapshot.products)
+            self._snapshot = snapshot
+            return snapshot
+
+    async def _patch_stock(self, db, snapshot: Optional[CatalogSnapshot], version: int,
+                           locations_version: int) -> Optional[CatalogSnapshot]:
+        """The snapshot moved forward by stock-only changes, or None if it needs a full build"""
+        if snapshot is None or snapshot.locations_version != locations_version or version < snapshot.version:
+            return None
+        product_ids = await self.changes.stock_only(db, snapshot.version, version)
+        if product_ids is None:
+            return None
+        stock = await db.products.find({"id": {"$in": list(product_ids)}}, STOCK_PROJECTION).to_list(None)
+        self.stock_patches += 1
+        return snapshot.with_stock(version, stock)
+
+    async def _build(self, db, version: int, locations_version: int) -> CatalogSnapshot:
+        products = await db.products.find({}, PRODUCT_PROJECTION).to_list(None)
+        for product in products:
+            product.setdefault("discount_active", False)
+
+        state_cities = {}
+        locations = await db.locations.find({}, {"_id": 0, "name": 1, "state": 1}).to_list(None)
+        for loc in locations:
+            if loc.get("state") and loc.get("name"):
+                state_cities.setdefault(loc["state"], []).append(loc["name"])
+
+        self.rebuilds += 1
+        logger.info(f"Catalog snapshot rebuilt: version {version}, {len(products)} products")
+        return CatalogSnapshot(version, locations_version, products, state_cities, datetime.now(timezone.utc))
+
+    async def invalidate(self, db, changed: Iterable[str] = (), deleted: Iterable[str] = ()) -> int:
+        """
+        Mark the catalog as changed after a write and log which products
+        changed (nothing passed = unknown scope, clients resync fully)
+        """
+        version = await self._versions.bump(db, CATALOG_RESOURCE)
+        try:
+            await self.changes.record(db, version, changed, deleted)
+        except Exception as e:
+            # The missing entry reads as a gap - delta clients resync past it
+            logger.error(f"Failed to record product change {version}: {str(e)}")
+        return version
+
+    async def invalidate_stock(self, db, product_ids: Iterable[str]) -> int:
+        """Like invalidate(), for writes that only moved inventory_count/out_of_stock"""
+        product_ids = list(product_ids)
+        if not product_ids:
+            return await self.invalidate(db)
+        version = await self._versions.bump(db, CATALOG_RESOURCE)
+        try:
+            await self.changes.record(db, version, product_ids, stock=True)
+        except Exception as e:
+            logger.error(f"Failed to record product change {version}: {str(e)}")
+        return version
+
+    async def invalidate_locations(self, db) -> int:
+        """Mark delivery locations as changed (rebuilds the state -> cities map)"""
+        version = await self._versions.bump(db, LOCATIONS_RESOURCE)
+        # State-filtered catalogs depend on the city list - force a full resync
+        await self.invalidate(db)
+        return version
+
+    def stats(self) -> dict:
+        snapshot = self._snapshot
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "rebuilds": self.rebuilds,
+            "stock_patches": self.stock_patches,
+            "version": snapshot.version if snapshot else None,
+            "product_count": len(snapshot.products) if snapshot else 0,
+            "built_at": snapshot.built_at.isoformat() if snapshot else None,
+            "version_syncs": self._versions.syncs,
+            "search_index": self.search_index.stats(),
+            "change_log": self.changes.stats()
+        }
@@ -0,0 +1,107 @@
+"""Versioned product change log backing catalog delta sync"""
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Versions kept in db.product_changes - older clients get a full snapshot
+CHANGE_LOG_RETAIN = 1000
+COMPACT_EVERY = 100
+# A version bumped longer ago than this without its entry was a failed write
+CHANGE_LOG_GAP_GRACE_SECONDS = 30
+
+
+class ProductChangeLog:
+    """
+    One document per products version in db.product_changes:
+    {_id: version, upserted: [ids], deleted: [ids], reset: bool, stock: bool, at}
+    (stock: only inventory_count/out_of_stock of the upserted ids moved).
+    Versions come from the shared "products" counter, which moves by one on
+    every bump, so a gap in _id means an entry is still being written, was
+    compacted away, or failed to write. A write whose affected ids are
+    unknown records a reset, which sends clients back to a full snapshot.
+    """
+
+    def __init__(self):
+        self.recorded = 0
+
+    async def record(self, db, version: int, upserted: Iterable[str] = (), deleted: Iterable[str] = (),
+                     stock: bool = False):
+        upserted = sorted(set(upserted))
+        deleted = sorted(set(deleted))
+        await db.product_changes.insert_one({
+            "_id": version,
+            "upserted": upserted,
+            "deleted": deleted,
+            "reset": not upserted and not deleted,
+            "stock": stock and bool(upserted) and not deleted,
+            "at": datetime.now(timezone.utc)
+        })
+        self.recorded += 1
+        if version % COMPACT_EVERY == 0:
+            result = await db.product_changes.delete_many({"_id": {"$lte": version - CHANGE_LOG_RETAIN}})
+            if result.deleted_count:
+                logger.info(f"Compacted {result.deleted_count} product change log entries")
+
+    async def since(self, db, since: int, until: int, until_seen_at: Optional[datetime] = None) -> Optional[tuple]:
+        """
+        Changes in (since, until] as (version, upserted ids, deleted ids), or
+        None when the client must take a full snapshot. The returned version
+        stops at the first missing entry so a client never skips one.
+        until_seen_at is when `until` was read from the counter: once that is
+        CHANGE_LOG_GAP_GRACE_SECONDS old, a missing entry is a failed write
+        that will never appear, and the client resyncs instead of waiting.
+        """
+        if since <= 0 or since > until:
+            return None
+        entries = await db.product_changes.find(
+            {"_id": {"$gt": since, "$lte": until}}
+        ).sort("_id", 1).to_list(None)
+
+        version = since
+        state = {}
+        for entry in entries:
+            if entry["_id"] != version + 1:
+                # The missing version was bumped before this entry was written
+                if until_seen_at is not None and entry.get("at") is not None:
+                    at = entry["at"] if entry["at"].tzinfo else entry["at"].replace(tzinfo=timezone.utc)
+                    until_seen_at = min(until_seen_at, at)
+                break
+            if entry.get("reset"):
+                return None
+            for product_id in entry.get("upserted", []):
+                state[product_id] = True
+            for product_id in entry.get("deleted", []):
+                state[product_id] = False
+            version = entry["_id"]
+
+        if version == since and since < until:
+            # Nothing usable after since - compacted, or not written yet
+            if not entries or entries[0]["_id"] != since + 1:
+                oldest = await db.product_changes.find_one({}, sort=[("_id", 1)])
+                if oldest is None or oldest["_id"] > since + 1:
+                    return None
+        if version < until and until_seen_at is not None:
+            if datetime.now(timezone.utc) - until_seen_at > timedelta(seconds=CHANGE_LOG_GAP_GRACE_SECONDS):
+                logger.warning(f"Product change log has a gap after version {version} - client resyncs")
+                return None
+        upserted = {pid for pid, present in state.items() if present}
+        deleted = {pid for pid, present in state.items() if not present}
+        return version, upserted, deleted
+
+    async def stock_only(self, db, since: int, until: int) -> Optional[set]:
+        """
+        Product ids whose stock is all that changed in (since, until], or
+        None if anything else changed or an entry is missing (still being
+        written, compacted, or failed) - the caller then rebuilds in full.
+        """
+        entries = await db.product_changes.find(
+            {"_id": {"$gt": since, "$lte": until}}, {"_id": 1, "upserted": 1, "stock": 1}
+        ).to_list(None)
+        if len(entries) != until - since or not all(entry.get("stock") for entry in entries):
+            return None
+        return {product_id for entry in entries for product_id in entry.get("upserted", [])}
+
+    def stats(self) -> dict:
+        return {"recorded": self.recorded}
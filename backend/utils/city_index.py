@@ -0,0 +1,49 @@
+"""City/state availability inverted index over the catalog snapshot"""
+from typing import Iterable, List
+
+
+class CityAvailabilityIndex:
+    """
+    Maps each city to a bitset (Python int) of catalog positions deliverable
+    there. Products without an available_cities restriction are kept in a
+    separate "unrestricted" bitset that is OR-ed into every lookup, so a
+    filtered catalog is a couple of integer ORs plus one pass over set bits.
+    """
+
+    __slots__ = ("unrestricted", "by_city", "state_cities", "_all")
+
+    def __init__(self, products: Iterable[dict], state_cities: dict):
+        self.unrestricted = 0
+        self.by_city = {}
+        self._all = 0
+        for position, product in enumerate(products):
+            bit = 1 << position
+            self._all |= bit
+            cities = product.get("available_cities")
+            if not cities:
+                self.unrestricted |= bit
+                continue
+            for city in cities:
+                self.by_city[city] = self.by_city.get(city, 0) | bit
+        # state name -> tuple of city names (from db.locations)
+        self.state_cities = state_cities
+
+    def mask_for_city(self, city: str) -> int:
+        return self.unrestricted | self.by_city.get(city, 0)
+
+    def mask_for_state(self, state: str) -> int:
+        mask = self.unrestricted
+        for city in self.state_cities.get(state, ()):
+            mask |= self.by_city.get(city, 0)
+        return mask
+
+    def select(self, products: tuple, mask: int) -> List[dict]:
+        """Products whose position bit is set in mask"""
+        if mask == self._all:
+            return list(products)
+        selected = []
+        while mask:
+            low_bit = mask & -mask
+            selected.append(products[low_bit.bit_length() - 1])
+            mask ^= low_bit
+        return selected
@@ -0,0 +1,121 @@
+"""gzip/brotli response compression"""
+import gzip
+import os
+from typing import Optional
+
+try:
+    import brotli
+except ImportError:  # Pinned in requirements.txt - gzip only if it is missing
+    brotli = None
+
+# Bodies smaller than this are sent as-is (headers would eat the saving)
+MIN_COMPRESS_BYTES = int(os.environ.get('MIN_COMPRESS_BYTES', '1024'))
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript")
+
+
+def supported_encodings() -> tuple:
+    """Encodings we can produce, in order of preference"""
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def choose_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Best encoding the client accepts (q-values honored), or None for identity"""
+    if not accept_encoding:
+        return None
+    accepted = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    for encoding in supported_encodings():
+        quality = accepted.get(encoding, accepted.get("*", 0.0))
+        if quality > 0:
+            return encoding
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+def is_compressible(content_type: str) -> bool:
+    return any(content_type.startswith(prefix) for prefix in COMPRESSIBLE_TYPES)
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing single-chunk responses above
+    MIN_COMPRESS_BYTES. Responses that already carry a Content-Encoding
+    (the pre-compressed bodies from HTTPCache) and streaming responses are
+    passed through untouched.
+    """
+
+    def __init__(self, app, minimum_size: int = MIN_COMPRESS_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = None
+        for name, value in scope.get("headers", []):
+            if name == b"accept-encoding":
+                accept_encoding = value.decode("latin-1")
+                break
+        encoding = choose_encoding(accept_encoding)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+
+        async def send_wrapper(message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                # Hold the headers until we know the body size
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or start_message is None:
+                await send(message)
+                return
+
+            start, start_message = start_message, None
+            headers = {name.lower(): value for name, value in start.get("headers", [])}
+            body = message.get("body", b"")
+            if (
+                message.get("more_body", False)
+                or b"content-encoding" in headers
+                or len(body) < self.minimum_size
+                or not is_compressible(headers.get(b"content-type", b"").decode("latin-1"))
+            ):
+                await send(start)
+                await send(message)
+                return
+
+            body = compress(body, encoding)
+            vary = headers.get(b"vary")
+            raw_headers = [
+                (name, value) for name, value in start.get("headers", [])
+                if name.lower() not in (b"content-length", b"vary")
+            ]
+            raw_headers += [
+                (b"content-encoding", encoding.encode("latin-1")),
+                (b"content-length", str(len(body)).encode("latin-1")),
+                (b"vary", vary + b", Accept-Encoding" if vary else b"Accept-Encoding"),
+            ]
+            await send({**start, "headers": raw_headers})
+            await send({**message, "body": body})
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,170 @@
+"""Discount expiry scheduling - materializes discount state on product documents"""
+import asyncio
+import heapq
+import logging
+from datetime import datetime, timezone
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Re-read active discounts at least this often (picks up other workers' writes)
+DISCOUNT_RESYNC_SECONDS = 600
+
+
+def parse_discount_expiry(value: Optional[str]) -> Optional[datetime]:
+    """Parse a discount_expiry_date string into an aware UTC datetime"""
+    if not value:
+        return None
+    expiry_date_str = value.replace('Z', '+00:00')
+    if 'T' in expiry_date_str:
+        expiry_date = datetime.fromisoformat(expiry_date_str)
+    else:
+        # If only date is provided (YYYY-MM-DD), the discount runs until end of day
+        expiry_date = datetime.fromisoformat(expiry_date_str + "T23:59:59+00:00")
+    if expiry_date.tzinfo is None:
+        expiry_date = expiry_date.replace(tzinfo=timezone.utc)
+    return expiry_date
+
+
+def as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """MongoDB returns naive UTC datetimes - make them comparable"""
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def discount_update(product: dict, now: Optional[datetime] = None) -> dict:
+    """
+    Build the MongoDB update that materializes discount_expires_at,
+    discount_active and discounted_prices from a product's discount fields.
+    """
+    now = now or datetime.now(timezone.utc)
+    discount_percentage = product.get('discount_percentage')
+    try:
+        expires_at = parse_discount_expiry(product.get('discount_expiry_date')) if discount_percentage else None
+    except (ValueError, TypeError, AttributeError):
+        expires_at = None
+
+    if expires_at is None:
+        return {
+            "$set": {"discount_active": False},
+            "$unset": {"discount_expires_at": "", "discounted_prices": ""}
+        }
+
+    if expires_at <= now:
+        return {
+            "$set": {"discount_active": False, "discount_expires_at": expires_at},
+            "$unset": {"discounted_prices": ""}
+        }
+
+    discounted_prices = [
+        {
+            **price_item,
+            'original_price': price_item['price'],
+            'discounted_price': round(price_item['price'] * (1 - discount_percentage / 100), 2)
+        }
+        for price_item in product.get('prices', [])
+    ]
+    return {"$set": {
+        "discount_active": True,
+        "discount_expires_at": expires_at,
+        "discounted_prices": discounted_prices
+    }}
+
+
+class DiscountScheduler:
+    """
+    Keeps a min-heap of upcoming discount expiries and flips discount_active
+    off (dropping discounted_prices) in MongoDB at the moment each discount
+    expires, so read paths never parse dates. Heap entries may be stale after
+    a discount is changed; the conditional update below ignores those.
+    """
+
+    def __init__(self, on_change=None):
+        self._heap = []
+        self._wakeup = asyncio.Event()
+        self._on_change = on_change
+        self._task = None
+        self.expired = 0
+
+    def schedule(self, product_id: str, expires_at: Optional[datetime]):
+        """Track a newly materialized discount expiry"""
+        if expires_at is None:
+            return
+        heapq.heappush(self._heap, (as_utc(expires_at), product_id))
+        self._wakeup.set()
+
+    async def load(self, db):
+        """Materialize legacy discounts and rebuild the heap from MongoDB"""
+        # Products whose discount was saved before expiries were materialized
+        legacy = await db.products.find(
+            {"discount_percentage": {"$ne": None}, "discount_active": {"$exists": False}},
+            {"_id": 0}
+        ).to_list(None)
+        now = datetime.now(timezone.utc)
+        for product in legacy:
+            await db.products.update_one({"id": product["id"]}, discount_update(product, now))
+        if legacy:
+            logger.info(f"Materialized discounts for {len(legacy)} products")
+
+        active = await db.products.find(
+            {"discount_active": True},
+            {"_id": 0, "id": 1, "discount_expires_at": 1}
+        ).to_list(None)
+        self._heap = [(as_utc(p["discount_expires_at"]), p["id"]) for p in active if p.get("discount_expires_at")]
+        heapq.heapify(self._heap)
+        self._wakeup.set()
+        return bool(legacy)
+
+    async def expire_due(self, db) -> int:
+        """Deactivate every discount whose expiry has passed"""
+        now = datetime.now(timezone.utc)
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            due.append(heapq.heappop(self._heap)[1])
+        if not due:
+            return 0
+
+        result = await db.products.update_many(
+            {"id": {"$in": due}, "discount_active": True, "discount_expires_at": {"$lte": now}},
+            {"$set": {"discount_active": False}, "$unset": {"discounted_prices": ""}}
+        )
+        if result.modified_count:
+            self.expired += result.modified_count
+            logger.info(f"⏰ {result.modified_count} product discount(s) expired")
+            if self._on_change:
+                await self._on_change(due)
+        return result.modified_count
+
+    async def run(self, db):
+        """Background loop - sleeps until the next expiry"""
+        resync_at = asyncio.get_running_loop().time() + DISCOUNT_RESYNC_SECONDS
+        while True:
+            try:
+                timeout = DISCOUNT_RESYNC_SECONDS
+                if self._heap:
+                    seconds_left = (self._heap[0][0] - datetime.now(timezone.utc)).total_seconds()
+                    timeout = min(timeout, max(0.0, seconds_left))
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+
+                await self.expire_due(db)
+
+                if asyncio.get_running_loop().time() >= resync_at:
+                    await self.load(db)
+                    resync_at = asyncio.get_running_loop().time() + DISCOUNT_RESYNC_SECONDS
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Discount scheduler error: {str(e)}")
+                await asyncio.sleep(5)
+
+    def start(self, db):
+        if self._task is None:
+            self._task = asyncio.create_task(self.run(db))
+
+    def next_expiry(self) -> Optional[datetime]:
+        return self._heap[0][0] if self._heap else None
@@ -0,0 +1,220 @@
+"""Durable email outbox drained by background sender workers"""
+import asyncio
+import logging
+import os
+import time
+import uuid
+from datetime import datetime, timezone, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+EMAIL_WORKERS = int(os.environ.get('EMAIL_WORKERS', '2'))
+# Stay well under Gmail's sending limits
+EMAIL_SEND_RATE_PER_MINUTE = int(os.environ.get('EMAIL_SEND_RATE_PER_MINUTE', '20'))
+EMAIL_MAX_ATTEMPTS = 6
+RETRY_BASE_SECONDS = 30
+RETRY_MAX_SECONDS = 3600
+# A claimed message whose worker died is picked up again after this long
+SEND_LEASE_SECONDS = 300
+IDLE_POLL_SECONDS = 5
+# Sent/failed entries are dropped by a TTL index after this long
+OUTBOX_RETENTION_DAYS = 14
+
+PENDING = "pending"
+SENDING = "sending"
+SENT = "sent"
+FAILED = "failed"
+
+
+def retry_delay(attempts: int) -> float:
+    """Exponential backoff: 30s, 60s, 120s ... capped at an hour"""
+    return min(RETRY_BASE_SECONDS * (2 ** max(0, attempts - 1)), RETRY_MAX_SECONDS)
+
+
+class SendPacer:
+    """Token bucket shared by the workers of one process"""
+
+    def __init__(self, per_minute: int):
+        self.rate = per_minute / 60.0
+        self.capacity = max(1, per_minute)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class EmailOutbox:
+    """
+    Request handlers enqueue() a message - one insert into db.email_outbox -
+    and return; workers claim due messages with a conditional update, call
+    the registered sender and retry failures with backoff. A dedupe_key
+    (unique index) stops the same notification going to a recipient twice.
+    """
+
+    def __init__(self, senders: Dict[str, Callable[..., Awaitable[bool]]], workers: int = EMAIL_WORKERS):
+        self._senders = senders
+        self._workers = workers
+        self._tasks = []
+        self._wakeup = asyncio.Event()
+        self._pacer = SendPacer(EMAIL_SEND_RATE_PER_MINUTE)
+        self.enqueued = 0
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+        self.deduplicated = 0
+
+    async def ensure_indexes(self, db):
+        await db.email_outbox.create_index([("status", 1), ("next_attempt_at", 1)])
+        await db.email_outbox.create_index(
+            "dedupe_key", unique=True, partialFilterExpression={"dedupe_key": {"$type": "string"}}
+        )
+        await db.email_outbox.create_index("closed_at", expireAfterSeconds=OUTBOX_RETENTION_DAYS * 86400)
+
+    def _message(self, kind: str, to: str, args: list, kwargs: dict, dedupe_key: Optional[str]) -> dict:
+        if kind not in self._senders:
+            raise ValueError(f"Unknown email kind: {kind}")
+        now = datetime.now(timezone.utc)
+        message = {
+            "_id": str(uuid.uuid4()),
+            "kind": kind,
+            "to": to,
+            "args": list(args),
+            "kwargs": kwargs or {},
+            "status": PENDING,
+            "attempts": 0,
+            "next_attempt_at": now,
+            "created_at": now,
+            "closed_at": None,
+            "last_error": None
+        }
+        if dedupe_key:
+            message["dedupe_key"] = f"{dedupe_key}:{to.lower()}"
+        return message
+
+    async def enqueue(self, db, kind: str, to: str, *args, dedupe_key: Optional[str] = None, **kwargs) -> bool:
+        """Queue an email; False if it was a duplicate"""
+        message = self._message(kind, to, list(args), kwargs, dedupe_key)
+        try:
+            await db.email_outbox.insert_one(message)
+        except DuplicateKeyError:
+            self.deduplicated += 1
+            logger.info(f"📧 Skipped duplicate {kind} email to {to}")
+            return False
+        self.enqueued += 1
+        self._wakeup.set()
+        return True
+
+    async def enqueue_many(self, db, kind: str, batch: List[dict]) -> int:
+        """
+        Queue a batch of one kind with a single insert_many; each entry is
+        {to, args, kwargs?, dedupe_key?}. Duplicates are skipped; returns how many were queued.
+        """
+        messages = [self._message(kind, e["to"], list(e.get("args", [])), e.get("kwargs"), e.get("dedupe_key")) for e in batch]
+        if not messages:
+            return 0
+        queued = len(messages)
+        try:
+            await db.email_outbox.insert_many(messages, ordered=False)
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            if any(err.get("code") != 11000 for err in errors):
+                raise
+            queued -= len(errors)
+            self.deduplicated += len(errors)
+            logger.info(f"📧 Skipped {len(errors)} duplicate {kind} email(s)")
+        self.enqueued += queued
+        if queued:
+            self._wakeup.set()
+        return queued
+
+    async def _claim(self, db) -> Optional[dict]:
+        now = datetime.now(timezone.utc)
+        return await db.email_outbox.find_one_and_update(
+            # SENDING entries here are leases that ran out (worker died mid-send)
+            {"status": {"$in": [PENDING, SENDING]}, "next_attempt_at": {"$lte": now}},
+            {
+                "$set": {"status": SENDING, "next_attempt_at": now + timedelta(seconds=SEND_LEASE_SECONDS)},
+                "$inc": {"attempts": 1}
+            },
+            sort=[("next_attempt_at", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def _deliver(self, db, message: dict):
+        sender = self._senders.get(message["kind"])
+        error = None
+        try:
+            await self._pacer.acquire()
+            ok = await sender(message["to"], *message.get("args", []), **message.get("kwargs", {}))
+            if not ok:
+                error = "sender returned False"
+        except Exception as e:
+            error = str(e)
+
+        now = datetime.now(timezone.utc)
+        if error is None:
+            await db.email_outbox.update_one(
+                {"_id": message["_id"]},
+                {"$set": {"status": SENT, "sent_at": now, "closed_at": now, "last_error": None}}
+            )
+            self.sent += 1
+            logger.info(f"📧 {message['kind']} email sent to {message['to']}")
+        elif message["attempts"] >= EMAIL_MAX_ATTEMPTS:
+            await db.email_outbox.update_one(
+                {"_id": message["_id"]},
+                {"$set": {"status": FAILED, "closed_at": now, "last_error": error}}
+            )
+            self.failed += 1
+            logger.error(f"❌ Giving up on {message['kind']} email to {message['to']}: {error}")
+        else:
+            delay = retry_delay(message["attempts"])
+            await db.email_outbox.update_one(
+                {"_id": message["_id"]},
+                {"$set": {"status": PENDING, "next_attempt_at": now + timedelta(seconds=delay), "last_error": error}}
+            )
+            self.retried += 1
+            logger.warning(f"⚠️ {message['kind']} email to {message['to']} failed ({error}), retrying in {delay:.0f}s")
+
+    async def _worker(self, db):
+        while True:
+            try:
+                message = await self._claim(db)
+                if message is None:
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), IDLE_POLL_SECONDS)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                await self._deliver(db, message)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Email outbox worker error: {str(e)}")
+                await asyncio.sleep(IDLE_POLL_SECONDS)
+
+    def start(self, db):
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker(db)) for _ in range(self._workers)]
+
+    def stats(self) -> dict:
+        return {
+            "enqueued": self.enqueued,
+            "sent": self.sent,
+            "retried": self.retried,
+            "failed": self.failed,
+            "deduplicated": self.deduplicated
+        }
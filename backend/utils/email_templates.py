@@ -0,0 +1,584 @@
+"""Precompiled notification email templates with cached plain-text alternatives"""
+import html
+import re
+import string
+from functools import lru_cache
+from html.parser import HTMLParser
+from typing import Dict, Iterable, NamedTuple
+
+SUPPORT_PHONE = "9985116385"
+
+_SLOT = string.Template.pattern
+
+
+class Fragment(NamedTuple):
+    """Pre-rendered markup for a slot - inserted as-is, not escaped"""
+    html: str
+    text: str
+
+
+EMPTY = Fragment("", "")
+
+
+class RenderedEmail(NamedTuple):
+    subject: str
+    html: str
+    text: str
+
+
+class _TextExtractor(HTMLParser):
+    """Turns template markup into its plain-text skeleton ($slots survive as text)"""
+
+    BLOCKS = {"p", "div", "h1", "h2", "h3", "h4", "ul", "li", "tr", "table"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "br":
+            self.parts.append("\n")
+        elif tag == "li":
+            self.parts.append("\n- ")
+        elif tag in self.BLOCKS:
+            self.parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in self.BLOCKS:
+            self.parts.append("\n")
+
+    def handle_data(self, data):
+        self.parts.append(re.sub(r"\s+", " ", data))
+
+
+def html_to_text(source: str) -> str:
+    parser = _TextExtractor()
+    parser.feed(source)
+    parser.close()
+    lines = [line.strip() for line in "".join(parser.parts).split("\n")]
+    text = "\n".join(lines)
+    return re.sub(r"\n{3,}", "\n\n", text).strip()
+
+
+def _minify(source: str) -> str:
+    """Drop the source indentation - whitespace spanning a newline between tags"""
+    source = re.sub(r">\s*\n\s*<", "><", source)
+    return re.sub(r"\s*\n\s*", " ", source).strip()
+
+
+def _compile(source: str):
+    """Split source into literal chunks and slot names: lit0 slot0 lit1 slot1 ... litN"""
+    literals, names, pos = [], [], 0
+    for match in _SLOT.finditer(source):
+        if match.group("invalid") is not None:
+            raise ValueError(f"Invalid template placeholder at {match.start()}: {source[match.start():match.start() + 20]!r}")
+        literals.append(source[pos:match.start()])
+        pos = match.end()
+        if match.group("escaped") is not None:
+            literals[-1] += "$"
+            names.append(None)
+        else:
+            names.append(match.group("named") or match.group("braced"))
+    literals.append(source[pos:])
+    return tuple(literals), tuple(names)
+
+
+def _fill(compiled, slots: dict, as_html: bool) -> str:
+    literals, names = compiled
+    out = [literals[0]]
+    for name, literal in zip(names, literals[1:]):
+        if name is not None:
+            value = slots[name]
+            if isinstance(value, Fragment):
+                out.append(value.html if as_html else value.text)
+            elif as_html:
+                out.append(html.escape(str(value)))
+            else:
+                out.append(str(value))
+        out.append(literal)
+    return "".join(out)
+
+
+class Partial:
+    """Reusable markup block; compiled once, rendered into a Fragment"""
+
+    def __init__(self, source: str):
+        self._html = _compile(_minify(source))
+        self._text = _compile(html_to_text(source))
+        self.slots = frozenset(n for n in self._html[1] if n)
+
+    def render(self, **slots) -> Fragment:
+        return Fragment(_fill(self._html, slots, True), _fill(self._text, slots, False))
+
+
+class EmailTemplate(Partial):
+    """Subject + HTML body + plain-text body, all compiled when the module loads"""
+
+    def __init__(self, subject: str, source: str):
+        super().__init__(source)
+        self._subject = _compile(subject)
+
+    def render(self, **slots) -> RenderedEmail:
+        body = super().render(**slots)
+        return RenderedEmail(_fill(self._subject, slots, False), body.html, body.text)
+
+
+# ---------------------------------------------------------------------------
+# Page chrome (composed into each template at compile time)
+# ---------------------------------------------------------------------------
+
+_THANKS_FOOTER = '''
+    Thank you for choosing Anantha Home Foods!<br>
+    Handcrafted with love and tradition 💚
+'''
+
+_FOOD_LIST = '''
+    <ul style="margin: 10px 0;">
+        <li>Traditional Laddus & Chikkis</li>
+        <li>Authentic Sweets</li>
+        <li>Hot Snacks & Items</li>
+        <li>Homemade Pickles</li>
+        <li>Fresh Powders & Spices</li>
+    </ul>
+'''
+
+
+def _page(body: str, footer: str = _THANKS_FOOTER) -> str:
+    return f'''
+    <html>
+    <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
+        <div style="max-width: 600px; margin: 0 auto; padding: 20px; border: 1px solid #ddd; border-radius: 10px;">
+            {body}
+            <p style="text-align: center; color: #666; margin-top: 30px; font-size: 12px;">
+                {footer}
+            </p>
+        </div>
+    </body>
+    </html>
+    '''
+
+
+_DELIVERY_DETAILS = '''
+    <p>$address<br>
+    $location</p>
+    <p><strong>Phone:</strong> $phone</p>
+'''
+
+_ITEMS_SECTION = '''
+    <div style="margin: 20px 0;">
+        <h3 style="color: #1e40af;">$items_heading</h3>
+        $items
+    </div>
+'''
+
+# ---------------------------------------------------------------------------
+# Partials
+# ---------------------------------------------------------------------------
+
+_ITEM_ROW = Partial('''
+    <div style="padding: 10px; border-bottom: 1px solid #e5e7eb;">
+        <p><strong>$name</strong> ($weight)</p>
+        <p>Quantity: $quantity × Rs.$price = Rs.$line_total</p>
+    </div>
+''')
+
+_STRUCTURED_ADDRESS = Partial('''
+    $door_no, $building<br>
+    $street<br>
+    $city, $state - $pincode
+''')
+
+_FREEFORM_ADDRESS = Partial('$address')
+
+_STATUS_BADGE = Partial('''
+    <h3 style="color: $color; margin: 0; font-size: 24px;">
+        $label
+    </h3>
+''')
+
+ORDER_STATUS_LABELS = {
+    'confirmed': (' Confirmed', '#16a34a'),
+    'processing': ('🔄 Processing', '#2563eb'),
+    'shipped': ('🚚 Shipped', '#f59e0b'),
+    'delivered': ('📦 Delivered', '#059669'),
+    'cancelled': (' Cancelled', '#dc2626'),
+}
+
+
+def items_table(items: Iterable[dict]) -> Fragment:
+    rows = []
+    for item in items:
+        quantity = item.get("quantity", 0)
+        price = item.get("price", 0)
+        rows.append(_ITEM_ROW.render(
+            name=item.get("name", "N/A"), weight=item.get("weight", "N/A"),
+            quantity=quantity, price=price, line_total=quantity * price
+        ))
+    return Fragment("".join(r.html for r in rows), "\n\n".join(r.text for r in rows))
+
+
+def address_block(order: dict) -> Fragment:
+    if order.get("doorNo"):
+        return _STRUCTURED_ADDRESS.render(
+            door_no=order.get("doorNo", ""), building=order.get("building", ""),
+            street=order.get("street", ""), city=order.get("city", ""),
+            state=order.get("state", ""), pincode=order.get("pincode", "")
+        )
+    return _FREEFORM_ADDRESS.render(address=order.get("address", ""))
+
+
+@lru_cache(maxsize=32)
+def status_badge(status: str) -> Fragment:
+    label, color = ORDER_STATUS_LABELS.get(status, (status.title(), '#666'))
+    return _STATUS_BADGE.render(label=label, color=color)
+
+
+def order_slots(order: dict) -> Dict[str, object]:
+    """Slots shared by every order email"""
+    return {
+        "customer_name": order.get("customer_name") or "Valued Customer",
+        "order_id": order.get("order_id", "N/A"),
+        "tracking_code": order.get("tracking_code", "N/A"),
+        "order_date": order.get("order_date", ""),
+        "total": order.get("total", 0),
+        "subtotal": order.get("subtotal", 0),
+        "delivery_charge": order.get("delivery_charge", 0),
+        "order_status": order.get("order_status", "pending"),
+        "location": order.get("location", ""),
+        "phone": order.get("phone", ""),
+        "address": address_block(order),
+        "items": items_table(order.get("items", [])),
+        "support_phone": SUPPORT_PHONE,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Templates
+# ---------------------------------------------------------------------------
+
+ORDER_CONFIRMATION = EmailTemplate('Order Confirmation - #$order_id', _page(f'''
+    <h2 style="color: #f97316; text-align: center;">🎉 Order Confirmed!</h2>
+    <p>Dear $customer_name,</p>
+    <p><strong>Your order has been successfully placed!</strong> Thank you for choosing Anantha Home Foods!</p>
+
+    <div style="background-color: #fff7ed; padding: 15px; border-radius: 8px; margin: 20px 0;">
+        <h3 style="color: #ea580c; margin-top: 0;">Order Details</h3>
+        <p><strong>Order ID:</strong> $order_id</p>
+        <p><strong>Tracking Code:</strong> $tracking_code</p>
+        <p><strong>Order Date:</strong> $order_date</p>
+        <p><strong>Total Amount:</strong> Rs.$total</p>
+    </div>
+
+    <div style="background-color: #f0fdf4; padding: 15px; border-radius: 8px; margin: 20px 0;">
+        <h3 style="color: #16a34a; margin-top: 0;">Delivery Address</h3>
+        {_DELIVERY_DETAILS}
+    </div>
+
+    {_ITEMS_SECTION.replace("$items_heading", "Items Ordered")}
+
+    <div style="background-color: #fef3c7; padding: 15px; border-radius: 8px; margin: 20px 0;">
+        <h4 style="margin-top: 0;">📦 Track Your Order</h4>
+        <p>You can track your order anytime using your Order ID <strong>$order_id</strong> or Tracking Code <strong>$tracking_code</strong> on our website.</p>
+        <p>Simply visit the Track Order page and enter your tracking code, phone number, or email to get updates!</p>
+    </div>
+
+    <p style="margin-top: 30px;">If you have any questions, feel free to contact us at <strong>$support_phone</strong></p>
+'''))
+
+ORDER_STATUS_UPDATE = EmailTemplate('Order Status Update - #$order_id', _page('''
+    <h2 style="color: #f97316; text-align: center;">📬 Order Status Update</h2>
+    <p>Dear $customer_name,</p>
+    <p>Your order status has been updated!</p>
+
+    <div style="background-color: #fff7ed; padding: 20px; border-radius: 8px; margin: 20px 0; text-align: center;">
+        $status_badge
+        <p style="margin-top: 10px; color: #666;">Order ID: <strong>$order_id</strong></p>
+        <p style="color: #666;">Tracking Code: <strong>$tracking_code</strong></p>
+    </div>
+
+    <div style="background-color: #f0fdf4; padding: 15px; border-radius: 8px; margin: 20px 0;">
+        <h3 style="color: #16a34a; margin-top: 0;">Delivery Details</h3>
+        <p><strong>Address:</strong><br>$address<br>
+        $location</p>
+        <p><strong>Phone:</strong> $phone</p>
+        <p><strong>Total Amount:</strong> Rs.$total</p>
+    </div>
+
+    <div style="background-color: #fef3c7; padding: 15px; border-radius: 8px; margin: 20px 0;">
+        <h4 style="margin-top: 0;">📦 Track Your Order</h4>
+        <p>You can track your order anytime using your Order ID or Tracking Code on our website.</p>
+        <p>Visit our Track Order page and enter your details to get real-time updates!</p>
+    </div>
+
+    <p style="margin-top: 30px;">If you have any questions, feel free to contact us at <strong>$support_phone</strong></p>
+'''))
+
+PAYMENT_STATUS_UPDATE = EmailTemplate('$status_emoji Payment $status_title - Order #$order_id', _page(f'''
+    <h2 style="color: $status_color; text-align: center;">$status_emoji Payment Status Update</h2>
+    <p>Dear $customer_name,</p>
+    <p><strong>$status_message</strong></p>
+
+    $next_steps
+
+    <div style="background-color: #fff7ed; padding: 15px; border-radius: 8px; margin: 20px 0;">
+        <h3 style="color: #ea580c; margin-top: 0;">Order Summary</h3>
+        <p><strong>Order ID:</strong> $order_id</p>
+        <p><strong>Tracking Code:</strong> $tracking_code</p>
+        <p><strong>Order Status:</strong> <span style="text-transform: capitalize;">$order_status</span></p>
+        <p><strong>Payment Status:</strong> <span style="color: $status_color; font-weight: bold; text-transform: capitalize;">$payment_status</span></p>
+        <p><strong>Total Amount:</strong> Rs.$total</p>
+    </div>
+
+    <div style="background-color: #f0fdf4; padding: 15px; border-radius: 8px; margin: 20px 0;">
+        <h3 style="color: #16a34a; margin-top: 0;">Delivery Address</h3>
+        {_DELIVERY_DETAILS}
+    </div>
+
+    {_ITEMS_SECTION.replace("$items_heading", "Items Ordered")}
+
+    <div style="background-color: #e0f2fe; padding: 15px; border-radius: 8px; margin: 20px 0;">
+        <h4 style="margin-top: 0;">📦 Order Summary</h4>
+        <div style="display: flex; justify-content: space-between; padding: 5px 0;">
+            <span>Subtotal:</span>
+            <span><strong>Rs.$subtotal</strong></span>
+        </div>
+        <div style="display: flex; justify-content: space-between; padding: 5px 0;">
+            <span>Delivery Charge:</span>
+            <span><strong>Rs.$delivery_charge</strong></span>
+        </div>
+        <div style="display: flex; justify-content: space-between; padding: 10px 0; border-top: 2px solid #0369a1; margin-top: 5px;">
+            <span style="font-size: 18px; font-weight: bold;">Total:</span>
+            <span style="font-size: 18px; font-weight: bold; color: #16a34a;">Rs.$total</span>
+        </div>
+    </div>
+
+    <div style="background-color: #fef3c7; padding: 15px; border-radius: 8px; margin: 20px 0;">
+        <h4 style="margin-top: 0;">📞 Need Help?</h4>
+        <p>If you have any questions about your payment or order, please contact us:</p>
+        <ul style="margin: 10px 0;">
+            <li><strong>WhatsApp:</strong> $support_phone</li>
+            <li><strong>Email:</strong> $support_email</li>
+        </ul>
+    </div>
+'''))
+
+_PAYMENT_NEXT_STEPS = Partial('''
+    <div style="background-color: $background; padding: 15px; border-radius: 8px; margin: 20px 0; border-left: 4px solid $color;">
+        <p style="margin: 0;"><strong>$heading</strong></p>
+        <p style="margin: 5px 0 0 0;">$body</p>
+    </div>
+''')
+
+# payment_status -> (subject title, message, colour, emoji, next-steps block)
+PAYMENT_STATUSES = {
+    'completed': ('Confirmed', "Your payment has been successfully received!", "#16a34a", "✅", _PAYMENT_NEXT_STEPS.render(
+        background="#f0fdf4", color="#16a34a", heading="🎉 Great News!",
+        body="Your order is now confirmed and will be processed shortly. We'll send you another update when your order is shipped!"
+    )),
+    'failed': ('Failed', "Unfortunately, your payment could not be processed.", "#dc2626", "❌", _PAYMENT_NEXT_STEPS.render(
+        background="#fef2f2", color="#dc2626", heading="⚠️ What to do next?",
+        body=f"Please contact us at {SUPPORT_PHONE} to complete your payment via WhatsApp or alternative methods. Your order is still reserved for you!"
+    )),
+    'pending': ('Pending', "Your payment is currently pending.", "#f59e0b", "⏳", _PAYMENT_NEXT_STEPS.render(
+        background="#fffbeb", color="#f59e0b", heading="ℹ️ Payment Pending",
+        body=f"We're waiting for your payment confirmation. You can complete the payment via WhatsApp at {SUPPORT_PHONE}."
+    )),
+}
+
+
+def payment_status_slots(status: str) -> Dict[str, object]:
+    title, message, color, emoji, next_steps = PAYMENT_STATUSES.get(status, PAYMENT_STATUSES['pending'])
+    return {
+        "status_title": title, "status_message": message, "status_color": color,
+        "status_emoji": emoji, "next_steps": next_steps, "payment_status": status
+    }
+
+
+PAYMENT_COMPLETION = EmailTemplate('Payment Received - Order #$order_id', _page('''
+    <h2 style="color: #16a34a; text-align: center;"> Payment Confirmed!</h2>
+    <p>Dear $customer_name,</p>
+    <p>We have successfully received your payment for order <strong>#$order_id</strong>.</p>
+
+    <div style="background-color: #f0fdf4; padding: 20px; border-radius: 8px; margin: 20px 0; text-align: center;">
+        <h3 style="color: #16a34a; margin: 0; font-size: 24px;">
+             Payment Complete
+        </h3>
+        <p style="margin-top: 15px; font-size: 18px; color: #166534;">
+            <strong>Rs.$total</strong>
+        </p>
+    </div>
+
+    <div style="background-color: #fff7ed; padding: 20px; border-radius: 8px; margin: 20px 0;">
+        <h3 style="color: #ea580c; margin: 0;">📦 Order Status</h3>
+        <p style="margin-top: 15px;">
+            <strong>Order ID:</strong> $order_id<br>
+            <strong>Tracking Code:</strong> $tracking_code<br>
+            <strong>Status:</strong> Confirmed
+        </p>
+        <p style="margin-top: 10px; color: #9a3412;">
+            Your order is now confirmed and will be processed for delivery!
+        </p>
+    </div>
+
+    <div style="background-color: #fef3c7; padding: 15px; border-radius: 8px; margin: 20px 0;">
+        <h4 style="margin-top: 0;"> Track Your Order</h4>
+        <p>You can track your order anytime using:</p>
+        <ul>
+            <li>Your phone number: $phone</li>
+            <li>Tracking code: $tracking_code</li>
+        </ul>
+    </div>
+
+    <p style="margin-top: 20px;">If you have any questions, feel free to contact us at <strong>$support_phone</strong></p>
+''', footer='''
+    Thank you for your order!<br>
+    Anantha Home Foods 💚
+'''))
+
+ORDER_CANCELLATION = EmailTemplate('Order Cancelled - #$order_id', _page(f'''
+    <h2 style="color: #dc2626; text-align: center;">😔 Order Cancelled</h2>
+    <p>Dear $customer_name,</p>
+    <p><strong>Sorry to see you go!</strong> Your order <strong>#$order_id</strong> has been cancelled.</p>
+    $reason
+
+    <div style="background-color: #fef2f2; padding: 20px; border-radius: 8px; margin: 20px 0;">
+        <h3 style="color: #dc2626; margin: 0;">Order Details</h3>
+        <p style="margin-top: 15px;">
+            <strong>Order ID:</strong> $order_id<br>
+            <strong>Tracking Code:</strong> $tracking_code<br>
+            <strong>Total Amount:</strong> Rs.$total
+        </p>
+    </div>
+
+    $refund
+
+    {_ITEMS_SECTION.replace("$items_heading", "Items in Cancelled Order")}
+
+    <div style="background-color: #fef3c7; padding: 15px; border-radius: 8px; margin: 20px 0;">
+        <h4 style="margin-top: 0;">📞 Need Help?</h4>
+        <p>If you have any questions about this cancellation or would like to place a new order, please contact us:</p>
+        <p><strong>Phone:</strong> $support_phone</p>
+    </div>
+
+    <p style="margin-top: 30px; text-align: center;">
+        We hope to serve you again soon!
+    </p>
+''', footer='''
+    Thank you for your understanding<br>
+    Anantha Home Foods 💚
+'''))
+
+CANCEL_REASON = Partial('<p><strong>Reason:</strong> $reason</p>')
+
+CANCELLATION_REFUND = Partial('''
+    <div style="background-color: #fff7ed; padding: 20px; border-radius: 8px; margin: 20px 0;">
+        <h3 style="color: #ea580c; margin: 0;"> Refund Information</h3>
+        <p style="margin-top: 15px;">
+            <strong>Order Total:</strong> Rs.$total<br>
+            <strong>Cancellation Fee:</strong> Rs.$cancellation_fee<br>
+            <strong>Refund Amount:</strong> Rs.$refund_amount
+        </p>
+        <p style="margin-top: 10px; font-style: italic;">
+            Your refund will be processed within 2-3 business days to the original payment method.
+        </p>
+    </div>
+''')
+
+CITY_APPROVAL = EmailTemplate('Great News! We now deliver to $city! ', _page(f'''
+    <h2 style="color: #16a34a; text-align: center;"> Exciting News!</h2>
+    <p>Dear $customer_name,</p>
+    <p>We're thrilled to inform you that we now deliver to <strong>$city, $state</strong>!</p>
+
+    <div style="background-color: #f0fdf4; padding: 20px; border-radius: 8px; margin: 20px 0; text-align: center;">
+        <h3 style="color: #16a34a; margin: 0; font-size: 24px;">
+             City Added
+        </h3>
+        <p style="margin-top: 15px; font-size: 18px; color: #166534;">
+            <strong>$city, $state</strong>
+        </p>
+    </div>
+
+    <div style="background-color: #fff7ed; padding: 15px; border-radius: 8px; margin: 20px 0;">
+        <h3 style="color: #ea580c; margin-top: 0;"> Delivery Information</h3>
+        <p>Thanks to your suggestion, we've added $city to our delivery locations!</p>
+        <p>You can now enjoy our delicious traditional foods delivered right to your doorstep.</p>
+    </div>
+
+    <div style="background-color: #fef3c7; padding: 15px; border-radius: 8px; margin: 20px 0;">
+        <h4 style="margin-top: 0;"> Start Shopping!</h4>
+        <p>Visit our website to browse our complete collection of:</p>
+        {_FOOD_LIST}
+        <p>All made with authentic ingredients and traditional recipes!</p>
+    </div>
+
+    <p style="margin-top: 30px; text-align: center;">
+        <strong>Ready to place your first order?</strong><br>
+        Visit our website and start shopping today!
+    </p>
+
+    <p style="margin-top: 20px;">If you have any questions, feel free to contact us at <strong>$support_phone</strong></p>
+'''))
+
+CITY_REJECTION = EmailTemplate('Update on Your City Request - $city', _page('''
+    <h2 style="color: #ea580c; text-align: center;">Update on Your Delivery Request</h2>
+    <p>Dear $customer_name,</p>
+    <p>Thank you for your interest in getting Anantha Home Foods delivered to <strong>$city, $state</strong>.</p>
+
+    <div style="background-color: #fff7ed; padding: 20px; border-radius: 8px; margin: 20px 0;">
+        <h3 style="color: #ea580c; margin: 0;"> Current Status</h3>
+        <p style="margin-top: 15px;">
+            We appreciate your suggestion! Unfortunately, we are not able to deliver to <strong>$city</strong> at this time due to logistical constraints.
+        </p>
+    </div>
+
+    $refund
+
+    <div style="background-color: #fef3c7; padding: 15px; border-radius: 8px; margin: 20px 0;">
+        <h4 style="margin-top: 0;">🔔 Stay Updated</h4>
+        <p>We're constantly expanding our delivery network! If there's enough demand from your area, we'll definitely consider adding $city in the future.</p>
+        <p>We'll keep your request on file and notify you if we start delivering to your area.</p>
+    </div>
+
+    <div style="background-color: #f0fdf4; padding: 15px; border-radius: 8px; margin: 20px 0;">
+        <h4 style="margin-top: 0;">💡 Alternative Options</h4>
+        <p>In the meantime, you might consider:</p>
+        <ul style="margin: 10px 0;">
+            <li>Checking if we deliver to nearby cities</li>
+            <li>Arranging a bulk order for delivery to a nearby location</li>
+            <li>Following us on social media for expansion updates</li>
+        </ul>
+    </div>
+
+    <p style="margin-top: 30px;">If you have any questions or would like to discuss alternatives, feel free to contact us at <strong>$support_phone</strong></p>
+''', footer='''
+    Thank you for your understanding and interest in Anantha Home Foods!<br>
+    Handcrafted with love and tradition 💚
+'''))
+
+CITY_REJECTION_REFUND = Partial('''
+    <div style="background-color: #fef2f2; padding: 20px; border-radius: 8px; margin: 20px 0; border: 2px solid #fca5a5;">
+        <h3 style="color: #dc2626; margin: 0;"> Refund Information</h3>
+        <p style="margin-top: 15px; font-weight: bold;">
+            Since you have already made a payment for delivery to $city, we will process a full refund.
+        </p>
+        <p>
+            <strong>Refund Timeline:</strong> Your payment will be refunded within 2-3 working days.
+        </p>
+        <p style="background-color: #fee2e2; padding: 15px; border-radius: 6px; margin-top: 10px;">
+            <strong> IMPORTANT:</strong> Please reply to this email with your UPI details so we can process the refund quickly:
+        </p>
+        <ul style="margin: 10px 0 0 20px;">
+            <li>UPI ID (e.g., yourname@paytm, yourname@okaxis)</li>
+            <li>Or Bank Account details (Account Number, IFSC Code, Account Holder Name)</li>
+        </ul>
+    </div>
+''')
+
+
+def city_slots(city_data: dict) -> Dict[str, object]:
+    return {
+        "customer_name": city_data.get("customer_name") or "Valued Customer",
+        "city": city_data.get("city", ""),
+        "state": city_data.get("state", ""),
+        "support_phone": SUPPORT_PHONE,
+    }
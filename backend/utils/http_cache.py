@@ -0,0 +1,116 @@
+"""ETag / Cache-Control handling for public read endpoints"""
+import os
+import hashlib
+from collections import OrderedDict
+from typing import Awaitable, Callable, Iterable, Optional
+from fastapi import Request, Response
+from .compression import MIN_COMPRESS_BYTES, choose_encoding, compress
+from .json_response import dumps
+
+# Browsers and the service worker may reuse a response for a minute and serve
+# it stale for up to ten more while revalidating in the background
+PUBLIC_CACHE_CONTROL = os.environ.get(
+    'PUBLIC_CACHE_CONTROL',
+    'public, max-age=60, stale-while-revalidate=600'
+)
+# Rendered bodies kept per ETag (i.e. per resource version + query variant)
+MAX_CACHED_BODIES = 128
+
+
+def make_etag(resources: Iterable[str], versions: Iterable[int], variant: str = "") -> str:
+    """Strong ETag from resource version counters (plus a hash of the query variant)"""
+    tag = ".".join(f"{resource}{version}" for resource, version in zip(resources, versions))
+    if variant:
+        tag += "." + hashlib.sha1(variant.encode("utf-8")).hexdigest()[:12]
+    return f'"{tag}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """True when an If-None-Match header covers the given ETag"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+class HTTPCache:
+    """Answers conditional GETs for resources tracked by ResourceVersions"""
+
+    def __init__(self, versions):
+        self._versions = versions
+        self._bodies = OrderedDict()
+        self.not_modified = 0
+        self.full_responses = 0
+        self.body_hits = 0
+        self.compressions = 0
+
+    async def etag(self, db, resources: tuple, variant: str = "") -> str:
+        versions = [await self._versions.get(db, resource) for resource in resources]
+        return make_etag(resources, versions, variant)
+
+    def headers(self, etag: str) -> dict:
+        return {"ETag": etag, "Cache-Control": PUBLIC_CACHE_CONTROL, "Vary": "Accept-Encoding"}
+
+    async def _bodies_for(self, etag: str, produce: Callable[[], Awaitable]) -> dict:
+        """Encoded bodies for an ETag - rendered once, then reused until the version moves"""
+        bodies = self._bodies.get(etag)
+        if bodies is not None:
+            self._bodies.move_to_end(etag)
+            self.body_hits += 1
+            return bodies
+
+        content = await produce()
+        bodies = {"identity": dumps(content)}
+        self._bodies[etag] = bodies
+        if len(self._bodies) > MAX_CACHED_BODIES:
+            self._bodies.popitem(last=False)
+        return bodies
+
+    async def respond(
+        self,
+        request: Request,
+        db,
+        resources: tuple,
+        produce: Callable[[], Awaitable],
+        variant: str = ""
+    ) -> Response:
+        """
+        Return 304 when the client already holds the current version,
+        otherwise produce the payload and send it with ETag/Cache-Control.
+        Versions are read before the payload, so a concurrent write can only
+        make the body newer than its ETag - never older. Rendered (and
+        compressed) bodies are reused for repeat requests of the same ETag.
+        """
+        etag = await self.etag(db, resources, variant)
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            self.not_modified += 1
+            return Response(status_code=304, headers=self.headers(etag))
+
+        bodies = await self._bodies_for(etag, produce)
+        self.full_responses += 1
+        headers = self.headers(etag)
+        body = bodies["identity"]
+        encoding = choose_encoding(request.headers.get("accept-encoding"))
+        if encoding and len(body) >= MIN_COMPRESS_BYTES:
+            if encoding not in bodies:
+                bodies[encoding] = compress(body, encoding)
+                self.compressions += 1
+            body = bodies[encoding]
+            headers["Content-Encoding"] = encoding
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    def stats(self) -> dict:
+        return {
+            "not_modified": self.not_modified,
+            "full_responses": self.full_responses,
+            "body_hits": self.body_hits,
+            "compressions": self.compressions,
+            "cached_bodies": len(self._bodies)
+        }
@@ -0,0 +1,167 @@
+"""Idempotency-Key handling for checkout and payment endpoints"""
+import asyncio
+import hashlib
+import logging
+import os
+from datetime import datetime, timezone, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional
+from fastapi import HTTPException
+from fastapi.responses import Response
+from pymongo.errors import DuplicateKeyError
+from .json_response import dumps
+
+logger = logging.getLogger(__name__)
+
+# How long a stored response can be replayed
+IDEMPOTENCY_KEY_TTL_HOURS = int(os.environ.get('IDEMPOTENCY_KEY_TTL_HOURS', '24'))
+# A request still in flight after this long is presumed dead and may be retried
+IN_FLIGHT_LEASE_SECONDS = 60
+WAIT_POLL_SECONDS = 0.1
+MAX_KEY_LENGTH = 255
+
+IN_PROGRESS = "in_progress"
+DONE = "done"
+
+
+def fingerprint(payload: Any) -> str:
+    """Stable hash of a request body, to catch a key reused for a different request"""
+    return hashlib.sha256(dumps(payload)).hexdigest()
+
+
+class IdempotencyStore:
+    """
+    db.idempotency_keys holds one entry per (scope, key):
+    {_id: "scope:key", fingerprint, status, status_code, body, lease_until, expires_at}.
+    The first request with a key claims it with an insert (unique _id), runs
+    the handler and stores the serialized response; retries replay that
+    response. Duplicates arriving while the first is still running wait for
+    it - on the same process through a shared future, across processes by
+    polling the entry - instead of running the handler again.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.executed = 0
+        self.replayed = 0
+        self.coalesced = 0
+
+    async def ensure_indexes(self, db):
+        await db.idempotency_keys.create_index("expires_at", expireAfterSeconds=0)
+
+    async def run(self, db, scope: str, key: Optional[str], payload: Any,
+                  handler: Callable[[], Awaitable[Any]]) -> Any:
+        """Run handler once per Idempotency-Key; without a key it just runs"""
+        if not key:
+            return await handler()
+        if len(key) > MAX_KEY_LENGTH:
+            raise HTTPException(status_code=400, detail=f"Idempotency-Key must be at most {MAX_KEY_LENGTH} characters")
+
+        entry_id = f"{scope}:{key}"
+        request_hash = fingerprint(payload)
+
+        inflight = self._inflight.get(entry_id)
+        if inflight is not None:
+            self.coalesced += 1
+            entry = await asyncio.shield(inflight)
+            return self._replay(entry, request_hash)
+
+        # A retry of a finished request costs this one indexed read
+        entry = await db.idempotency_keys.find_one({"_id": entry_id, "status": DONE})
+        if entry is not None:
+            return self._replay(entry, request_hash)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[entry_id] = future
+        try:
+            entry, replayed = await self._execute(db, entry_id, request_hash, handler)
+            future.set_result(entry)
+        except BaseException as e:
+            future.set_exception(e)
+            # Nobody else may be waiting - mark the exception retrieved
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(entry_id, None)
+        return self._replay(entry, request_hash, replayed)
+
+    async def _execute(self, db, entry_id: str, request_hash: str, handler):
+        """Claim the key and run handler; returns (entry, True) if another process ran it"""
+        while True:
+            now = datetime.now(timezone.utc)
+            try:
+                await db.idempotency_keys.insert_one({
+                    "_id": entry_id,
+                    "fingerprint": request_hash,
+                    "status": IN_PROGRESS,
+                    "lease_until": now + timedelta(seconds=IN_FLIGHT_LEASE_SECONDS),
+                    "created_at": now,
+                    "expires_at": now + timedelta(hours=IDEMPOTENCY_KEY_TTL_HOURS)
+                })
+                break
+            except DuplicateKeyError:
+                entry = await self._wait(db, entry_id)
+                if entry is not None:
+                    return entry, True
+                # The holder's lease ran out or its claim was dropped - try again
+
+        try:
+            result = await handler()
+        except HTTPException as e:
+            if e.status_code >= 500:
+                await db.idempotency_keys.delete_one({"_id": entry_id})
+                raise
+            # Client errors are part of the outcome and replay like a success
+            return await self._store(db, entry_id, request_hash, e.status_code, {"detail": e.detail}), False
+        except BaseException:
+            # Unknown outcome - let a retry run the handler again
+            await db.idempotency_keys.delete_one({"_id": entry_id})
+            raise
+        self.executed += 1
+        return await self._store(db, entry_id, request_hash, 200, result), False
+
+    async def _store(self, db, entry_id: str, request_hash: str, status_code: int, content: Any) -> dict:
+        entry = {
+            "_id": entry_id,
+            "fingerprint": request_hash,
+            "status": DONE,
+            "status_code": status_code,
+            "body": dumps(content)
+        }
+        await db.idempotency_keys.update_one(
+            {"_id": entry_id},
+            {"$set": {k: v for k, v in entry.items() if k != "_id"}, "$unset": {"lease_until": ""}}
+        )
+        return entry
+
+    async def _wait(self, db, entry_id: str) -> Optional[dict]:
+        """Wait for another process to finish the request; None once its lease lapses"""
+        while True:
+            entry = await db.idempotency_keys.find_one({"_id": entry_id})
+            if entry is None:
+                return None
+            if entry["status"] == DONE:
+                self.coalesced += 1
+                return entry
+            lease_until = entry["lease_until"]
+            if lease_until.tzinfo is None:
+                lease_until = lease_until.replace(tzinfo=timezone.utc)
+            if lease_until <= datetime.now(timezone.utc):
+                result = await db.idempotency_keys.delete_one(
+                    {"_id": entry_id, "status": IN_PROGRESS, "lease_until": entry["lease_until"]}
+                )
+                if result.deleted_count:
+                    logger.warning(f"⚠️ Idempotent request {entry_id} lease expired, running it again")
+                return None
+            await asyncio.sleep(WAIT_POLL_SECONDS)
+
+    def _replay(self, entry: dict, request_hash: str, replayed: bool = True) -> Response:
+        if entry["fingerprint"] != request_hash:
+            raise HTTPException(status_code=422, detail="Idempotency-Key was already used with a different request")
+        if replayed:
+            self.replayed += 1
+        headers = {"Idempotent-Replayed": "true"} if replayed else None
+        return Response(content=entry["body"], status_code=entry["status_code"],
+                        media_type="application/json", headers=headers)
+
+    def stats(self) -> dict:
+        return {"executed": self.executed, "replayed": self.replayed, "coalesced": self.coalesced}
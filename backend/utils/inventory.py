@@ -0,0 +1,112 @@
+"""Atomic inventory decrements for checkout"""
+import logging
+from typing import Dict, Iterable, List
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+# inventory_txns marks decrements still in flight (dropped once the whole
+# cart has settled); after that the reservation ledger's conditional status
+# flip is what makes a restore happen only once
+# Product reads that leave the server: bookkeeping fields hold order/transaction ids
+PRODUCT_PROJECTION = {"_id": 0, "inventory_txns": 0, "out_of_stock_txn": 0}
+
+
+class InsufficientInventory(Exception):
+    """Raised when one or more products cannot cover the requested quantity"""
+
+    def __init__(self, product_ids: List[str]):
+        super().__init__(f"Insufficient inventory for {', '.join(product_ids)}")
+        self.product_ids = product_ids
+
+
+def cart_quantities(items: Iterable) -> Dict[str, int]:
+    """Total quantity per product id (a product can appear once per weight option)"""
+    quantities = {}
+    for item in items:
+        quantities[item.product_id] = quantities.get(item.product_id, 0) + item.quantity
+    return quantities
+
+
+def _decrement(product_id: str, quantity: int, txn_id: str) -> UpdateOne:
+    """inventory_count -= quantity only if enough stock, flipping out_of_stock at zero"""
+    remaining = {"$subtract": ["$inventory_count", quantity]}
+    sells_out = {"$and": [{"$lte": [remaining, 0]}, {"$eq": [{"$ifNull": ["$out_of_stock", False]}, False]}]}
+    return UpdateOne(
+        {"id": product_id, "inventory_count": {"$gte": quantity}, "inventory_txns": {"$ne": txn_id}},
+        [{"$set": {
+            # Remember which transaction sold the product out - only its restore may clear the flag
+            "out_of_stock_txn": {"$cond": [sells_out, txn_id, {"$ifNull": ["$out_of_stock_txn", None]}]},
+            "out_of_stock": {"$or": [{"$lte": [remaining, 0]}, {"$ifNull": ["$out_of_stock", False]}]},
+            "inventory_count": remaining,
+            "inventory_txns": {"$concatArrays": [{"$ifNull": ["$inventory_txns", []]}, [txn_id]]}
+        }}]
+    )
+
+
+def _restore(product_id: str, quantity: int, txn_id: str, in_flight: bool = False) -> UpdateOne:
+    """
+    Undo _decrement for one transaction. The out_of_stock flag is cleared
+    only if this transaction set it; a flag an admin set by hand stays.
+    in_flight=True rolls back a decrement that still carries its marker
+    (no-op if it never applied); otherwise the caller guarantees it runs once.
+    """
+    set_it = {"$eq": [{"$ifNull": ["$out_of_stock_txn", None]}, txn_id]}
+    query = {"id": product_id, "inventory_txns": txn_id} if in_flight else {"id": product_id}
+    return UpdateOne(
+        query,
+        [{"$set": {
+            "out_of_stock": {"$cond": [set_it, False, {"$ifNull": ["$out_of_stock", False]}]},
+            "out_of_stock_txn": {"$cond": [set_it, None, {"$ifNull": ["$out_of_stock_txn", None]}]},
+            "inventory_count": {"$add": ["$inventory_count", quantity]},
+            "inventory_txns": {"$filter": {
+                "input": {"$ifNull": ["$inventory_txns", []]}, "cond": {"$ne": ["$$this", txn_id]}
+            }}
+        }}]
+    )
+
+
+async def decrement_inventory(db, quantities: Dict[str, int], txn_id: str) -> List[str]:
+    """
+    Decrement stock for every tracked product in one bulk_write. Each update
+    is guarded by inventory_count >= quantity, so concurrent checkouts cannot
+    oversell. If any product falls short the successful decrements are rolled
+    back and InsufficientInventory is raised - all or nothing.
+    Returns the ids that were decremented.
+    """
+    if not quantities:
+        return []
+
+    result = await db.products.bulk_write(
+        [_decrement(pid, qty, txn_id) for pid, qty in quantities.items()],
+        ordered=False
+    )
+    if result.modified_count == len(quantities):
+        # Settled - the marker only had to survive until we knew every line applied
+        await db.products.update_many({"id": {"$in": list(quantities)}}, {"$pull": {"inventory_txns": txn_id}})
+        return list(quantities)
+
+    applied = await db.products.distinct("id", {"id": {"$in": list(quantities)}, "inventory_txns": txn_id})
+    failed = [pid for pid in quantities if pid not in applied]
+    if applied:
+        await db.products.bulk_write(
+            [_restore(pid, quantities[pid], txn_id, in_flight=True) for pid in applied],
+            ordered=False
+        )
+    logger.warning(f"⚠️ Inventory decrement {txn_id} rejected for {failed}")
+    raise InsufficientInventory(failed)
+
+
+async def restore_inventory(db, quantities: Dict[str, int], txn_id: str) -> int:
+    """
+    Put back stock taken by a settled transaction; returns products restored.
+    Not idempotent by itself - callers run it once per decrement, e.g. after
+    winning the reservation ledger's conditional status flip.
+    """
+    if not quantities:
+        return 0
+    result = await db.products.bulk_write(
+        [_restore(pid, qty, txn_id) for pid, qty in quantities.items()],
+        ordered=False
+    )
+    return result.modified_count
@@ -0,0 +1,52 @@
+"""One-pass JSON serialization for MongoDB documents"""
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any
+from uuid import UUID
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # falls back to the stdlib encoder
+    orjson = None
+
+
+def _default(value: Any):
+    """Types MongoDB/pydantic hand us that JSON has no native form for"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    # ObjectId and UUID serialize as their string form
+    if isinstance(value, UUID) or type(value).__name__ == "ObjectId":
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    def dumps(content: Any) -> bytes:
+        """Serialize straight to bytes - orjson handles datetimes natively"""
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+else:
+    def dumps(content: Any) -> bytes:
+        """Serialize straight to bytes (stdlib path, same output format)"""
+        return json.dumps(
+            content, default=_default, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+        ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse that skips jsonable_encoder: documents (including
+    datetimes) are encoded to bytes in a single pass. Return it directly
+    from a handler, or set it as the route's response_class.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,115 @@
+"""Filtered order analytics computed inside MongoDB with one $facet aggregation"""
+from datetime import date, timedelta
+from typing import Optional
+from fastapi import HTTPException
+from .order_archive import ARCHIVE_COLLECTION
+
+TOP_PRODUCTS = 10
+
+# created_at is stored as an ISO-8601 string - its first 7 characters are YYYY-MM
+MONTH_OF_CREATED = {"$substrCP": ["$created_at", 0, 7]}
+
+IS_CANCELLED = {"$or": [{"$eq": ["$cancelled", True]}, {"$eq": ["$order_status", "cancelled"]}]}
+
+
+def _parse_day(value: Optional[str], name: str) -> Optional[date]:
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"{name} must be a date (YYYY-MM-DD)")
+
+
+def analytics_match(start: Optional[str] = None, end: Optional[str] = None,
+                    city: Optional[str] = None, state: Optional[str] = None) -> dict:
+    """$match for the filters; start/end are inclusive calendar days (UTC)"""
+    match = {}
+    start_day, end_day = _parse_day(start, "start"), _parse_day(end, "end")
+    if start_day or end_day:
+        # ISO strings sort chronologically, so the range is a plain string range
+        created = {}
+        if start_day:
+            created["$gte"] = start_day.isoformat()
+        if end_day:
+            created["$lt"] = (end_day + timedelta(days=1)).isoformat()
+        match["created_at"] = created
+    if city:
+        match["city"] = city
+    if state:
+        match["state"] = state
+    return match
+
+
+def analytics_pipeline(match: dict) -> list:
+    """
+    Every figure in one round trip: orders are trimmed to the few fields
+    used, then $facet computes status counts, monthly totals and the top
+    products ($unwind over items) server-side. Only the results come back.
+    """
+    return [
+        {"$match": match},
+        # Archived orders count too; the archive is only read for the range asked for
+        {"$unionWith": {"coll": ARCHIVE_COLLECTION, "pipeline": [{"$match": match}]}},
+        {"$project": {
+            "_id": 0,
+            "total": {"$ifNull": ["$total", 0]},
+            "month": MONTH_OF_CREATED,
+            "order_status": 1,
+            "is_cancelled": IS_CANCELLED,
+            "items.name": 1,
+            "items.quantity": 1
+        }},
+        {"$facet": {
+            "by_status": [
+                {"$group": {
+                    "_id": {"cancelled": "$is_cancelled", "delivered": {"$eq": ["$order_status", "delivered"]}},
+                    "orders": {"$sum": 1},
+                    "sales": {"$sum": "$total"}
+                }}
+            ],
+            "monthly": [
+                {"$match": {"is_cancelled": False}},
+                {"$group": {"_id": "$month", "sales": {"$sum": "$total"}, "orders": {"$sum": 1}}},
+                {"$sort": {"_id": 1}}
+            ],
+            "top_products": [
+                {"$match": {"is_cancelled": False}},
+                {"$unwind": "$items"},
+                {"$group": {"_id": {"$ifNull": ["$items.name", "Unknown"]}, "count": {"$sum": "$items.quantity"}}},
+                {"$sort": {"count": -1}},
+                {"$limit": TOP_PRODUCTS}
+            ]
+        }}
+    ]
+
+
+async def aggregate_analytics(db, match: dict) -> dict:
+    """Analytics summary for the orders matching `match` (same shape as the rollup summary)"""
+    cursor = db.orders.aggregate(analytics_pipeline(match), allowDiskUse=True)
+    facets = (await cursor.to_list(1))[0]
+
+    total_orders = total_sales = active = cancelled = completed = 0
+    for group in facets["by_status"]:
+        key = group["_id"]
+        total_orders += group["orders"]
+        if key.get("cancelled"):
+            cancelled += group["orders"]
+            continue
+        total_sales += group["sales"]
+        if key.get("delivered"):
+            completed += group["orders"]
+        else:
+            active += group["orders"]
+
+    months = [m for m in facets["monthly"] if m["_id"]]
+    return {
+        "total_orders": total_orders,
+        "total_sales": total_sales,
+        "active_orders": active,
+        "cancelled_orders": cancelled,
+        "completed_orders": completed,
+        "monthly_sales": {m["_id"]: m["sales"] for m in months},
+        "monthly_orders": {m["_id"]: m["orders"] for m in months},
+        "top_products": [{"name": p["_id"], "count": p["count"]} for p in facets["top_products"]]
+    }
@@ -0,0 +1,122 @@
+"""Hot/cold order tiering - old finished orders move to db.orders_archive"""
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+from pymongo import ReplaceOne
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_COLLECTION = "orders_archive"
+# Delivered/cancelled orders older than this leave db.orders
+ORDER_ARCHIVE_AFTER_DAYS = int(os.environ.get('ORDER_ARCHIVE_AFTER_DAYS', '180'))
+ARCHIVE_BATCH_SIZE = 500
+ARCHIVE_INTERVAL_SECONDS = 6 * 60 * 60
+TERMINAL_STATUSES = ["delivered", "cancelled"]
+
+
+def archivable(cutoff: str) -> dict:
+    """Orders in a terminal state created before `cutoff` (ISO string, like created_at)"""
+    return {
+        "created_at": {"$lt": cutoff},
+        "$or": [{"order_status": {"$in": TERMINAL_STATUSES}}, {"cancelled": True}]
+    }
+
+
+class OrderArchive:
+    """
+    Keeps db.orders down to the working set: a background job moves
+    finished orders older than ORDER_ARCHIVE_AFTER_DAYS, whole, into
+    db.orders_archive in batches (upsert there, then delete here, so a
+    crash in between only repeats work). Lookups that must see every order
+    (tracking, a customer's history, exports) go through find_one()/find()
+    here, which fall back to the archive - indexed on the same identifiers.
+    Archived orders are read-only: paths that change an order answer 409.
+    """
+
+    def __init__(self, after_days: int = ORDER_ARCHIVE_AFTER_DAYS):
+        self.after_days = after_days
+        self._task: Optional[asyncio.Task] = None
+        self.archived = 0
+
+    async def ensure_indexes(self, db):
+        archive = db[ARCHIVE_COLLECTION]
+        await archive.create_index("order_id", unique=True)
+        await archive.create_index("tracking_code")
+        await archive.create_index("phone")
+        await archive.create_index("email")
+        await archive.create_index([("user_id", 1), ("created_at", -1), ("id", -1)])
+        await archive.create_index([("created_at", -1), ("id", -1)])
+        await archive.create_index("facts_seq")
+        # Tracking by phone/email scans these on the hot side too
+        await db.orders.create_index("tracking_code")
+        await db.orders.create_index("phone")
+        await db.orders.create_index("email")
+
+    async def archive_batch(self, db, cutoff: str) -> int:
+        """Move up to ARCHIVE_BATCH_SIZE archivable orders; returns how many left db.orders"""
+        orders = await db.orders.find(archivable(cutoff)).sort("created_at", 1).limit(ARCHIVE_BATCH_SIZE).to_list(ARCHIVE_BATCH_SIZE)
+        if not orders:
+            return 0
+        order_ids = [o["order_id"] for o in orders]
+        now = datetime.now(timezone.utc).isoformat()
+        await db[ARCHIVE_COLLECTION].bulk_write([
+            ReplaceOne({"order_id": o["order_id"]}, {**o, "archived_at": now}, upsert=True) for o in orders
+        ], ordered=False)
+        # Same filter again: an order reopened since it was read stays hot
+        result = await db.orders.delete_many({"order_id": {"$in": order_ids}, **archivable(cutoff)})
+        if result.deleted_count < len(order_ids):
+            reopened = await db.orders.distinct("order_id", {"order_id": {"$in": order_ids}})
+            await db[ARCHIVE_COLLECTION].delete_many({"order_id": {"$in": reopened}})
+        return result.deleted_count
+
+    async def archive(self, db) -> int:
+        """Move every archivable order, batch by batch"""
+        cutoff = (datetime.now(timezone.utc) - timedelta(days=self.after_days)).isoformat()
+        moved = 0
+        while True:
+            count = await self.archive_batch(db, cutoff)
+            moved += count
+            if count < ARCHIVE_BATCH_SIZE:
+                break
+        if moved:
+            logger.info(f"🗄️ Archived {moved} order(s) older than {self.after_days} days")
+        self.archived += moved
+        return moved
+
+    async def run(self, db):
+        """Background loop - archives every ARCHIVE_INTERVAL_SECONDS"""
+        while True:
+            try:
+                await self.archive(db)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Order archival error: {str(e)}")
+            await asyncio.sleep(ARCHIVE_INTERVAL_SECONDS)
+
+    def start(self, db):
+        if self._task is None:
+            self._task = asyncio.create_task(self.run(db))
+
+    async def find_one(self, db, query: dict, projection: Optional[dict] = None, **kwargs) -> Optional[dict]:
+        """db.orders.find_one, falling back to the archive"""
+        projection = projection if projection is not None else {"_id": 0}
+        order = await db.orders.find_one(query, projection, **kwargs)
+        if order is None:
+            order = await db[ARCHIVE_COLLECTION].find_one(query, projection, **kwargs)
+        return order
+
+    async def find(self, db, query: dict, limit: int, projection: Optional[dict] = None) -> List[dict]:
+        """Up to `limit` matching orders from both tiers, hot ones first"""
+        projection = projection if projection is not None else {"_id": 0}
+        orders = await db.orders.find(query, projection).sort("created_at", -1).to_list(limit)
+        if len(orders) < limit:
+            archived = await db[ARCHIVE_COLLECTION].find(query, projection).sort("created_at", -1).to_list(limit - len(orders))
+            orders.extend(archived)
+        return orders
+
+    def stats(self) -> dict:
+        return {"archived": self.archived}
+
@@ -0,0 +1,241 @@
+"""Streaming order export (CSV / NDJSON / XLSX) - one row per item line"""
+import csv
+import io
+import json
+import re
+import zipfile
+import zlib
+from typing import AsyncIterator, Iterator, List, Optional
+from xml.sax.saxutils import escape
+
+EXPORT_FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+EXPORT_BATCH_SIZE = 500
+# Output is handed to the client whenever this much has accumulated
+FLUSH_BYTES = 64 * 1024
+GZIP_LEVEL = 6
+
+ORDER_FIELDS = ["order_id", "created_at", "customer_name", "email", "phone", "city", "state", "pincode",
+                "payment_method", "payment_status", "order_status", "cancelled", "subtotal",
+                "delivery_charge", "total"]
+ITEM_FIELDS = ["name", "weight", "price", "quantity"]
+COLUMNS = ORDER_FIELDS + [f"item_{f}" for f in ITEM_FIELDS] + ["line_total"]
+# Oldest first, tie-broken on id so the (created_at, id) index serves the sort
+EXPORT_SORT = [("created_at", 1), ("id", 1)]
+EXPORT_PROJECTION = {"_id": 0, "id": 1, **{f: 1 for f in ORDER_FIELDS}, **{f"items.{f}": 1 for f in ITEM_FIELDS}}
+
+_FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+# Characters XML 1.0 does not allow, even escaped
+_XML_INVALID = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
+def order_lines(order: dict) -> Iterator[list]:
+    """Flatten an order into one row per item (a single row with blank item columns if it has none)"""
+    head = [order.get(f) for f in ORDER_FIELDS]
+    created_at = head[1]
+    if created_at is not None and not isinstance(created_at, str):
+        head[1] = created_at.isoformat()
+    items = order.get("items") or [{}]
+    for item in items:
+        line = [item.get(f) for f in ITEM_FIELDS]
+        price, quantity = line[2], line[3]
+        line_total = round(price * quantity, 2) if price is not None and quantity is not None else None
+        yield head + line + [line_total]
+
+
+class _Sink:
+    """Write-only file object collecting output until the stream takes it"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self.size = 0
+
+    def write(self, data) -> int:
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        self._chunks.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks, self.size = [], 0
+        return data
+
+
+def _defuse(value):
+    """Keep spreadsheet apps from evaluating customer-entered text as a formula"""
+    if isinstance(value, str) and value[:1] in _FORMULA_PREFIXES:
+        return "'" + value
+    return value
+
+
+class _CsvWriter:
+    def __init__(self, sink: _Sink):
+        self._sink = sink
+        self._buffer = io.StringIO()
+        self._csv = csv.writer(self._buffer)
+
+    def header(self):
+        self._sink.write("\ufeff")  # BOM so Excel opens the file as UTF-8
+        self.row(COLUMNS)
+
+    def row(self, values: list):
+        self._csv.writerow(["" if v is None else _defuse(v) for v in values])
+        self._sink.write(self._buffer.getvalue())
+        self._buffer.seek(0)
+        self._buffer.truncate()
+
+    def close(self):
+        pass
+
+
+class _NdjsonWriter:
+    def __init__(self, sink: _Sink):
+        self._sink = sink
+
+    def header(self):
+        pass
+
+    def row(self, values: list):
+        self._sink.write(json.dumps(dict(zip(COLUMNS, values)), separators=(",", ":"), default=str) + "\n")
+
+    def close(self):
+        pass
+
+
+_XLSX_PARTS = {
+    "[Content_Types].xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    "_rels/.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="xl/workbook.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+        '</Relationships>'
+    ),
+    "xl/workbook.xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Orders" sheetId="1" r:id="rId1"/></sheets></workbook>'
+    ),
+    "xl/_rels/workbook.xml.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="worksheets/sheet1.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"/>'
+        '</Relationships>'
+    ),
+}
+
+
+class _XlsxWriter:
+    """
+    Minimal single-sheet workbook written straight into a streamed zip
+    (inline strings, no shared-string table), so rows never pile up in memory.
+    """
+
+    def __init__(self, sink: _Sink):
+        self._zip = zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED)
+        for name, xml in _XLSX_PARTS.items():
+            self._zip.writestr(name, xml)
+        self._sheet = self._zip.open("xl/worksheets/sheet1.xml", "w", force_zip64=True)
+
+    def header(self):
+        self._sheet.write(
+            b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+        )
+        self.row(COLUMNS)
+
+    def row(self, values: list):
+        cells = []
+        for value in values:
+            if value is None:
+                cells.append("<c/>")
+            elif isinstance(value, (int, float)) and not isinstance(value, bool):
+                cells.append(f"<c><v>{value}</v></c>")
+            else:
+                text = _XML_INVALID.sub("", str(value))
+                cells.append(f'<c t="inlineStr"><is><t>{escape(text)}</t></is></c>')
+        self._sheet.write(f"<row>{''.join(cells)}</row>".encode("utf-8"))
+
+    def close(self):
+        self._sheet.write(b"</sheetData></worksheet>")
+        self._sheet.close()
+        self._zip.close()
+
+
+_WRITERS = {"csv": _CsvWriter, "ndjson": _NdjsonWriter, "xlsx": _XlsxWriter}
+
+
+def export_filename(fmt: str, start: Optional[str], end: Optional[str], gzipped: bool) -> str:
+    span = "_".join(part for part in (start, end) if part) or "all"
+    return f"orders_{span}.{fmt}" + (".gz" if gzipped else "")
+
+
+def _export_key(order: dict) -> tuple:
+    return str(order.get("created_at") or ""), str(order.get("id") or "")
+
+
+async def _merged(cursors: list) -> AsyncIterator[dict]:
+    """Merge cursors that are each sorted oldest first into one stream"""
+    heads = []
+    for cursor in cursors:
+        order = await anext(cursor, None)
+        if order is not None:
+            heads.append([order, cursor])
+    while heads:
+        head = min(heads, key=lambda h: _export_key(h[0]))
+        yield head[0]
+        head[0] = await anext(head[1], None)
+        if head[0] is None:
+            heads.remove(head)
+
+
+async def stream_orders_export(collections: list, query: dict, fmt: str, gzipped: bool = False) -> AsyncIterator[bytes]:
+    """
+    Export the orders matching `query` (oldest first) as `fmt`, merged from
+    one cursor per collection read in EXPORT_BATCH_SIZE batches and yielded
+    in ~FLUSH_BYTES chunks, so memory stays flat however many orders there are.
+    """
+    sink = _Sink()
+    writer = _WRITERS[fmt](sink)
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31) if gzipped else None
+
+    def take(final: bool = False) -> bytes:
+        data = sink.drain()
+        if compressor is not None:
+            data = compressor.compress(data) + (compressor.flush() if final else b"")
+        return data
+
+    writer.header()
+    cursors = [
+        c.find(query, EXPORT_PROJECTION).sort(EXPORT_SORT).batch_size(EXPORT_BATCH_SIZE)
+        for c in collections
+    ]
+    async for order in _merged(cursors):
+        for line in order_lines(order):
+            writer.row(line)
+        if sink.size >= FLUSH_BYTES:
+            chunk = take()
+            if chunk:
+                yield chunk
+    writer.close()
+    yield take(final=True)
@@ -0,0 +1,468 @@
+"""Append-only columnar order facts (memory-mapped NumPy arrays) for ad-hoc analytics"""
+import asyncio
+import fcntl
+import json
+import logging
+import os
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+from fastapi import HTTPException
+from pymongo import ReturnDocument, UpdateOne
+from .order_archive import ARCHIVE_COLLECTION
+
+logger = logging.getLogger(__name__)
+
+REFRESH_BATCH_SIZE = 5000
+# Sequence numbers are taken before the order write lands, so each refresh
+# re-reads this many sequence numbers below its watermark to catch late writes
+SEQ_OVERLAP = 1000
+# Hour/weekday/day/month are bucketed in shop time (IST by default)
+LOCAL_UTC_OFFSET_MINUTES = int(os.environ.get('ANALYTICS_UTC_OFFSET_MINUTES', '330'))
+DEFAULT_QUERY_LIMIT = 100
+MAX_QUERY_LIMIT = 1000
+
+ORDER_COLUMNS = {
+    "seq": np.int64,            # facts_seq of the order version this row records
+    "key": np.int32,            # order_id (dictionary code)
+    "ts": np.int64,             # created_at, epoch seconds (UTC)
+    "city": np.int32,
+    "state": np.int32,
+    "payment_method": np.int32,
+    "order_status": np.int32,
+    "payment_status": np.int32,
+    "cancelled": np.bool_,
+    "total": np.float64,
+}
+ITEM_COLUMNS = {
+    "order_row": np.int64,      # row of the order version the item belongs to
+    "product": np.int32,
+    "weight": np.int32,
+    "quantity": np.int32,
+    "price": np.float64,
+}
+DICTIONARIES = ("key", "city", "state", "payment_method", "order_status", "payment_status", "product", "weight")
+
+# Group-by dimensions; product/weight are per item, everything else per order
+CATEGORY_DIMENSIONS = ("city", "state", "payment_method", "order_status", "payment_status")
+ITEM_DIMENSIONS = ("product", "weight")
+TIME_DIMENSIONS = ("hour", "weekday", "day", "month")
+DIMENSIONS = CATEGORY_DIMENSIONS + ITEM_DIMENSIONS + TIME_DIMENSIONS
+WEEKDAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+
+FACT_FIELDS = {"_id": 0, "order_id": 1, "facts_seq": 1, "created_at": 1, "city": 1, "state": 1,
+               "payment_method": 1, "order_status": 1, "payment_status": 1, "cancelled": 1, "total": 1,
+               "items.name": 1, "items.weight": 1, "items.quantity": 1, "items.price": 1}
+
+
+def _epoch(created_at) -> int:
+    if isinstance(created_at, datetime):
+        created = created_at
+    else:
+        try:
+            created = datetime.fromisoformat(str(created_at).replace('Z', '+00:00'))
+        except ValueError:
+            return 0
+    if created.tzinfo is None:
+        created = created.replace(tzinfo=timezone.utc)
+    return int(created.timestamp())
+
+
+async def _chain(cursors: list):
+    for cursor in cursors:
+        async for document in cursor:
+            yield document
+
+
+class _Dictionary:
+    """Value <-> code mapping, persisted as one JSON value per line (append-only)"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.values: List[str] = []
+        self.codes: Dict[str, int] = {}
+        self.persisted = 0
+        self._offset = 0
+
+    def load(self, count: int):
+        """Pick up values committed (by any process) up to `count`"""
+        if count < self.persisted:
+            self.values, self.codes, self.persisted, self._offset = [], {}, 0, 0
+        if count > self.persisted:
+            with open(self.path, "rb") as f:
+                f.seek(self._offset)
+                for line in f:
+                    if len(self.values) >= count:
+                        break
+                    value = json.loads(line)
+                    self.codes[value] = len(self.values)
+                    self.values.append(value)
+                    self._offset += len(line)
+            self.persisted = len(self.values)
+
+    def code(self, value) -> int:
+        value = "" if value is None else str(value)
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def flush(self):
+        if len(self.values) == self.persisted and self.path.exists():
+            return
+        data = "".join(json.dumps(v) + "\n" for v in self.values[self.persisted:]).encode("utf-8")
+        with open(self.path, "r+b" if self.path.exists() else "wb") as f:
+            # Drop anything an interrupted flush left past the committed values
+            f.truncate(self._offset)
+            f.seek(self._offset)
+            f.write(data)
+        self._offset += len(data)
+        self.persisted = len(self.values)
+
+
+class _CurrentRows:
+    """
+    Which order rows are current - an order appears once per recorded
+    version and the highest seq wins. Kept up to date as rows are appended,
+    so only the new rows are sorted, never the whole store.
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self.mask = np.zeros(0, dtype=np.bool_)
+        self._best = np.zeros(0, dtype=np.int64)  # key code -> current row (-1: none)
+
+    def extend(self, keys: np.ndarray, seqs: np.ndarray, count: int):
+        if count < self.rows:
+            # The store was re-exported from scratch
+            self.__init__()
+        if count == self.rows:
+            return
+        new_keys = keys[self.rows:count].astype(np.int64)
+        new_seqs = seqs[self.rows:count]
+        order = np.lexsort((new_seqs, new_keys))
+        sorted_keys = new_keys[order]
+        last = order[np.append(sorted_keys[1:] != sorted_keys[:-1], True)]
+        cand_keys, cand_rows = new_keys[last], last + self.rows
+
+        if int(cand_keys.max()) >= len(self._best):
+            grown = np.full(int(cand_keys.max()) + 1, -1, dtype=np.int64)
+            grown[:len(self._best)] = self._best
+            self._best = grown
+        mask = np.zeros(count, dtype=np.bool_)
+        mask[:self.rows] = self.mask
+        previous = self._best[cand_keys]
+        had = previous >= 0
+        newer = ~had | (seqs[np.where(had, previous, 0)] < seqs[cand_rows])
+        mask[previous[had & newer]] = False
+        mask[cand_rows[newer]] = True
+        self._best[cand_keys[newer]] = cand_rows[newer]
+        self.mask, self.rows = mask, count
+
+
+class _Snapshot:
+    """Memory-mapped columns as of one meta.json, plus which rows are current"""
+
+    def __init__(self, directory: Path, meta: dict, current: _CurrentRows):
+        self.meta = meta
+        self.orders = {name: self._map(directory / f"orders.{name}.bin", dtype, meta["orders"])
+                       for name, dtype in ORDER_COLUMNS.items()}
+        self.items = {name: self._map(directory / f"items.{name}.bin", dtype, meta["items"])
+                      for name, dtype in ITEM_COLUMNS.items()}
+        current.extend(self.orders["key"], self.orders["seq"], meta["orders"])
+        self.current_orders = current.mask
+
+    @staticmethod
+    def _map(path: Path, dtype, count: int) -> np.ndarray:
+        if not count:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode="r", shape=(count,))
+
+
+class OrderFacts:
+    """
+    Order facts exported to <directory> as one binary file per column
+    (orders.<col>.bin, items.<col>.bin) read through np.memmap, with
+    categorical values dictionary-encoded in dict.<name>.txt and row
+    counts committed last in meta.json. Every order change stamps the order
+    with a new facts_seq (db.counters); refresh() appends the versions
+    above its watermark, so each row is written once and never rewritten.
+    Delete the directory to re-export everything on the next refresh.
+    File I/O and queries run in worker threads (asyncio.to_thread) so they
+    never stall the event loop; only the Mongo reads stay on it.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self._lock = asyncio.Lock()
+        # Guards dictionaries and snapshots shared by refresh/query threads
+        self._thread_lock = threading.Lock()
+        self._dictionaries = {name: _Dictionary(self.directory / f"dict.{name}.txt") for name in DICTIONARIES}
+        self._snapshot: Optional[_Snapshot] = None
+        self._current = _CurrentRows()
+        self.appended = 0
+
+    async def ensure_indexes(self, db):
+        await db.orders.create_index("facts_seq")
+
+    async def mark(self, db, order_ids) -> int:
+        """Stamp changed orders with fresh sequence numbers so the next refresh exports them"""
+        order_ids = list(dict.fromkeys(order_ids))
+        if not order_ids:
+            return 0
+        counter = await db.counters.find_one_and_update(
+            {"_id": "order_facts"},
+            {"$inc": {"value": len(order_ids)}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        first = counter["value"] - len(order_ids) + 1
+        await db.orders.bulk_write([
+            UpdateOne({"order_id": order_id}, {"$max": {"facts_seq": first + i}})
+            for i, order_id in enumerate(order_ids)
+        ], ordered=False)
+        return len(order_ids)
+
+    async def backfill(self, db) -> int:
+        """Stamp orders that predate the fact store"""
+        marked = 0
+        while True:
+            batch = await db.orders.find(
+                {"facts_seq": None, "order_id": {"$type": "string"}}, {"_id": 0, "order_id": 1}
+            ).limit(REFRESH_BATCH_SIZE).to_list(REFRESH_BATCH_SIZE)
+            if not batch:
+                return marked
+            marked += await self.mark(db, [o["order_id"] for o in batch])
+
+    # ----- storage -----
+
+    def _read_meta(self) -> dict:
+        try:
+            with open(self.directory / "meta.json", "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"orders": 0, "items": 0, "watermark": 0, "dictionaries": {name: 0 for name in DICTIONARIES}}
+
+    def _write_meta(self, meta: dict):
+        tmp = self.directory / "meta.json.tmp"
+        with open(tmp, "w") as f:
+            json.dump(meta, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.directory / "meta.json")
+
+    def _append_columns(self, prefix: str, columns: dict, rows: Dict[str, list], count: int):
+        for name, dtype in columns.items():
+            path = self.directory / f"{prefix}.{name}.bin"
+            with open(path, "r+b" if path.exists() else "wb") as f:
+                # Rows past the committed count belong to an interrupted append
+                f.truncate(count * np.dtype(dtype).itemsize)
+                f.seek(0, os.SEEK_END)
+                f.write(np.asarray(rows[name], dtype=dtype).tobytes())
+
+    def snapshot(self) -> _Snapshot:
+        meta = self._read_meta()
+        with self._thread_lock:
+            if self._snapshot is None or self._snapshot.meta != meta:
+                self._snapshot = _Snapshot(self.directory, meta, self._current)
+            return self._snapshot
+
+    # ----- export -----
+
+    async def refresh(self, db) -> int:
+        """Append every order version stamped since the last refresh"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        async with self._lock:
+            with open(self.directory / ".lock", "w") as lock_file:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    # Another worker on this host is appending; query what is there
+                    return 0
+                try:
+                    return await self._refresh(db)
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _prepare(self) -> tuple:
+        """Committed meta, dictionaries loaded to it, and the seqs exported inside the overlap window"""
+        meta = self._read_meta()
+        with self._thread_lock:
+            for name, dictionary in self._dictionaries.items():
+                dictionary.load(meta["dictionaries"].get(name, 0))
+        floor = max(meta["watermark"] - SEQ_OVERLAP, 0)
+        seen = set()
+        if meta["orders"]:
+            seqs = np.memmap(self.directory / "orders.seq.bin", dtype=np.int64, mode="r", shape=(meta["orders"],))
+            seen = set(seqs[seqs > floor].tolist())
+        return meta, floor, seen
+
+    def _commit(self, meta: dict, order_rows: dict, item_rows: dict, watermark: int):
+        # Data and dictionaries first, meta.json last: readers only see committed rows
+        with self._thread_lock:
+            for dictionary in self._dictionaries.values():
+                dictionary.flush()
+            counts = {name: len(d.values) for name, d in self._dictionaries.items()}
+        self._append_columns("orders", ORDER_COLUMNS, order_rows, meta["orders"])
+        self._append_columns("items", ITEM_COLUMNS, item_rows, meta["items"])
+        self._write_meta({
+            "orders": meta["orders"] + len(order_rows["seq"]),
+            "items": meta["items"] + len(item_rows["order_row"]),
+            "watermark": watermark,
+            "dictionaries": counts
+        })
+
+    async def _refresh(self, db) -> int:
+        meta, floor, seen = await asyncio.to_thread(self._prepare)
+
+        order_rows = {name: [] for name in ORDER_COLUMNS}
+        item_rows = {name: [] for name in ITEM_COLUMNS}
+        watermark = meta["watermark"]
+        codes = self._dictionaries
+        # Archived orders were exported while hot; reading the archive too
+        # only matters when the store is re-exported from scratch
+        cursors = [
+            c.find({"facts_seq": {"$gt": floor}}, FACT_FIELDS).sort("facts_seq", 1).batch_size(REFRESH_BATCH_SIZE)
+            for c in (db.orders, db[ARCHIVE_COLLECTION])
+        ]
+        async for order in _chain(cursors):
+            seq = order["facts_seq"]
+            watermark = max(watermark, seq)
+            if seq in seen:
+                continue
+            row = meta["orders"] + len(order_rows["seq"])
+            order_rows["seq"].append(seq)
+            order_rows["key"].append(codes["key"].code(order.get("order_id")))
+            order_rows["ts"].append(_epoch(order.get("created_at")))
+            for name in CATEGORY_DIMENSIONS:
+                order_rows[name].append(codes[name].code(order.get(name)))
+            order_rows["cancelled"].append(bool(order.get("cancelled")) or order.get("order_status") == "cancelled")
+            order_rows["total"].append(order.get("total", 0) or 0)
+            for item in order.get("items", []):
+                item_rows["order_row"].append(row)
+                item_rows["product"].append(codes["product"].code(item.get("name", "Unknown")))
+                item_rows["weight"].append(codes["weight"].code(item.get("weight")))
+                item_rows["quantity"].append(item.get("quantity", 0) or 0)
+                item_rows["price"].append(item.get("price", 0) or 0)
+
+        appended = len(order_rows["seq"])
+        if not appended and watermark == meta["watermark"]:
+            return 0
+        await asyncio.to_thread(self._commit, meta, order_rows, item_rows, watermark)
+        self.appended += appended
+        if appended:
+            logger.info(f"📦 Appended {appended} order versions to the fact store")
+        return appended
+
+    # ----- queries -----
+
+    def _labels(self, name: str, snap: _Snapshot) -> List[str]:
+        dictionary = self._dictionaries[name]
+        with self._thread_lock:
+            dictionary.load(snap.meta["dictionaries"].get(name, 0))
+        return dictionary.values
+
+    def query(self, group_by: List[str], start: Optional[str] = None, end: Optional[str] = None,
+              filters: Optional[Dict[str, str]] = None, include_cancelled: bool = False,
+              limit: int = DEFAULT_QUERY_LIMIT) -> dict:
+        """
+        Vectorized group-by over the current version of every order:
+        {group_by, rows: [{<dimension>: label, orders, sales[, quantity]}]},
+        largest sales first. Grouping by product/weight counts item lines.
+        Blocking - call it through asyncio.to_thread.
+        """
+        unknown = [d for d in group_by if d not in DIMENSIONS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown dimension(s): {', '.join(unknown)}")
+        limit = max(1, min(limit, MAX_QUERY_LIMIT))
+        snap = self.snapshot()
+        orders, items = snap.orders, snap.items
+
+        mask = snap.current_orders.copy()
+        if not include_cancelled:
+            mask &= ~orders["cancelled"]
+        local = orders["ts"] + LOCAL_UTC_OFFSET_MINUTES * 60
+        for bound, compare in ((start, np.greater_equal), (end, np.less)):
+            if bound:
+                try:
+                    day = datetime.fromisoformat(bound).replace(tzinfo=timezone.utc)
+                except ValueError:
+                    raise HTTPException(status_code=400, detail="start/end must be dates (YYYY-MM-DD)")
+                # end is inclusive: compare against the start of the next day
+                edge = int(day.timestamp()) + (86400 if compare is np.less else 0)
+                mask &= compare(local, edge)
+        for name, value in (filters or {}).items():
+            self._labels(name, snap)
+            code = self._dictionaries[name].codes.get(value)
+            if code is None:
+                mask[:] = False
+            else:
+                mask &= orders[name] == code
+
+        per_item = any(d in ITEM_DIMENSIONS for d in group_by)
+        if per_item:
+            rows = np.nonzero(mask[items["order_row"]])[0]
+            order_rows = items["order_row"][rows]
+            quantity = items["quantity"][rows].astype(np.int64)
+            sales = items["price"][rows] * quantity
+        else:
+            order_rows = np.nonzero(mask)[0]
+            quantity = None
+            sales = orders["total"][order_rows]
+
+        seconds = local[order_rows]
+        codes, labels = [], []
+        for dimension in group_by:
+            if dimension in ITEM_DIMENSIONS:
+                values = items[dimension][rows]
+                names = self._labels(dimension, snap)
+                labels.append(lambda c, names=names: names[c])
+            elif dimension in CATEGORY_DIMENSIONS:
+                values = orders[dimension][order_rows]
+                names = self._labels(dimension, snap)
+                labels.append(lambda c, names=names: names[c])
+            elif dimension == "hour":
+                values = (seconds // 3600) % 24
+                labels.append(int)
+            elif dimension == "weekday":
+                values = (seconds // 86400 + 3) % 7  # 1970-01-01 was a Thursday
+                labels.append(lambda c: WEEKDAYS[c])
+            elif dimension == "day":
+                values = seconds // 86400
+                labels.append(lambda c: str(np.datetime64(int(c), "D")))
+            else:
+                values = seconds.astype("datetime64[s]").astype("datetime64[M]").astype(np.int64)
+                labels.append(lambda c: str(np.datetime64(int(c), "M")))
+            codes.append(np.asarray(values, dtype=np.int64))
+
+        if codes:
+            offsets = [c.min() if len(c) else 0 for c in codes]
+            shape = [int(c.max() - o) + 1 if len(c) else 1 for c, o in zip(codes, offsets)]
+            composite = np.ravel_multi_index([c - o for c, o in zip(codes, offsets)], shape)
+        else:
+            offsets, shape = [], []
+            composite = np.zeros(len(sales), dtype=np.int64)
+        groups, inverse = np.unique(composite, return_inverse=True)
+        counts = np.bincount(inverse, minlength=len(groups))
+        sales_sums = np.bincount(inverse, weights=sales, minlength=len(groups))
+        quantity_sums = np.bincount(inverse, weights=quantity, minlength=len(groups)) if per_item else None
+
+        top = np.argsort(-sales_sums, kind="stable")[:limit]
+        indices = np.unravel_index(groups[top], shape) if codes else []
+        result = []
+        for position, group in enumerate(top):
+            row = {d: labels[i](int(indices[i][position] + offsets[i])) for i, d in enumerate(group_by)}
+            row["orders"] = int(counts[group])
+            row["sales"] = round(float(sales_sums[group]), 2)
+            if per_item:
+                row["quantity"] = int(quantity_sums[group])
+            result.append(row)
+        return {"group_by": group_by, "groups": len(groups), "rows": result}
+
+    def stats(self) -> dict:
+        meta = self._read_meta()
+        return {"rows": meta["orders"], "item_rows": meta["items"], "watermark": meta["watermark"], "appended": self.appended}
@@ -0,0 +1,81 @@
+"""Unique, time-ordered order id allocation from per-day counter blocks"""
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime
+from pymongo import ReturnDocument
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+ORDER_ID_PREFIX = "AL"
+# Most ids reserved per round trip to db.counters
+ORDER_ID_BLOCK_SIZE = int(os.environ.get('ORDER_ID_BLOCK_SIZE', '20'))
+# Unused ids in a block older than this are abandoned, so ids issued by
+# different workers stay ordered to within a few seconds
+ORDER_ID_BLOCK_MAX_AGE_SECONDS = 5
+# Fixed-width sequence keeps ids of the same day lexicographically ordered
+SEQUENCE_DIGITS = 6
+
+
+def format_order_id(day: str, sequence: int) -> str:
+    return f"{ORDER_ID_PREFIX}{day}{sequence:0{SEQUENCE_DIGITS}d}"
+
+
+class OrderIdAllocator:
+    """
+    Order ids are AL<YYYYMMDD><6-digit sequence>. Each worker reserves a
+    block of sequence numbers with one atomic $inc on db.counters
+    ({_id: "order_id:<day>", value}) and hands them out from memory, so
+    ids never collide across workers and sort by day, then by reservation.
+    Blocks start at one id and double while they keep running out, so a
+    quiet worker does not burn sequence numbers it will abandon.
+    """
+
+    def __init__(self, block_size: int = ORDER_ID_BLOCK_SIZE):
+        self.block_size = block_size
+        self._lock = asyncio.Lock()
+        self._day = None
+        self._next = 0
+        self._end = 0
+        self._reserved_at = 0.0
+        self._size = 1
+        self.blocks = 0
+        self.issued = 0
+
+    async def ensure_indexes(self, db):
+        try:
+            await db.orders.create_index("order_id", unique=True)
+        except OperationFailure as e:
+            # Older random ids may already collide - keep lookups indexed anyway
+            logger.warning(f"⚠️ order_id is not unique in existing orders ({str(e)}); using a non-unique index")
+            await db.orders.create_index("order_id")
+
+    async def _reserve(self, db, day: str, exhausted: bool):
+        self._size = min(self._size * 2, self.block_size) if exhausted else 1
+        counter = await db.counters.find_one_and_update(
+            {"_id": f"order_id:{day}"},
+            {"$inc": {"value": self._size}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        self._day = day
+        self._end = counter["value"] + 1
+        self._next = self._end - self._size
+        self._reserved_at = time.monotonic()
+        self.blocks += 1
+
+    async def next_id(self, db) -> str:
+        async with self._lock:
+            day = datetime.now().strftime('%Y%m%d')
+            stale = day != self._day or time.monotonic() - self._reserved_at > ORDER_ID_BLOCK_MAX_AGE_SECONDS
+            if stale or self._next >= self._end:
+                await self._reserve(db, day, exhausted=not stale)
+            sequence = self._next
+            self._next += 1
+            self.issued += 1
+        return format_order_id(day, sequence)
+
+    def stats(self) -> dict:
+        return {"blocks": self.blocks, "issued": self.issued}
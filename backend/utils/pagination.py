@@ -0,0 +1,134 @@
+"""Keyset (cursor) pagination for list endpoints"""
+import base64
+import json
+from datetime import datetime, timezone
+from typing import List, Optional, Sequence, Tuple
+from fastapi import HTTPException
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Newest first; id breaks ties between documents created in the same instant
+NEWEST_FIRST = (("created_at", -1), ("id", -1))
+
+
+def clamp_limit(limit: int) -> int:
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def iso_string(value):
+    """A datetime as the ISO string collections with string created_at store (naive = UTC)"""
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.isoformat()
+    return value
+
+
+def encode_cursor(values: list) -> str:
+    """Opaque cursor for the sort key values of the last document on a page"""
+    payload = [{"$date": v.isoformat()} if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> list:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        if not isinstance(payload, list) or len(payload) != size:
+            raise ValueError("wrong shape")
+        return [
+            datetime.fromisoformat(v["$date"]) if isinstance(v, dict) and "$date" in v else v
+            for v in payload
+        ]
+    except (ValueError, TypeError, KeyError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def after_cursor(sort: Tuple[Tuple[str, int], ...], values: list) -> dict:
+    """
+    Filter for documents strictly after `values` in `sort` order:
+    (k1 past v1) OR (k1 == v1 AND k2 past v2) OR ...
+    """
+    clauses = []
+    for i, (field, direction) in enumerate(sort):
+        clause = {f: values[j] for j, (f, _) in enumerate(sort[:i])}
+        clause[field] = {"$lt" if direction < 0 else "$gt": values[i]}
+        clauses.append(clause)
+    return {"$or": clauses}
+
+
+async def paginate(
+    collection,
+    query: dict,
+    limit: int,
+    cursor: Optional[str] = None,
+    include_total: bool = False,
+    sort: Tuple[Tuple[str, int], ...] = NEWEST_FIRST,
+    projection: Optional[dict] = None,
+    iso_dates: bool = False
+) -> dict:
+    """
+    One page of `collection` in `sort` order: {items, next[, total]}.
+    Pages continue from the cursor's sort values instead of skipping, so
+    every page is an index range scan no matter how deep it is.
+    MongoDB compares a date only with dates, so with iso_dates=True (sort
+    keys stored as ISO strings) datetime cursor values become strings too.
+    """
+    limit = clamp_limit(limit)
+    page_query = query
+    if cursor:
+        values = decode_cursor(cursor, len(sort))
+        if iso_dates:
+            values = [iso_string(v) for v in values]
+        after = after_cursor(sort, values)
+        page_query = {"$and": [query, after]} if query else after
+
+    items: List[dict] = await collection.find(
+        page_query, projection if projection is not None else {"_id": 0}
+    ).sort(list(sort)).limit(limit + 1).to_list(limit + 1)
+
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        last = items[-1]
+        next_cursor = encode_cursor([last.get(field) for field, _ in sort])
+
+    page = {"items": items, "next": next_cursor}
+    if include_total:
+        page["total"] = await collection.count_documents(query)
+    return page
+
+
+async def paginate_union(
+    collections: Sequence,
+    query: dict,
+    limit: int,
+    cursor: Optional[str] = None,
+    include_total: bool = False,
+    sort: Tuple[Tuple[str, int], ...] = NEWEST_FIRST,
+    projection: Optional[dict] = None
+) -> dict:
+    """
+    paginate() over several collections holding disjoint documents (e.g.
+    hot and archived orders): each is read with the same cursor filter and
+    the pages are merged in `sort` order, so one cursor walks them all.
+    """
+    limit = clamp_limit(limit)
+    pages = [await paginate(c, query, limit, cursor, include_total, sort, projection) for c in collections]
+    items = [item for page in pages for item in page["items"]]
+    # Stable sorts from the last key to the first give the full sort order
+    for field, direction in reversed(sort):
+        items.sort(key=lambda d: (d.get(field) is not None, d.get(field)), reverse=direction < 0)
+
+    more = len(items) > limit or any(page["next"] for page in pages)
+    items = items[:limit]
+    next_cursor = None
+    if more and items:
+        next_cursor = encode_cursor([items[-1].get(field) for field, _ in sort])
+
+    page = {"items": items, "next": next_cursor}
+    if include_total:
+        page["total"] = sum(p["total"] for p in pages)
+    return page
@@ -0,0 +1,194 @@
+"""Inventory reservation ledger - time-limited stock holds for unpaid orders"""
+import asyncio
+import logging
+import os
+from datetime import datetime, timezone, timedelta
+from typing import Dict, List, Optional
+from .inventory import InsufficientInventory, decrement_inventory, restore_inventory
+
+logger = logging.getLogger(__name__)
+
+# How long an unpaid online order may hold stock
+RESERVATION_TTL_MINUTES = int(os.environ.get('RESERVATION_TTL_MINUTES', '30'))
+SWEEP_INTERVAL_SECONDS = 60
+SWEEP_BATCH_SIZE = 100
+# Closed ledger entries are dropped by a TTL index after this long
+CLOSED_RESERVATION_RETENTION_DAYS = 7
+# Payment settled outside the app (admin confirms) - stock is committed at checkout
+OFFLINE_PAYMENT_METHODS = ("whatsapp", "cod")
+# Set by the sweeper on orders whose hold lapsed before payment
+EXPIRED_CANCEL_REASON = "Payment not completed in time"
+
+HELD = "held"
+COMMITTED = "committed"
+RELEASED = "released"
+
+
+class InventoryReservations:
+    """
+    db.inventory_reservations holds one entry per order:
+    {_id: order uuid, order_id, items: {product_id: qty}, status, expires_at}.
+    Stock is taken at checkout (utils.inventory, keyed by the order uuid)
+    and the entry records whether it is a timed hold, committed, or given
+    back. Status changes are conditional updates, so a payment commit and
+    the sweeper releasing the same hold cannot both win - and only the
+    caller that flips an entry to released puts its stock back.
+    """
+
+    def __init__(self, on_stock_change=None, on_expire=None):
+        self._on_stock_change = on_stock_change
+        self._on_expire = on_expire
+        self._task = None
+        self.released = 0
+        self.orders_expired = 0
+
+    async def ensure_indexes(self, db):
+        # The sweeper's range scan: status == held, expires_at <= now
+        await db.inventory_reservations.create_index([("status", 1), ("expires_at", 1)])
+        await db.inventory_reservations.create_index("order_id")
+        await db.inventory_reservations.create_index(
+            "closed_at", expireAfterSeconds=CLOSED_RESERVATION_RETENTION_DAYS * 86400
+        )
+
+    async def hold(self, db, order: dict, quantities: Dict[str, int], expires: bool) -> List[str]:
+        """
+        Take stock for an order (raises InsufficientInventory). With
+        expires=True the hold lapses after RESERVATION_TTL_MINUTES unless
+        committed; otherwise it is committed straight away.
+        """
+        decremented = await decrement_inventory(db, quantities, order["id"])
+        if not quantities and not expires:
+            return decremented
+        now = datetime.now(timezone.utc)
+        try:
+            await db.inventory_reservations.insert_one({
+                "_id": order["id"],
+                "order_id": order["order_id"],
+                "items": quantities,
+                "status": HELD if expires else COMMITTED,
+                "expires_at": now + timedelta(minutes=RESERVATION_TTL_MINUTES) if expires else None,
+                "created_at": now,
+                "closed_at": None
+            })
+        except Exception:
+            await restore_inventory(db, quantities, order["id"])
+            raise
+        return decremented
+
+    async def commit(self, db, order_id: str) -> bool:
+        """
+        Make an order's hold permanent once it is paid. A hold that was
+        already released is taken again if the stock is still there.
+        Returns False only when it is not - the order has no stock behind it.
+        """
+        result = await db.inventory_reservations.update_one(
+            {"order_id": order_id, "status": HELD},
+            {"$set": {"status": COMMITTED, "expires_at": None}}
+        )
+        if result.modified_count:
+            return True
+        # Claim the released entry first, so a retried payment re-takes the stock once
+        entry = await db.inventory_reservations.find_one_and_update(
+            {"order_id": order_id, "status": RELEASED},
+            {"$set": {"status": COMMITTED, "expires_at": None, "closed_at": None}}
+        )
+        if not entry:
+            return True  # Already committed, or nothing was held
+        items = entry.get("items") or {}
+        try:
+            await decrement_inventory(db, items, entry["_id"])
+        except InsufficientInventory:
+            await db.inventory_reservations.update_one(
+                {"_id": entry["_id"], "status": COMMITTED},
+                {"$set": {"status": RELEASED, "closed_at": datetime.now(timezone.utc)}}
+            )
+            logger.warning(f"⚠️ Order {order_id} was paid after its stock hold was released - stock is gone")
+            return False
+        logger.info(f"🔁 Order {order_id} was paid after its stock hold was released - stock taken again")
+        if items and self._on_stock_change:
+            await self._on_stock_change(list(items))
+        return True
+
+    async def release(self, db, order_id: str) -> List[str]:
+        """Give back an order's stock (idempotent); returns product ids restored"""
+        entry = await db.inventory_reservations.find_one_and_update(
+            {"order_id": order_id, "status": {"$in": [HELD, COMMITTED]}},
+            {"$set": {"status": RELEASED, "closed_at": datetime.now(timezone.utc)}}
+        )
+        if not entry:
+            return []
+        return await self._restore(db, entry)
+
+    async def _restore(self, db, entry: dict) -> List[str]:
+        items = entry.get("items") or {}
+        await restore_inventory(db, items, entry["_id"])
+        self.released += 1
+        if items and self._on_stock_change:
+            await self._on_stock_change(list(items))
+        return list(items)
+
+    async def sweep(self, db) -> int:
+        """Release expired holds and cancel their still-unpaid orders, in batches"""
+        swept = 0
+        while True:
+            now = datetime.now(timezone.utc)
+            expired = await db.inventory_reservations.find(
+                {"status": HELD, "expires_at": {"$lte": now}},
+                {"_id": 1}
+            ).sort("expires_at", 1).limit(SWEEP_BATCH_SIZE).to_list(SWEEP_BATCH_SIZE)
+            if not expired:
+                break
+
+            order_ids = []
+            for candidate in expired:
+                # Claim each hold - a concurrent payment commit or another worker may win
+                entry = await db.inventory_reservations.find_one_and_update(
+                    {"_id": candidate["_id"], "status": HELD},
+                    {"$set": {"status": RELEASED, "closed_at": now}}
+                )
+                if entry:
+                    await self._restore(db, entry)
+                    order_ids.append(entry["order_id"])
+
+            if order_ids:
+                result = await db.orders.update_many(
+                    {"order_id": {"$in": order_ids}, "payment_status": "pending", "cancelled": {"$ne": True}},
+                    {"$set": {
+                        "cancelled": True,
+                        "cancel_reason": EXPIRED_CANCEL_REASON,
+                        "cancelled_at": now.isoformat(),
+                        "order_status": "cancelled",
+                        "payment_status": "cancelled"
+                    }}
+                )
+                self.orders_expired += result.modified_count
+                if result.modified_count and self._on_expire:
+                    await self._on_expire(order_ids)
+                logger.info(f"⏰ Released {len(order_ids)} expired stock hold(s), cancelled {result.modified_count} unpaid order(s)")
+            swept += len(order_ids)
+            if len(expired) < SWEEP_BATCH_SIZE:
+                break
+        return swept
+
+    async def run(self, db):
+        """Background loop - sweeps every SWEEP_INTERVAL_SECONDS"""
+        while True:
+            try:
+                await self.sweep(db)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Reservation sweeper error: {str(e)}")
+            await asyncio.sleep(SWEEP_INTERVAL_SECONDS)
+
+    def start(self, db):
+        if self._task is None:
+            self._task = asyncio.create_task(self.run(db))
+
+    def stats(self) -> dict:
+        return {"released": self.released, "orders_expired": self.orders_expired}
+
+
+def holds_expire(payment_method: Optional[str], custom_city_request: bool) -> bool:
+    """Only orders paid online right away get a timed hold"""
+    return not custom_city_request and (payment_method or "").lower() not in OFFLINE_PAYMENT_METHODS
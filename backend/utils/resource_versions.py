@@ -0,0 +1,61 @@
+"""Version counters for cached resources (products, locations, settings...)"""
+import os
+import time
+import logging
+from pymongo import ReturnDocument
+
+logger = logging.getLogger(__name__)
+
+VERSION_SYNC_INTERVAL_SECONDS = float(os.environ.get('VERSION_SYNC_INTERVAL_SECONDS', '2'))
+
+
+class ResourceVersions:
+    """
+    Monotonic per-resource version counters stored in db.resource_versions.
+
+    Admin writes call bump() which increments the counter in MongoDB. Readers
+    call get() which answers from a local copy and re-syncs all counters with
+    a single tiny query at most once per sync interval, so other workers pick
+    up a write within a couple of seconds without a round trip per request.
+    """
+
+    def __init__(self, sync_interval: float = VERSION_SYNC_INTERVAL_SECONDS):
+        self._versions = {}
+        self._synced_at = 0.0
+        self._sync_interval = sync_interval
+        self.syncs = 0
+
+    async def sync(self, db):
+        """Reload every counter from MongoDB"""
+        # Mark as synced before awaiting so concurrent readers don't all query
+        self._synced_at = time.monotonic()
+        docs = await db.resource_versions.find({}, {"_id": 1, "version": 1}).to_list(1000)
+        for doc in docs:
+            resource = doc["_id"]
+            self._versions[resource] = max(doc.get("version", 0), self._versions.get(resource, 0))
+        self.syncs += 1
+
+    async def get(self, db, resource: str) -> int:
+        """Current version of a resource (0 if it was never bumped)"""
+        if time.monotonic() - self._synced_at >= self._sync_interval:
+            try:
+                await self.sync(db)
+            except Exception as e:
+                logger.error(f"Failed to sync resource versions: {str(e)}")
+        return self._versions.get(resource, 0)
+
+    async def bump(self, db, resource: str) -> int:
+        """Increment a resource version after its data changed"""
+        doc = await db.resource_versions.find_one_and_update(
+            {"_id": resource},
+            {"$inc": {"version": 1}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        version = doc["version"]
+        self._versions[resource] = max(version, self._versions.get(resource, 0))
+        return version
+
+    def snapshot(self) -> dict:
+        """Locally known versions (for diagnostics)"""
+        return dict(self._versions)
@@ -0,0 +1,263 @@
+"""Incrementally maintained sales rollups behind the analytics summary"""
+import logging
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Optional
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+from .order_archive import ARCHIVE_COLLECTION
+
+logger = logging.getLogger(__name__)
+
+TOP_PRODUCTS = 10
+# Daily totals returned with the summary
+RECENT_DAYS = 31
+REBUILD_BATCH_SIZE = 1000
+SUMMARY_ID = "summary"
+# A rebuild writes here and renames it over sales_rollups when done
+REBUILD_COLLECTION = "sales_rollups_rebuild"
+# Held while a rebuild runs (server or script); syncs queue their order ids on it
+REBUILD_LOCK_COLLECTION = "sales_rollups_lock"
+REBUILD_LOCK_ID = "rebuild"
+# A lock older than this belongs to a crashed rebuild and is ignored / taken over
+REBUILD_LOCK_TIMEOUT = timedelta(hours=1)
+
+ACTIVE = "active"
+COMPLETED = "completed"
+CANCELLED = "cancelled"
+
+# Only what the rollups are computed from
+ROLLUP_FIELDS = {"_id": 0, "order_id": 1, "order_status": 1, "cancelled": 1, "total": 1,
+                 "created_at": 1, "items.name": 1, "items.quantity": 1, "rollup_state": 1}
+
+
+class RebuildInProgress(Exception):
+    """Raised when another process is already rebuilding the rollups"""
+
+
+def order_bucket(order: dict) -> str:
+    """Which summary counter an order belongs to right now"""
+    if order.get("cancelled", False) or order.get("order_status") == CANCELLED:
+        return CANCELLED
+    if order.get("order_status") == "delivered":
+        return COMPLETED
+    return ACTIVE
+
+
+def _created(order: dict) -> Optional[datetime]:
+    created_at = order.get("created_at")
+    if isinstance(created_at, datetime):
+        return created_at
+    if created_at:
+        try:
+            return datetime.fromisoformat(created_at.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+    return None
+
+
+def _contribute(incs: Dict[str, Dict[str, float]], order: dict, bucket: Optional[str], sign: int):
+    """Add (sign=1) or remove (sign=-1) an order's share of every rollup document"""
+    if bucket is None:
+        return
+    summary = incs[SUMMARY_ID]
+    summary["orders"] += sign
+    summary[bucket] += sign
+    # Sales, calendar totals and product counts exclude cancelled orders
+    if bucket == CANCELLED:
+        return
+    total = order.get("total", 0) or 0
+    summary["sales"] += sign * total
+    created = _created(order)
+    if created:
+        for period, key in (("month", created.strftime("%Y-%m")), ("day", created.strftime("%Y-%m-%d"))):
+            incs[f"{period}:{key}"]["sales"] += sign * total
+            incs[f"{period}:{key}"]["orders"] += sign
+    for item in order.get("items", []):
+        incs[f"product:{item.get('name', 'Unknown')}"]["quantity"] += sign * (item.get("quantity", 0) or 0)
+
+
+def _rollup_ops(incs: Dict[str, Dict[str, float]]) -> list:
+    ops = []
+    for rollup_id, fields in incs.items():
+        fields = {k: v for k, v in fields.items() if v}
+        if not fields:
+            continue
+        kind, _, key = rollup_id.partition(":")
+        ops.append(UpdateOne(
+            {"_id": rollup_id},
+            {"$inc": fields, "$set": {"kind": kind, "key": key or kind}},
+            upsert=True
+        ))
+    return ops
+
+
+class SalesRollups:
+    """
+    db.sales_rollups holds a handful of small documents the dashboard reads:
+    {_id: "summary", orders, active, completed, cancelled, sales},
+    {_id: "month:YYYY-MM" | "day:YYYY-MM-DD", kind, key, sales, orders} and
+    {_id: "product:<name>", kind: "product", key, quantity}.
+    Every order records the bucket it is counted in (rollup_state); sync()
+    moves it to its current bucket with a conditional update and applies
+    the difference as $inc, so concurrent or repeated syncs count once.
+
+    rebuild() is safe against live traffic: it holds a lock document while
+    it recomputes into a separate collection and renames that over
+    sales_rollups. Syncs during a rebuild only queue their order ids on
+    the lock; the rebuild syncs them once the new rollups are in place.
+    """
+
+    def __init__(self):
+        self.synced = 0
+        self.queued = 0
+
+    async def ensure_indexes(self, db):
+        await self._create_indexes(db.sales_rollups)
+
+    async def _create_indexes(self, collection):
+        await collection.create_index([("kind", 1), ("quantity", -1)])
+        await collection.create_index([("kind", 1), ("key", 1)])
+
+    async def sync(self, db, order_ids: Iterable[str]) -> int:
+        """Bring the rollups up to date with the current state of these orders"""
+        order_ids = list(order_ids)
+        if not order_ids:
+            return 0
+        if await self._queue_if_rebuilding(db, order_ids):
+            return 0
+        orders = await db.orders.find({"order_id": {"$in": order_ids}}, ROLLUP_FIELDS).to_list(None)
+        incs = defaultdict(lambda: defaultdict(float))
+        changed = 0
+        for order in orders:
+            previous = order.get("rollup_state")
+            bucket = order_bucket(order)
+            if previous == bucket:
+                continue
+            # Claim the transition - a concurrent sync of the same order loses here
+            claimed = await db.orders.update_one(
+                {"order_id": order["order_id"], "rollup_state": previous},
+                {"$set": {"rollup_state": bucket}}
+            )
+            if not claimed.modified_count:
+                continue
+            _contribute(incs, order, previous, -1)
+            _contribute(incs, order, bucket, 1)
+            changed += 1
+        ops = _rollup_ops(incs)
+        if ops:
+            await db.sales_rollups.bulk_write(ops, ordered=False)
+        self.synced += changed
+        return changed
+
+    async def _queue_if_rebuilding(self, db, order_ids: list) -> bool:
+        """Park order ids on a running rebuild's lock instead of touching the rollups it replaces"""
+        queued = await db[REBUILD_LOCK_COLLECTION].update_one(
+            {"_id": REBUILD_LOCK_ID, "started_at": {"$gt": datetime.now(timezone.utc) - REBUILD_LOCK_TIMEOUT}},
+            {"$addToSet": {"pending": {"$each": order_ids}}}
+        )
+        if queued.matched_count:
+            self.queued += len(order_ids)
+            return True
+        return False
+
+    async def _acquire_rebuild_lock(self, db) -> str:
+        token = str(uuid.uuid4())
+        now = datetime.now(timezone.utc)
+        try:
+            await db[REBUILD_LOCK_COLLECTION].insert_one(
+                {"_id": REBUILD_LOCK_ID, "token": token, "started_at": now, "pending": []}
+            )
+            return token
+        except DuplicateKeyError:
+            pass
+        # Take over a crashed rebuild's lock, keeping the ids it queued
+        taken = await db[REBUILD_LOCK_COLLECTION].update_one(
+            {"_id": REBUILD_LOCK_ID, "started_at": {"$lte": now - REBUILD_LOCK_TIMEOUT}},
+            {"$set": {"token": token, "started_at": now}}
+        )
+        if not taken.modified_count:
+            raise RebuildInProgress("Sales rollups are already being rebuilt")
+        return token
+
+    async def rebuild(self, db) -> int:
+        """
+        Recompute every rollup from db.orders and db.orders_archive (first
+        deploy, or after drift). Raises RebuildInProgress if another rebuild
+        holds the lock.
+        """
+        token = await self._acquire_rebuild_lock(db)
+        try:
+            count = await self._rebuild(db)
+        finally:
+            lock = await db[REBUILD_LOCK_COLLECTION].find_one_and_delete(
+                {"_id": REBUILD_LOCK_ID, "token": token}
+            )
+            pending = (lock or {}).get("pending", [])
+            if pending:
+                await self.sync(db, pending)
+        return count
+
+    async def _rebuild(self, db) -> int:
+        incs = defaultdict(lambda: defaultdict(float))
+        count = 0
+        for collection in (db.orders, db[ARCHIVE_COLLECTION]):
+            state_ops = []
+            async for order in collection.find({}, ROLLUP_FIELDS):
+                bucket = order_bucket(order)
+                _contribute(incs, order, bucket, 1)
+                if order.get("rollup_state") != bucket:
+                    state_ops.append(UpdateOne({"order_id": order["order_id"]}, {"$set": {"rollup_state": bucket}}))
+                if len(state_ops) >= REBUILD_BATCH_SIZE:
+                    await collection.bulk_write(state_ops, ordered=False)
+                    state_ops = []
+                count += 1
+            if state_ops:
+                await collection.bulk_write(state_ops, ordered=False)
+
+        # The summary always exists once built, even with no orders
+        incs[SUMMARY_ID]["orders"] += 0
+        docs = []
+        for rollup_id, fields in incs.items():
+            kind, _, key = rollup_id.partition(":")
+            docs.append({"_id": rollup_id, "kind": kind, "key": key or kind, **fields})
+        target = db[REBUILD_COLLECTION]
+        await target.drop()
+        await self._create_indexes(target)
+        for start in range(0, len(docs), REBUILD_BATCH_SIZE):
+            await target.insert_many(docs[start:start + REBUILD_BATCH_SIZE])
+        # Readers see the old rollups or the new ones, never a partial set
+        await target.rename("sales_rollups", dropTarget=True)
+        logger.info(f"📊 Rebuilt sales rollups from {count} orders ({len(docs)} rollup documents)")
+        return count
+
+    async def ensure_built(self, db):
+        if not await db.sales_rollups.find_one({"_id": SUMMARY_ID}, {"_id": 1}):
+            try:
+                await self.rebuild(db)
+            except RebuildInProgress:
+                logger.info("📊 Sales rollups are being rebuilt elsewhere - skipping startup build")
+
+    async def summary(self, db) -> dict:
+        """Analytics summary from the rollup documents - independent of order history size"""
+        summary = await db.sales_rollups.find_one({"_id": SUMMARY_ID}) or {}
+        months = await db.sales_rollups.find({"kind": "month", "orders": {"$gt": 0}}).sort("key", 1).to_list(None)
+        days = await db.sales_rollups.find(
+            {"kind": "day", "orders": {"$gt": 0}}
+        ).sort("key", -1).limit(RECENT_DAYS).to_list(RECENT_DAYS)
+        products = await db.sales_rollups.find(
+            {"kind": "product", "quantity": {"$gt": 0}}
+        ).sort("quantity", -1).limit(TOP_PRODUCTS).to_list(TOP_PRODUCTS)
+
+        return {
+            "total_orders": int(summary.get("orders", 0)),
+            "total_sales": summary.get("sales", 0),
+            "active_orders": int(summary.get(ACTIVE, 0)),
+            "cancelled_orders": int(summary.get(CANCELLED, 0)),
+            "completed_orders": int(summary.get(COMPLETED, 0)),
+            "monthly_sales": {m["key"]: m["sales"] for m in months},
+            "monthly_orders": {m["key"]: int(m["orders"]) for m in months},
+            "daily_sales": {d["key"]: d["sales"] for d in reversed(days)},
+            "top_products": [{"name": p["key"], "count": int(p["quantity"])} for p in products]
+        }
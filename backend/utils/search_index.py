@@ -0,0 +1,150 @@
+"""In-memory trigram search index over the product catalog"""
+import unicodedata
+from typing import Iterable, List, Optional
+
+# Field -> weight of a trigram hit in that field
+SEARCH_FIELDS = {
+    "name": 3.0,
+    "name_telugu": 3.0,
+    "tag": 2.0,
+    "category": 2.0,
+    "description": 1.0,
+    "description_telugu": 1.0,
+}
+# Share of the query's trigrams a product must contain - tolerates a typo or two
+MIN_SIMILARITY = 0.5
+BESTSELLER_BOOST = 1.25
+
+
+def normalize(text: str) -> str:
+    """NFKC + casefold so "Podi", "PODI" and composed/decomposed Telugu match"""
+    return unicodedata.normalize("NFKC", text).casefold()
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split into words. Letters, digits and combining marks stay together -
+    Telugu vowel signs and viramas are marks, so a word-character regex
+    would break Telugu words apart.
+    """
+    words, current = [], []
+    for char in normalize(text):
+        if unicodedata.category(char)[0] in "LMN":
+            current.append(char)
+        elif current:
+            words.append("".join(current))
+            current = []
+    if current:
+        words.append("".join(current))
+    return words
+
+
+def word_trigrams(word: str, prefix: bool = False) -> set:
+    """Trigrams of a space-padded word; prefix=True leaves the end open for typeahead"""
+    padded = f" {word}" if prefix else f" {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def query_trigrams(query: str) -> set:
+    words = tokenize(query)
+    grams = set()
+    for position, word in enumerate(words):
+        # The last word is usually still being typed
+        grams |= word_trigrams(word, prefix=position == len(words) - 1)
+    return grams
+
+
+class SearchIndex:
+    """
+    Trigram -> {product id: field weight} postings. sync() diffs the
+    catalog against what is indexed and only re-indexes products whose
+    searchable fields changed, so catalog rebuilds stay cheap.
+    """
+
+    def __init__(self):
+        self._postings = {}
+        self._docs = {}
+        self.syncs = 0
+        self.reindexed = 0
+
+    def _document_grams(self, product: dict) -> dict:
+        grams = {}
+        for field, weight in SEARCH_FIELDS.items():
+            value = product.get(field)
+            if not value:
+                continue
+            for word in tokenize(str(value)):
+                for gram in word_trigrams(word):
+                    if grams.get(gram, 0) < weight:
+                        grams[gram] = weight
+        return grams
+
+    def _remove(self, product_id: str):
+        _, grams, _ = self._docs.pop(product_id)
+        for gram in grams:
+            postings = self._postings[gram]
+            postings.pop(product_id, None)
+            if not postings:
+                del self._postings[gram]
+
+    def _add(self, product_id: str, key: tuple, product: dict):
+        grams = self._document_grams(product)
+        for gram, weight in grams.items():
+            self._postings.setdefault(gram, {})[product_id] = weight
+        self._docs[product_id] = (key, grams, bool(product.get("isBestSeller")))
+
+    def sync(self, products: Iterable[dict]) -> int:
+        """Bring the index in line with the catalog; returns products re-indexed"""
+        seen = set()
+        changed = 0
+        for product in products:
+            product_id = product.get("id")
+            if not product_id:
+                continue
+            seen.add(product_id)
+            key = tuple(product.get(field) for field in SEARCH_FIELDS) + (bool(product.get("isBestSeller")),)
+            indexed = self._docs.get(product_id)
+            if indexed is not None and indexed[0] == key:
+                continue
+            if indexed is not None:
+                self._remove(product_id)
+            self._add(product_id, key, product)
+            changed += 1
+        for product_id in [pid for pid in self._docs if pid not in seen]:
+            self._remove(product_id)
+            changed += 1
+        self.syncs += 1
+        self.reindexed += changed
+        return changed
+
+    def search(self, query: str, limit: int = 20, allowed: Optional[set] = None) -> List[str]:
+        """Product ids ranked by weighted trigram overlap (best sellers boosted)"""
+        grams = query_trigrams(query)
+        if not grams:
+            return []
+
+        scores, matched = {}, {}
+        for gram in grams:
+            for product_id, weight in self._postings.get(gram, {}).items():
+                scores[product_id] = scores.get(product_id, 0.0) + weight
+                matched[product_id] = matched.get(product_id, 0) + 1
+
+        needed = MIN_SIMILARITY * len(grams)
+        ranked = []
+        for product_id, hits in matched.items():
+            if hits < needed or (allowed is not None and product_id not in allowed):
+                continue
+            score = scores[product_id] / len(grams)
+            if self._docs[product_id][2]:
+                score *= BESTSELLER_BOOST
+            ranked.append((-score, product_id))
+        ranked.sort()
+        return [product_id for _, product_id in ranked[:limit]]
+
+    def stats(self) -> dict:
+        return {
+            "documents": len(self._docs),
+            "trigrams": len(self._postings),
+            "syncs": self.syncs,
+            "reindexed": self.reindexed
+        }
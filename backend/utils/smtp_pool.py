@@ -0,0 +1,146 @@
+"""Pooled, persistent SMTP connections"""
+import logging
+import os
+import queue
+import smtplib
+import threading
+import time
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Point these at a local sink (e.g. SMTP_HOST=localhost SMTP_PORT=1025
+# SMTP_SECURITY=none) to test without Gmail
+SMTP_HOST = os.environ.get('SMTP_HOST', 'smtp.gmail.com')
+SMTP_PORT = int(os.environ.get('SMTP_PORT', '465'))
+SMTP_SECURITY = os.environ.get('SMTP_SECURITY', 'ssl')  # ssl | starttls | none
+SMTP_POOL_SIZE = int(os.environ.get('SMTP_POOL_SIZE', '2'))
+SMTP_TIMEOUT_SECONDS = 30
+# Connections idle longer than this are checked with NOOP before reuse
+SMTP_KEEPALIVE_SECONDS = 30
+
+
+def _recoverable(error: Exception) -> bool:
+    """
+    Worth a fresh connection and one more try: a dropped session or a
+    transient 4xx reply. Permanent 5xx rejections would only fail again.
+    """
+    if isinstance(error, smtplib.SMTPServerDisconnected):
+        return True
+    if isinstance(error, smtplib.SMTPResponseException):
+        return error.smtp_code < 500
+    # SMTPException subclasses OSError - only socket-level errors count here
+    return isinstance(error, OSError) and not isinstance(error, smtplib.SMTPException)
+
+
+class SMTPPool:
+    """
+    Up to `size` authenticated SMTP sessions shared by sender threads.
+    A connection is opened on first use, kept open between messages, probed
+    with NOOP after sitting idle and reopened when the server has dropped it,
+    so consecutive mails pay TLS + AUTH once instead of per message.
+    Blocking - call send() through asyncio.to_thread.
+    """
+
+    def __init__(self, host: str, port: int, security: str, username: str, password: str, size: int):
+        self.host = host
+        self.port = port
+        self.security = security
+        self.username = username
+        self.password = password
+        self._slots = queue.LifoQueue(maxsize=size)
+        for _ in range(size):
+            self._slots.put((None, 0.0))
+        self.connects = 0
+        self.messages = 0
+
+    def _connect(self) -> smtplib.SMTP:
+        if self.security == "ssl":
+            conn = smtplib.SMTP_SSL(self.host, self.port, timeout=SMTP_TIMEOUT_SECONDS)
+        else:
+            conn = smtplib.SMTP(self.host, self.port, timeout=SMTP_TIMEOUT_SECONDS)
+            if self.security == "starttls":
+                conn.starttls()
+        conn.ehlo_or_helo_if_needed()
+        if self.username and self.password and conn.has_extn("auth"):
+            conn.login(self.username, self.password)
+        self.connects += 1
+        return conn
+
+    @staticmethod
+    def _close(conn: Optional[smtplib.SMTP]):
+        if conn is None:
+            return
+        try:
+            conn.quit()
+        except Exception:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def _alive(self, conn: smtplib.SMTP, idle_since: float) -> bool:
+        if time.monotonic() - idle_since < SMTP_KEEPALIVE_SECONDS:
+            return True
+        try:
+            return conn.noop()[0] == 250
+        except Exception as e:
+            if _recoverable(e):
+                return False
+            raise
+
+    def send(self, msg):
+        """Send one message, reconnecting once if the pooled session went stale"""
+        conn, idle_since = self._slots.get()
+        try:
+            if conn is not None and not self._alive(conn, idle_since):
+                self._close(conn)
+                conn = None
+            for attempt in (1, 2):
+                if conn is None:
+                    conn = self._connect()
+                try:
+                    conn.send_message(msg)
+                    self.messages += 1
+                    return
+                except Exception as e:
+                    if not _recoverable(e):
+                        raise
+                    self._close(conn)
+                    conn = None
+                    if attempt == 2:
+                        raise
+                    logger.warning(f"SMTP session dropped ({str(e)}), reconnecting")
+        except Exception:
+            self._close(conn)
+            conn = None
+            raise
+        finally:
+            self._slots.put((conn, time.monotonic()))
+
+    def close(self):
+        for _ in range(self._slots.maxsize):
+            conn, _ = self._slots.get()
+            self._close(conn)
+            self._slots.put((None, 0.0))
+
+    def stats(self) -> dict:
+        return {"connects": self.connects, "messages": self.messages}
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_smtp_pool() -> SMTPPool:
+    """Process-wide pool, created on first use with the Gmail credentials"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = SMTPPool(
+                SMTP_HOST, SMTP_PORT, SMTP_SECURITY,
+                os.environ.get('GMAIL_EMAIL', ''),
+                os.environ.get('GMAIL_APP_PASSWORD', ''),
+                SMTP_POOL_SIZE
+            )
+        return _pool
@@ -1,5 +1,6 @@
 // Simple service worker for PWA functionality
 const CACHE_NAME = 'anantha-lakshmi-v1';
+const CATALOG_CACHE_NAME = 'anantha-lakshmi-catalog-v1';
 const urlsToCache = [
   '/',
   '/static/css/main.css',
@@ -13,7 +14,58 @@ self.addEventListener('install', (event) => {
   );
 });
 
+// Product list: keep a local copy and only download what changed since
+// the version we hold (GET /api/products/changes?since=<version>)
+const catalogResponse = async (request) => {
+  const url = new URL(request.url);
+  const cache = await caches.open(CATALOG_CACHE_NAME);
+  const cached = await cache.match(request);
+  const cachedVersion = cached ? Number(cached.headers.get('X-Catalog-Version')) || 0 : 0;
+
+  try {
+    const changesUrl = new URL('/api/products/changes', url.origin);
+    url.searchParams.forEach((value, key) => changesUrl.searchParams.set(key, value));
+    changesUrl.searchParams.set('since', String(cachedVersion));
+    const response = await fetch(changesUrl.toString());
+    if (!response.ok) throw new Error(`Catalog sync failed: ${response.status}`);
+    const delta = await response.json();
+
+    // full/reset: the server could not give a delta from our version - replace the copy
+    let products = delta.products;
+    if (!delta.full && !delta.reset) {
+      const changed = new Map(delta.products.map((p) => [p.id, p]));
+      const deleted = new Set(delta.deleted);
+      const current = cached ? await cached.clone().json() : [];
+      products = current
+        .filter((p) => !deleted.has(p.id))
+        .map((p) => {
+          const update = changed.get(p.id);
+          changed.delete(p.id);
+          return update || p;
+        })
+        .concat(Array.from(changed.values()));
+    }
+
+    const merged = new Response(JSON.stringify(products), {
+      headers: {
+        'Content-Type': 'application/json',
+        'X-Catalog-Version': String(delta.version)
+      }
+    });
+    await cache.put(request, merged.clone());
+    return merged;
+  } catch (error) {
+    // Offline or API error - fall back to the last catalog we have
+    return cached || fetch(request);
+  }
+};
+
 self.addEventListener('fetch', (event) => {
+  const url = new URL(event.request.url);
+  if (event.request.method === 'GET' && url.pathname === '/api/products') {
+    event.respondWith(catalogResponse(event.request));
+    return;
+  }
   event.respondWith(
     caches.match(event.request)
       .then((response) => response || fetch(event.request))
@@ -25,7 +77,7 @@ self.addEventListener('activate', (event) => {
     caches.keys().then((cacheNames) => {
       return Promise.all(
         cacheNames.map((cacheName) => {
-          if (cacheName !== CACHE_NAME) {
+          if (cacheName !== CACHE_NAME && cacheName !== CATALOG_CACHE_NAME) {
             return caches.delete(cacheName);
           }
         })
@@ -7,12 +7,14 @@ import {
 import { toast } from '../hooks/use-toast';
 import axios from 'axios';
 import CancelOrderModal from './CancelOrderModal';
+import { fetchPage } from '../utils/pagination';
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL || '';
 const API = `${BACKEND_URL}/api`;
 
 // Fixed admin location for distance calculation (example: Hyderabad, India)
 const ADMIN_LOCATION = { lat: 17.385044, lon: 78.486671 };
+const ORDERS_PAGE_SIZE = 100;
 
 const AdminOrders = () => {
   const [orders, setOrders] = useState([]);
@@ -28,19 +30,30 @@ const AdminOrders = () => {
   const [loading, setLoading] = useState(true);
   const [cancelModalOpen, setCancelModalOpen] = useState(false);
   const [orderToCancel, setOrderToCancel] = useState(null);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [totalOrders, setTotalOrders] = useState(0);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const [selectedOrders, setSelectedOrders] = useState([]);
+  const [bulkStatus, setBulkStatus] = useState('shipped');
+  const [bulkUpdating, setBulkUpdating] = useState(false);
 
   useEffect(() => {
     fetchOrders();
     fetchAnalytics();
   }, []);
 
+  // First page (newest orders) plus the overall count; older pages load on demand
   const fetchOrders = async () => {
     try {
       const token = localStorage.getItem('token');
-      const response = await axios.get(`${API}/orders`, {
+      const page = await fetchPage(`${API}/orders`, {
+        limit: ORDERS_PAGE_SIZE,
+        includeTotal: true,
         headers: { Authorization: `Bearer ${token}` }
       });
-      setOrders(response.data);
+      setOrders(page.items);
+      setNextCursor(page.next);
+      setTotalOrders(page.total);
     } catch (error) {
       toast({
         title: "Error",
@@ -52,6 +65,29 @@ const AdminOrders = () => {
     }
   };
 
+  const loadMoreOrders = async () => {
+    if (!nextCursor) return;
+    setLoadingMore(true);
+    try {
+      const token = localStorage.getItem('token');
+      const page = await fetchPage(`${API}/orders`, {
+        cursor: nextCursor,
+        limit: ORDERS_PAGE_SIZE,
+        headers: { Authorization: `Bearer ${token}` }
+      });
+      setOrders(prev => [...prev, ...page.items]);
+      setNextCursor(page.next);
+    } catch (error) {
+      toast({
+        title: "Error",
+        description: "Failed to load more orders",
+        variant: "destructive"
+      });
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const fetchAnalytics = async () => {
     try {
       const token = localStorage.getItem('token');
@@ -120,6 +156,43 @@ const AdminOrders = () => {
     }
   };
 
+  const toggleSelected = (orderId) => {
+    setSelectedOrders(prev =>
+      prev.includes(orderId) ? prev.filter(id => id !== orderId) : [...prev, orderId]
+    );
+  };
+
+  // One request for the whole selection - status emails are queued server-side
+  const handleBulkStatus = async () => {
+    if (selectedOrders.length === 0) return;
+    setBulkUpdating(true);
+    try {
+      const token = localStorage.getItem('token');
+      const response = await axios.post(
+        `${API}/admin/orders/bulk-status`,
+        { order_ids: selectedOrders, status: bulkStatus },
+        { headers: { Authorization: `Bearer ${token}` } }
+      );
+      const skipped = response.data.results.filter(r => r.result !== 'updated' && r.result !== 'unchanged');
+      toast({
+        title: "Success",
+        description: `${response.data.updated} order(s) marked ${bulkStatus}` +
+          (skipped.length ? `, ${skipped.length} skipped (${skipped.map(r => r.order_id).join(', ')})` : '')
+      });
+      setSelectedOrders([]);
+      fetchOrders();
+      fetchAnalytics();
+    } catch (error) {
+      toast({
+        title: "Error",
+        description: "Failed to update orders",
+        variant: "destructive"
+      });
+    } finally {
+      setBulkUpdating(false);
+    }
+  };
+
   const filteredOrders = useMemo(() => {
     return orders.filter(order => {
       // Search filter
@@ -435,6 +508,37 @@ const AdminOrders = () => {
         </div>
       </div>
 
+      {/* Bulk status bar */}
+      {selectedOrders.length > 0 && (
+        <div className="bg-white rounded-xl shadow-lg p-4 flex flex-col sm:flex-row sm:items-center gap-3">
+          <span className="text-sm font-medium text-gray-700">{selectedOrders.length} selected</span>
+          <select
+            value={bulkStatus}
+            onChange={(e) => setBulkStatus(e.target.value)}
+            className="px-4 py-2 border border-gray-300 rounded-lg focus:outline-none focus:ring-2 focus:ring-orange-500"
+          >
+            <option value="confirmed">Confirmed</option>
+            <option value="processing">Processing</option>
+            <option value="shipped">Shipped</option>
+            <option value="out for delivery">Out for Delivery</option>
+            <option value="delivered">Delivered</option>
+          </select>
+          <button
+            onClick={handleBulkStatus}
+            disabled={bulkUpdating}
+            className="px-6 py-2 bg-orange-600 text-white rounded-lg hover:bg-orange-700 disabled:opacity-50"
+          >
+            {bulkUpdating ? 'Updating...' : 'Apply to selected'}
+          </button>
+          <button
+            onClick={() => setSelectedOrders([])}
+            className="text-orange-600 hover:text-orange-700 font-medium text-sm"
+          >
+            Clear selection
+          </button>
+        </div>
+      )}
+
       {/* Orders List */}
       <div className="space-y-4">
         {sortedOrders.length === 0 ? (
@@ -454,6 +558,14 @@ const AdminOrders = () => {
                 {/* Desktop Layout */}
                 <div className="hidden sm:flex items-center justify-between">
                   <div className="flex items-center space-x-4">
+                    <input
+                      type="checkbox"
+                      checked={selectedOrders.includes(order.order_id)}
+                      onChange={() => toggleSelected(order.order_id)}
+                      onClick={(e) => e.stopPropagation()}
+                      disabled={order.cancelled}
+                      className="h-4 w-4 accent-orange-600"
+                    />
                     <div className={`w-12 h-12 rounded-full flex items-center justify-center ${
                       order.cancelled ? 'bg-red-100' :
                       order.order_status === 'delivered' ? 'bg-green-100' :
@@ -496,6 +608,14 @@ const AdminOrders = () => {
                 <div className="sm:hidden space-y-3">
                   {/* Top row: Icon and Name */}
                   <div className="flex items-start space-x-3">
+                    <input
+                      type="checkbox"
+                      checked={selectedOrders.includes(order.order_id)}
+                      onChange={() => toggleSelected(order.order_id)}
+                      onClick={(e) => e.stopPropagation()}
+                      disabled={order.cancelled}
+                      className="h-4 w-4 mt-3 accent-orange-600 flex-shrink-0"
+                    />
                     <div className={`w-10 h-10 rounded-full flex items-center justify-center flex-shrink-0 ${
                       order.cancelled ? 'bg-red-100' :
                       order.order_status === 'delivered' ? 'bg-green-100' :
@@ -792,6 +912,22 @@ const AdminOrders = () => {
         )}
       </div>
 
+      {/* Older orders are fetched a page at a time */}
+      {nextCursor && (
+        <div className="flex flex-col items-center gap-2">
+          <p className="text-sm text-gray-500">
+            Showing {orders.length} of {totalOrders} orders - filters apply to loaded orders
+          </p>
+          <button
+            onClick={loadMoreOrders}
+            disabled={loadingMore}
+            className="px-6 py-2 bg-orange-600 text-white rounded-lg hover:bg-orange-700 disabled:opacity-50"
+          >
+            {loadingMore ? 'Loading...' : 'Load older orders'}
+          </button>
+        </div>
+      )}
+
       {/* Cancel Order Modal */}
       <CancelOrderModal
         isOpen={cancelModalOpen}
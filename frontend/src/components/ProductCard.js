@@ -14,8 +14,11 @@ const ProductCard = ({ product }) => {
   const { language } = useLanguage();
   
   // Get product name and description based on language
+  // (grid products carry the card view's short snippets, not the full text)
   const productName = language === 'te' && product.name_telugu ? product.name_telugu : product.name;
-  const productDescription = language === 'te' && product.description_telugu ? product.description_telugu : product.description;
+  const description = product.description || product.description_snippet;
+  const descriptionTelugu = product.description_telugu || product.description_telugu_snippet;
+  const productDescription = language === 'te' && descriptionTelugu ? descriptionTelugu : description;
 
   // Get discounted price if available
   const getDiscountedPrice = (priceIndex) => {
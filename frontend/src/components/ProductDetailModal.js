@@ -1,14 +1,28 @@
-import React, { useState } from 'react';
+import React, { useState, useEffect } from 'react';
 import { X, ShoppingCart, Star, Sparkles, TrendingUp, Percent, Share2 } from 'lucide-react';
 import { useCart } from '../contexts/CartContext';
 import { useLanguage } from '../contexts/LanguageContext';
 import { toast } from '../hooks/use-toast';
 
-const ProductDetailModal = ({ product, onClose }) => {
-  const [selectedPrice, setSelectedPrice] = useState(product.prices[0]);
+const ProductDetailModal = ({ product: listProduct, onClose }) => {
+  // Product lists carry a compact card projection - load the full document
+  const [product, setProduct] = useState(listProduct);
+  const [selectedPrice, setSelectedPrice] = useState(listProduct.prices[0]);
   const [selectedPriceIndex, setSelectedPriceIndex] = useState(0);
   const { addToCart } = useCart();
   const { language } = useLanguage();
+
+  useEffect(() => {
+    let cancelled = false;
+    const backendUrl = process.env.REACT_APP_BACKEND_URL || '';
+    fetch(`${backendUrl}/api/products/${listProduct.id}`)
+      .then((response) => (response.ok ? response.json() : null))
+      .then((data) => {
+        if (!cancelled && data) setProduct(data);
+      })
+      .catch(() => {});
+    return () => { cancelled = true; };
+  }, [listProduct.id]);
   
   // Get product name and description based on language
   const productName = language === 'te' && product.name_telugu ? product.name_telugu : product.name;
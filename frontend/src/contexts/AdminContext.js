@@ -26,7 +26,8 @@ export const AdminProvider = ({ children }) => {
   // Fetch products from backend
   const fetchProducts = async () => {
     try {
-      const response = await axios.get(`${API}/products`);
+      // Admin screens edit whole documents, not the storefront card projection
+      const response = await axios.get(`${API}/products?view=full`);
       // Always use backend data, even if empty
       setProducts(response.data || []);
     } catch (error) {
@@ -36,6 +37,18 @@ export const AdminProvider = ({ children }) => {
     }
   };
 
+  // Re-read just the given products after an edit (one batch request, not a full reload)
+  const refreshProducts = async (ids) => {
+    try {
+      const response = await axios.post(`${API}/products/batch`, { ids, view: 'full' });
+      const fresh = new Map((response.data.products || []).map(p => [p.id, p]));
+      setProducts(prev => prev.map(p => fresh.get(p.id) || p));
+    } catch (error) {
+      console.error('Error refreshing products:', error);
+      await fetchProducts();
+    }
+  };
+
   // Fetch delivery locations from backend
   const fetchDeliveryLocations = async () => {
     try {
@@ -383,6 +396,7 @@ export const AdminProvider = ({ children }) => {
       logout,
       products,
       fetchProducts,
+      refreshProducts,
       addProduct,
       updateProduct,
       deleteProduct,
@@ -7,6 +7,7 @@ import { categories } from '../mock';
 import DeleteConfirmDialog from '../components/DeleteConfirmDialog';
 import AdminOrders from '../components/AdminOrders';
 import axios from 'axios';
+import { fetchAllPages } from '../utils/pagination';
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL || '';
 
@@ -69,14 +70,11 @@ const CitySuggestionsSection = ({ fetchDeliveryLocations }) => {
       const adminToken = localStorage.getItem('token');
       // Use passed parameter if provided, otherwise use state
       const filter = filterStatus !== null ? filterStatus : statusFilter;
-      const url = filter === 'all' 
-        ? `${BACKEND_URL}/api/admin/city-suggestions`
-        : `${BACKEND_URL}/api/admin/city-suggestions?status=${filter}`;
-      
-      const response = await axios.get(url, {
+      const suggestions = await fetchAllPages(`${BACKEND_URL}/api/admin/city-suggestions`, {
+        params: filter === 'all' ? {} : { status: filter },
         headers: { Authorization: `Bearer ${adminToken}` }
       });
-      setCitySuggestions(response.data);
+      setCitySuggestions(suggestions);
     } catch (error) {
       console.error('Failed to fetch city suggestions:', error);
       toast({
@@ -635,6 +633,7 @@ const Admin = () => {
     logout,
     products,
     fetchProducts,
+    refreshProducts,
     addProduct,
     updateProduct,
     deleteProduct,
@@ -843,7 +842,7 @@ const Admin = () => {
   const handleUpdateProduct = async (id) => {
     try {
       // Update basic product info
-      updateProduct(id, editingProduct);
+      await updateProduct(id, editingProduct);
       
       const token = localStorage.getItem('token');
       
@@ -914,8 +913,8 @@ const Admin = () => {
       setEditingProduct(null);
       setImageFile(null);
       
-      // Reload to see changes
-      window.location.reload();
+      // Reload the edited product to see changes
+      await refreshProducts([id]);
     } catch (error) {
       console.error('Update error:', error);
       toast({
@@ -954,8 +953,8 @@ const Admin = () => {
         description: newFestivalStatus ? "Product marked as festival!" : "Removed from festival products",
       });
       
-      // Reload products
-      window.location.reload();
+      // Reload the product
+      await refreshProducts([product.id]);
     } catch (error) {
       toast({
         title: "Error",
@@ -1076,8 +1075,8 @@ const Admin = () => {
         description: "Discount added successfully",
       });
 
-      // Reload products
-      window.location.reload();
+      // Reload the product
+      await refreshProducts([productId]);
     } catch (error) {
       toast({
         title: "Error",
@@ -1102,8 +1101,8 @@ const Admin = () => {
         description: "Discount removed successfully",
       });
 
-      // Reload products
-      window.location.reload();
+      // Reload the product
+      await refreshProducts([productId]);
     } catch (error) {
       toast({
         title: "Error",
@@ -1150,8 +1149,9 @@ const Admin = () => {
         description: "Best sellers updated successfully",
       });
 
-      // Reload products
-      window.location.reload();
+      // Reload the products that were or now are best sellers
+      const previousBestSellers = products.filter(p => p.isBestSeller).map(p => p.id);
+      await refreshProducts([...new Set([...previousBestSellers, ...selectedBestSellers])]);
     } catch (error) {
       toast({
         title: "Error",
@@ -1188,8 +1188,9 @@ const Admin = () => {
         description: "Festival products updated successfully",
       });
 
-      // Reload products
-      window.location.reload();
+      // Reload the products that were or now are festival products
+      const previousFestival = products.filter(p => p.isFestival).map(p => p.id);
+      await refreshProducts([...new Set([...previousFestival, ...selectedFestivalProducts])]);
     } catch (error) {
       toast({
         title: "Error",
@@ -1310,18 +1311,12 @@ const Admin = () => {
     setReportsLoading(true);
     try {
       const backendUrl = process.env.REACT_APP_BACKEND_URL || import.meta.env.REACT_APP_BACKEND_URL;
-      const response = await fetch(`${backendUrl}/api/admin/reports`, {
+      const reports = await fetchAllPages(`${backendUrl}/api/admin/reports`, {
         headers: {
           'Authorization': `Bearer ${localStorage.getItem('token')}`
         }
       });
-      
-      if (response.ok) {
-        const data = await response.json();
-        setBugReports(data);
-      } else {
-        throw new Error('Failed to fetch reports');
-      }
+      setBugReports(reports);
     } catch (error) {
       console.error('Error fetching reports:', error);
       toast({
@@ -2144,7 +2139,7 @@ const Admin = () => {
                               title: "Success",
                               description: "Inventory updated"
                             });
-                            window.location.reload();
+                            await refreshProducts([product.id]);
                           } catch (error) {
                             toast({
                               title: "Error",
@@ -2539,7 +2534,7 @@ const Admin = () => {
                                     title: "Success",
                                     description: "Inventory updated"
                                   });
-                                  window.location.reload();
+                                  await refreshProducts([product.id]);
                                 } catch (error) {
                                   console.error('Inventory update error:', error);
                                   toast({
@@ -2573,7 +2568,7 @@ const Admin = () => {
                                     title: "Success",
                                     description: outOfStock ? "Product marked as available" : "Product marked as out of stock"
                                   });
-                                  window.location.reload();
+                                  await refreshProducts([product.id]);
                                 } catch (error) {
                                   console.error('Stock status error:', error);
                                   toast({
@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { useNavigate } from 'react-router-dom';
 import axios from 'axios';
 import { useCart } from '../contexts/CartContext';
@@ -6,6 +6,7 @@ import { useAuth } from '../contexts/AuthContext';
 import { useToast } from '../hooks/use-toast';
 import { ShoppingBag, MapPin, Phone, Mail, CreditCard, Wallet, User, Home, Building, MapPinned, Navigation, Sparkles, Trash2, Edit, Check } from 'lucide-react';
 import imagePreloader from '../utils/imagePreloader';
+import { newIdempotencyKey, idempotencyHeaders } from '../utils/idempotency';
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
@@ -50,7 +51,7 @@ function Checkout() {
   });
   const [editingItemIndex, setEditingItemIndex] = useState(null);
   const [selectedWeight, setSelectedWeight] = useState('');
-  const [allProducts, setAllProducts] = useState([]);
+  const [cartProducts, setCartProducts] = useState([]);
   const [recommendations, setRecommendations] = useState([]);
   const [freeDeliverySettings, setFreeDeliverySettings] = useState({ enabled: true, threshold: 1000 });
   const [showCustomCityInput, setShowCustomCityInput] = useState(false);
@@ -61,21 +62,36 @@ function Checkout() {
   // Payment settings and WhatsApp
   const [paymentSettings, setPaymentSettings] = useState({ status: 'enabled' });
   const [whatsappNumbers, setWhatsappNumbers] = useState([]);
+  // One key per checkout attempt, so a resubmitted order is not created twice
+  const checkoutKeyRef = useRef(null);
+  const checkoutKey = () => {
+    if (!checkoutKeyRef.current) {
+      checkoutKeyRef.current = newIdempotencyKey();
+    }
+    return checkoutKeyRef.current;
+  };
 
   // Enrich cart items with full product data
   const enrichedCart = React.useMemo(() => {
     return cart.map(item => {
-      const product = allProducts.find(p => p.id === item.id);
+      const product = cartProducts.find(p => p.id === item.id);
       if (product) {
         return {
           ...item,
-          prices: product.prices, // Add available price options from product
-          description: product.description
+          prices: product.prices // Add available price options from product
         };
       }
       return item;
     });
-  }, [cart, allProducts]);
+  }, [cart, cartProducts]);
+
+  // Current prices for just the products in the cart - one batch request
+  const cartProductIds = [...new Set(cart.map(item => item.id))].join(',');
+  useEffect(() => {
+    if (cartProductIds) {
+      fetchCartProducts(cartProductIds.split(','));
+    }
+  }, [cartProductIds]);
 
   useEffect(() => {
     if (cart.length === 0) {
@@ -104,10 +120,21 @@ function Checkout() {
     });
   }, [locationsByState, state]);
 
+  const fetchCartProducts = async (ids) => {
+    try {
+      const response = await axios.post(`${API}/products/batch`, { ids, fields: 'id,prices' });
+      setCartProducts(response.data.products || []);
+    } catch (error) {
+      console.error('Failed to fetch cart products:', error);
+    }
+  };
+
   const fetchAllProducts = async () => {
     try {
-      const response = await axios.get(`${API}/products`);
-      setAllProducts(response.data);
+      // Recommendation candidates only - cart items are enriched via fetchCartProducts
+      const response = await axios.get(`${API}/products`, {
+        params: { fields: 'id,name,image,category,prices,isBestSeller,isFestival' }
+      });
       
       // Get smart recommendations (excluding items in cart)
       const cartProductIds = cart.map(item => item.id);
@@ -429,7 +456,7 @@ _Click product links above to view products_`;
       await saveCustomerData();
 
       // Create order directly (WhatsApp booking, no payment yet)
-      const orderResponse = await axios.post(`${API}/orders`, orderData);
+      const orderResponse = await axios.post(`${API}/orders`, orderData, idempotencyHeaders(checkoutKey()));
       const { order_id, tracking_code } = orderResponse.data;
 
       console.log('✅ Order created (WhatsApp booking):', order_id);
@@ -447,6 +474,7 @@ _Click product links above to view products_`;
 
       // Clear cart and navigate to tracking
       clearCart();
+      checkoutKeyRef.current = null;
       toast({
         title: "Order Booked via WhatsApp! 🎉",
         description: `Your order has been received. Tracking code: ${tracking_code}. We'll contact you on WhatsApp for payment and confirmation.`,
@@ -455,6 +483,10 @@ _Click product links above to view products_`;
       navigate(`/track-order?code=${tracking_code}`);
     } catch (error) {
       console.error('❌ WhatsApp booking failed:', error);
+      // The server answered, so the attempt is settled - keep the key only for network failures
+      if (error.response) {
+        checkoutKeyRef.current = null;
+      }
       toast({
         title: "Booking Failed",
         description: error.response?.data?.detail || "Failed to create order. Please try again.",
@@ -884,7 +916,10 @@ _Click product links above to view products_`;
               // Create the order after successful payment
               orderData.payment_status = 'completed';
               orderData.order_status = 'confirmed';
-              const orderResponse = await axios.post(`${API}/orders`, orderData);
+              // Keyed by the Razorpay payment, so one payment creates one order
+              const orderResponse = await axios.post(
+                `${API}/orders`, orderData, idempotencyHeaders(`order-${response.razorpay_payment_id}`)
+              );
               const { order_id, tracking_code } = orderResponse.data;
 
               console.log('✅ Order created:', order_id);
@@ -895,7 +930,7 @@ _Click product links above to view products_`;
                 razorpay_order_id: response.razorpay_order_id,
                 razorpay_payment_id: response.razorpay_payment_id,
                 razorpay_signature: response.razorpay_signature
-              });
+              }, idempotencyHeaders(`verify-${response.razorpay_payment_id}`));
 
               // Send WhatsApp messages to all configured numbers
               if (whatsappNumbers.length > 0) {
@@ -944,7 +979,7 @@ _Click product links above to view products_`;
         setLoading(false);  // Reset loading after modal opens
       } else {
         // Payment disabled or removed - Create order directly and send to WhatsApp
-        const orderResponse = await axios.post(`${API}/orders`, orderData);
+        const orderResponse = await axios.post(`${API}/orders`, orderData, idempotencyHeaders(checkoutKey()));
         const { order_id, tracking_code } = orderResponse.data;
 
         console.log('✅ Order created (payment disabled):', order_id);
@@ -962,6 +997,7 @@ _Click product links above to view products_`;
 
         // Clear cart and navigate to tracking
         clearCart();
+        checkoutKeyRef.current = null;
         toast({
           title: "Order Placed Successfully! 🎉",
           description: `Your order has been received. Tracking code: ${tracking_code}. Order details sent via WhatsApp.`,
@@ -972,6 +1008,10 @@ _Click product links above to view products_`;
 
     } catch (error) {
       console.error('❌ Order placement failed:', error);
+      // The server answered, so the attempt is settled - keep the key only for network failures
+      if (error.response) {
+        checkoutKeyRef.current = null;
+      }
       toast({
         title: "Order Failed",
         description: error.response?.data?.detail || "Failed to place order. Please try again.",
@@ -60,7 +60,9 @@ const Checkout = () => {
 
   const fetchAllProducts = async () => {
     try {
-      const response = await axios.get(`${API}/products`);
+      const response = await axios.get(`${API}/products`, {
+        params: { fields: 'id,name,image,category,prices,isBestSeller' }
+      });
       setAllProducts(response.data);
       // Get best sellers for recommendations
       const bestSellers = response.data.filter(p => p.isBestSeller).slice(0, 4);
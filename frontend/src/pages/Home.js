@@ -31,6 +31,7 @@ const Home = () => {
   const [loadingProducts, setLoadingProducts] = useState(true);
   const [imagesLoaded, setImagesLoaded] = useState(false);
   const [searchQuery, setSearchQuery] = useState('');
+  const [searchResultIds, setSearchResultIds] = useState(null);
 
   const t = (key) => getTranslation(language, key);
 
@@ -293,21 +294,56 @@ const Home = () => {
     return () => clearTimeout(timer);
   }, []);
 
+  // Server-side search (typo tolerant, ranked) - debounced while typing
+  useEffect(() => {
+    const query = searchQuery.trim();
+    if (!query) {
+      setSearchResultIds(null);
+      return;
+    }
+    let cancelled = false;
+    const timer = setTimeout(async () => {
+      try {
+        const params = { q: query, limit: 100 };
+        if (selectedCity) {
+          params.city = selectedCity;
+        } else if (selectedState && selectedState !== 'all') {
+          params.state = selectedState;
+        }
+        const response = await axios.get(`${API}/products/search`, { params });
+        if (!cancelled) setSearchResultIds((response.data || []).map(p => p.id));
+      } catch (error) {
+        // Fall back to filtering locally
+        if (!cancelled) setSearchResultIds(null);
+      }
+    }, 200);
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+    };
+  }, [searchQuery, selectedCity, selectedState]);
+
   // Memoize filtered products with smart ordering
   const filteredProducts = useMemo(() => {
     let categoryFiltered = selectedCategory === 'all'
       ? products
       : products.filter(p => p.category === selectedCategory);
     
+    // Server results are already ranked - keep their order
+    if (searchQuery.trim() && searchResultIds) {
+      const byId = new Map(categoryFiltered.map(p => [p.id, p]));
+      return searchResultIds.map(id => byId.get(id)).filter(Boolean);
+    }
+    
     // Apply search filter if search query exists
     if (searchQuery.trim()) {
       const query = searchQuery.toLowerCase().trim();
       categoryFiltered = categoryFiltered.filter(product => {
         const nameMatch = product.name?.toLowerCase().includes(query);
-        const descriptionMatch = product.description?.toLowerCase().includes(query);
+        const descriptionMatch = (product.description || product.description_snippet)?.toLowerCase().includes(query);
         const categoryMatch = product.category?.toLowerCase().includes(query);
         const nameTeluguMatch = product.name_telugu?.toLowerCase().includes(query);
-        const descriptionTeluguMatch = product.description_telugu?.toLowerCase().includes(query);
+        const descriptionTeluguMatch = (product.description_telugu || product.description_telugu_snippet)?.toLowerCase().includes(query);
         
         return nameMatch || descriptionMatch || categoryMatch || nameTeluguMatch || descriptionTeluguMatch;
       });
@@ -323,7 +359,7 @@ const Home = () => {
     
     // Combine: Best Sellers → Festival → Random Regular
     return [...bestSellers, ...festivalProducts, ...shuffledRegular];
-  }, [products, selectedCategory, searchQuery]);
+  }, [products, selectedCategory, searchQuery, searchResultIds]);
 
   // Memoize best sellers to prevent unnecessary filtering
   const bestSellers = useMemo(() => {
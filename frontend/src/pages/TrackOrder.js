@@ -5,6 +5,7 @@ import axios from 'axios';
 import { toast } from '../hooks/use-toast';
 import { useCart } from '../contexts/CartContext';
 import CancelOrderModal from '../components/CancelOrderModal';
+import { idempotencyHeaders } from '../utils/idempotency';
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
@@ -179,7 +180,9 @@ const TrackOrder = () => {
         { 
           payment_method: paymentMethod,
           payment_sub_method: paymentSubMethod
-        }
+        },
+        // A retried click replays the first result instead of paying twice
+        idempotencyHeaders(`complete-${selectedOrder.order_id}-${paymentMethod}-${paymentSubMethod}`)
       );
       
       toast({
@@ -0,0 +1,10 @@
+// Idempotency-Key values for checkout/payment POSTs - a retried request
+// reusing the key gets the original response instead of a second order.
+export function newIdempotencyKey() {
+  if (window.crypto && window.crypto.randomUUID) {
+    return window.crypto.randomUUID();
+  }
+  return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}-${Math.random().toString(36).slice(2)}`;
+}
+
+export const idempotencyHeaders = (key) => ({ headers: { 'Idempotency-Key': key } });
@@ -0,0 +1,28 @@
+import axios from 'axios';
+
+// List endpoints return one page: { items, next, total? }. Pass `next`
+// back as `cursor` to continue; it is null on the last page.
+export async function fetchPage(url, { cursor = null, limit = 50, includeTotal = false, params = {}, headers = {} } = {}) {
+  const response = await axios.get(url, {
+    headers,
+    params: {
+      ...params,
+      limit,
+      ...(cursor ? { cursor } : {}),
+      ...(includeTotal ? { include_total: true } : {})
+    }
+  });
+  return response.data;
+}
+
+// Walk every page - for short lists (city suggestions, bug reports)
+export async function fetchAllPages(url, options = {}) {
+  const items = [];
+  let cursor = null;
+  do {
+    const page = await fetchPage(url, { ...options, cursor, limit: 200 });
+    items.push(...page.items);
+    cursor = page.next;
+  } while (cursor);
+  return items;
+}
@@ -0,0 +1,63 @@
+"""Stock-only writes patch the catalog snapshot instead of rebuilding it"""
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from utils.catalog_cache import CatalogCache  # noqa: E402
+from utils.resource_versions import ResourceVersions  # noqa: E402
+
+
+async def _setup(name: str):
+    db = mongomock_motor.AsyncMongoMockClient()[name]
+    await db.products.insert_many([
+        {"id": f"p{i}", "name": f"Product {i}", "description": "long text", "inventory_count": 10}
+        for i in range(3)
+    ])
+    cache = CatalogCache(ResourceVersions())
+    await cache.get_snapshot(db)
+    return db, cache
+
+
+async def _stock_write_is_patched():
+    db, cache = await _setup("stock_patch")
+    before = await cache.get_snapshot(db)
+    await db.products.update_one({"id": "p1"}, {"$set": {"inventory_count": 0, "out_of_stock": True}})
+    await cache.invalidate_stock(db, ["p1"])
+
+    snapshot = await cache.get_snapshot(db)
+    assert cache.rebuilds == 1
+    assert cache.stock_patches == 1
+    assert snapshot.version > before.version
+    assert snapshot.by_id["p1"]["inventory_count"] == 0
+    assert snapshot.by_id["p1"]["out_of_stock"] is True
+    assert snapshot.by_id["p1"]["description"] == "long text"
+    card = {p["id"]: p for p in snapshot.view("card")}
+    assert card["p1"]["inventory_count"] == 0
+    assert "description" not in card["p1"]
+    assert before.by_id["p1"]["inventory_count"] == 10
+
+
+async def _other_write_rebuilds():
+    db, cache = await _setup("stock_then_edit")
+    await cache.invalidate_stock(db, ["p1"])
+    await db.products.update_one({"id": "p2"}, {"$set": {"name": "Renamed"}})
+    await cache.invalidate(db, ["p2"])
+
+    snapshot = await cache.get_snapshot(db)
+    assert cache.rebuilds == 2
+    assert cache.stock_patches == 0
+    assert snapshot.by_id["p2"]["name"] == "Renamed"
+
+
+def test_stock_write_is_patched():
+    asyncio.run(_stock_write_is_patched())
+
+
+def test_other_write_rebuilds():
+    asyncio.run(_other_write_rebuilds())
@@ -0,0 +1,83 @@
+"""_create_order loads every cart product in a single db.products read"""
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+import motor.motor_asyncio  # noqa: E402
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "test_database")
+motor.motor_asyncio.AsyncIOMotorClient = mongomock_motor.AsyncMongoMockClient
+
+import server  # noqa: E402
+
+GUEST = {"id": "guest", "email": "guest@example.com", "name": "Guest", "is_admin": False}
+
+
+class CountingProducts:
+    """db.products stand-in that counts reads and passes everything through"""
+
+    def __init__(self, collection):
+        self._collection = collection
+        self.finds = 0
+        self.find_ones = 0
+
+    def find(self, *args, **kwargs):
+        self.finds += 1
+        return self._collection.find(*args, **kwargs)
+
+    async def find_one(self, *args, **kwargs):
+        self.find_ones += 1
+        return await self._collection.find_one(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._collection, name)
+
+
+class CountingDB:
+    def __init__(self, db):
+        self._db = db
+        self.products = CountingProducts(db.products)
+
+    def __getitem__(self, name):
+        return self.products if name == "products" else self._db[name]
+
+    def __getattr__(self, name):
+        return getattr(self._db, name)
+
+
+def _order(item_count: int) -> server.OrderCreate:
+    items = [
+        {"product_id": f"p{i}", "name": f"Product {i}", "image": "/p.png", "weight": "250g", "price": 100, "quantity": 1}
+        for i in range(item_count)
+    ]
+    return server.OrderCreate(
+        customer_name="Test", email="", phone="9999999999", whatsapp_number="9999999999",
+        city="Guntur", state="Andhra Pradesh", items=items,
+        subtotal=100 * item_count, delivery_charge=0, total=100 * item_count, payment_method="cod"
+    )
+
+
+async def _place(item_count: int, monkeypatch) -> CountingProducts:
+    base = mongomock_motor.AsyncMongoMockClient()[f"orders_{item_count}"]
+    await base.locations.insert_one({"name": "Guntur", "state": "Andhra Pradesh", "charge": 49})
+    await base.products.insert_many([
+        {"id": f"p{i}", "name": f"Product {i}", "inventory_count": 10} for i in range(item_count)
+    ])
+    db = CountingDB(base)
+    monkeypatch.setattr(server, "db", db)
+    result = await server._create_order(_order(item_count), GUEST)
+    assert result["order_id"]
+    return db.products
+
+
+@pytest.mark.parametrize("item_count", [1, 5, 25])
+def test_create_order_reads_products_once(item_count, monkeypatch):
+    products = asyncio.run(_place(item_count, monkeypatch))
+    assert products.finds == 1
+    assert products.find_ones == 0
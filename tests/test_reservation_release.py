@@ -0,0 +1,52 @@
+"""Releasing a stock hold gives the stock back however busy the product was since"""
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from utils.inventory import decrement_inventory  # noqa: E402
+from utils.reservations import InventoryReservations  # noqa: E402
+
+
+async def _stock(db, product_id: str) -> int:
+    return (await db.products.find_one({"id": product_id}))["inventory_count"]
+
+
+async def _hold_then_release(later_checkouts: int):
+    db = mongomock_motor.AsyncMongoMockClient()["reservations"]
+    await db.products.insert_one({"id": "laddu", "inventory_count": 500})
+    reservations = InventoryReservations()
+
+    await reservations.hold(db, {"id": "held-order", "order_id": "AL1"}, {"laddu": 3}, expires=True)
+    for n in range(later_checkouts):
+        await decrement_inventory(db, {"laddu": 1}, f"other-{n}")
+    assert await _stock(db, "laddu") == 500 - 3 - later_checkouts
+
+    assert await reservations.release(db, "AL1") == ["laddu"]
+    assert await _stock(db, "laddu") == 500 - later_checkouts
+    # Releasing again is a no-op
+    assert await reservations.release(db, "AL1") == []
+    assert await _stock(db, "laddu") == 500 - later_checkouts
+    return db
+
+
+def test_release_after_many_later_checkouts():
+    asyncio.run(_hold_then_release(60))
+
+
+def test_paid_after_release_takes_stock_once():
+    async def scenario():
+        db = await _hold_then_release(60)
+        assert await InventoryReservations().commit(db, "AL1")
+        assert await _stock(db, "laddu") == 500 - 60 - 3
+        assert await InventoryReservations().commit(db, "AL1")
+        assert await _stock(db, "laddu") == 500 - 60 - 3
+        product = await db.products.find_one({"id": "laddu"})
+        assert product.get("inventory_txns", []) == []
+
+    asyncio.run(scenario())
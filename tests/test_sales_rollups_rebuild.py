@@ -0,0 +1,82 @@
+"""Order changes synced while the rollups are being rebuilt are not lost"""
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from utils.sales_rollups import RebuildInProgress, SalesRollups  # noqa: E402
+
+
+class ChangingOrders:
+    """db.orders stand-in that cancels an order and syncs it mid-scan"""
+
+    def __init__(self, collection, on_first):
+        self._collection = collection
+        self._on_first = on_first
+
+    def find(self, query, *args, **kwargs):
+        cursor = self._collection.find(query, *args, **kwargs)
+        if query:
+            return cursor
+        on_first = self._on_first
+
+        async def scan():
+            first = True
+            async for doc in cursor:
+                yield doc
+                if first:
+                    first = False
+                    await on_first()
+        return scan()
+
+    def __getattr__(self, name):
+        return getattr(self._collection, name)
+
+
+class ChangingDB:
+    def __init__(self, db, on_first):
+        self._db = db
+        self.orders = ChangingOrders(db.orders, on_first)
+
+    def __getitem__(self, name):
+        return self.orders if name == "orders" else self._db[name]
+
+    def __getattr__(self, name):
+        return getattr(self._db, name)
+
+
+async def _rebuild_with_traffic():
+    base = mongomock_motor.AsyncMongoMockClient()["rollups_live"]
+    await base.orders.insert_many([
+        {"order_id": f"o{i}", "order_status": "confirmed", "total": 100,
+         "created_at": "2026-10-01T10:00:00+00:00", "items": [{"name": "Laddu", "quantity": 1}]}
+        for i in range(3)
+    ])
+    rollups = SalesRollups()
+    await rollups.rebuild(base)
+
+    async def cancel_first():
+        # The scan has already read o0 as confirmed
+        await base.orders.update_one({"order_id": "o0"}, {"$set": {"order_status": "cancelled"}})
+        await rollups.sync(base, ["o0"])
+        with pytest.raises(RebuildInProgress):
+            await rollups.rebuild(base)
+
+    await rollups.rebuild(ChangingDB(base, cancel_first))
+    summary = await rollups.summary(base)
+    assert rollups.queued == 1
+    assert summary["total_orders"] == 3
+    assert summary["cancelled_orders"] == 1
+    assert summary["active_orders"] == 2
+    assert summary["total_sales"] == 200
+    assert summary["top_products"] == [{"name": "Laddu", "count": 2}]
+    assert await base.sales_rollups_lock.count_documents({}) == 0
+
+
+def test_rebuild_with_traffic():
+    asyncio.run(_rebuild_with_traffic())